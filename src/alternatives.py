@@ -0,0 +1,42 @@
+from typing import Iterator, Literal
+from z3 import Solver, ArithRef, ModelRef, If, Sum, sat
+
+DistanceMetric = Literal["hamming", "l1"]
+
+
+def enumerate_models(
+    solver: Solver,
+    variables: list[ArithRef],
+    max_models: int,
+    min_distance: int = 1,
+    metric: DistanceMetric = "hamming",
+) -> Iterator[ModelRef]:
+    """
+    Lazily yield up to `max_models` models of an already compiled solver.
+    After each model a blocking clause is added so every later model is at
+    least `min_distance` away from it over `variables`:
+      - "hamming": number of variables with a different value,
+      - "l1": sum of absolute value differences.
+    Stops early when the solver reports anything but sat. The blocking clauses
+    stay in the solver; wrap the call in push()/pop() to reuse it afterwards.
+    """
+    for _ in range(max_models):
+        if solver.check() != sat:
+            return
+        model = solver.model()
+        yield model
+
+        if not variables:  # a single allocation is all there is
+            return
+        values = [model.eval(v, model_completion=True) for v in variables]
+        solver.add(_distance(variables, values, metric) >= min_distance)
+
+
+def _distance(variables: list[ArithRef], values: list, metric: DistanceMetric):
+    match metric:
+        case "hamming":
+            return Sum([If(v != val, 1, 0) for v, val in zip(variables, values)])
+        case "l1":
+            return Sum([If(v >= val, v - val, val - v) for v, val in zip(variables, values)])
+        case _:
+            raise ValueError(f"Unsupported distance metric: {metric!r}")
@@ -1,6 +1,7 @@
-from copy import deepcopy
-from typing import Optional, Set
-import re
+import threading
+from typing import Iterable, Literal, Optional
+from pydantic import BaseModel, ValidationError
+from typing_extensions import TypedDict
 from resource_allocation_spec import (
     AddConstraintChange,
     AddLocationChange,
@@ -9,200 +10,478 @@ from resource_allocation_spec import (
     ChangeType,
     Constraint,
     Edge,
-    LinearExpr,
     RemoveConstraintChange,
     RemoveLocationChange,
     RemoveResourceChange,
     ResourceAllocationSpec,
+    SetObjectivesChange,
     SpecChangeEvent,
     UpdateConstraintChange,
     VarSpec,
+    canonical_key,
+    is_location_name,
+    is_resource_name,
 )
+from spec_diff import SpecDiff
+from spec_index import SpecIndex, _constraint_vars, _split_var_id
+
+EventStatus = Literal["applied", "no-op", "rejected"]
+
+
+class EventOutcome(TypedDict):
+    event_id: int
+    status: EventStatus
+    reason: Optional[str]  # why the event was rejected
+    version: int  # spec version after the batch
+    dropped: list[Constraint]  # removed along with a resource or location
+    diff: SpecDiff  # what the event changed
+
+
+PAYLOAD_TYPES: dict[ChangeType, type[BaseModel]] = {
+    ChangeType.ADD_CONSTRAINT: AddConstraintChange,
+    ChangeType.REMOVE_CONSTRAINT: RemoveConstraintChange,
+    ChangeType.UPDATE_CONSTRAINT: UpdateConstraintChange,
+    ChangeType.ADD_RESOURCE: AddResourceChange,
+    ChangeType.REMOVE_RESOURCE: RemoveResourceChange,
+    ChangeType.ADD_LOCATION: AddLocationChange,
+    ChangeType.REMOVE_LOCATION: RemoveLocationChange,
+    ChangeType.SET_OBJECTIVES: SetObjectivesChange,
+}
 
 
 # ============================== HELPERS =====================================
 
 
-def _next_constraint_id(existing: list[Constraint]) -> str:
-    nums = []
-    for c in existing:
-        m = re.match(r"^[A-Za-z]*0*([0-9]+)$", c.id)
-        if m:
-            nums.append(int(m.group(1)))
-    nxt = (max(nums) + 1) if nums else 1
-    return f"C{nxt:04d}"
+# hands an index from a spec to its working copy, one thread at a time
+_index_handoff = threading.Lock()
+
+
+def _working_copy(spec: ResourceAllocationSpec) -> ResourceAllocationSpec:
+    """
+    Shallow copy of `spec` that takes over its index. All edits go through the
+    index, and `SpecIndex.sync` assigns fresh lists for whatever was touched,
+    so the lists, constraints, vars, resources and edges of `spec` are shared
+    but never mutated. The index is the one thing `spec` gives up: it is
+    detached under a lock, so two threads applying changes to the same spec
+    never edit one index, and `spec` builds a new one if it is used again.
+    """
+    with _index_handoff:
+        index = spec.index
+        spec._index = None
+    locations = spec.context.locations.model_copy()
+    context = spec.context.model_copy(update={"locations": locations})
+    s = spec.model_copy(update={"context": context})
+    s._index = index
+    return s
+
+
+def _patched(constraint: Constraint, payload: UpdateConstraintChange) -> Constraint:
+    # patch semantics: provided sides replace entirely
+    update = {}
+    for field in ("lhs", "op", "rhs"):
+        value = getattr(payload, field)
+        if value is not None:
+            update[field] = value
+    return constraint.model_copy(update=update)
+
+
+def _payload(change: SpecChangeEvent) -> Optional[BaseModel]:
+    """
+    The payload as the model its change type expects, None if it cannot be.
+    Add and remove location payloads have the same fields, so a parsed union
+    may hold the wrong one of the two.
+    """
+    expected = PAYLOAD_TYPES.get(change.change_type)
+    payload = change.change_payload
+    if expected is None or isinstance(payload, expected):
+        return payload
+    try:
+        return expected.model_validate(payload.model_dump())
+    except ValidationError:
+        return None
+
+
+# ============================== VALIDATION ==================================
+
+_MISSING = object()
+
+
+class _Overlay:
+    """
+    Read-through view of one index map plus the edits validated so far.
+    """
+
+    def __init__(self, base: dict):
+        self.base = base
+        self.put: dict = {}
+        self.gone: set = set()
+
+    def get(self, key, default=None):
+        if key in self.put:
+            return self.put[key]
+        if key in self.gone or key not in self.base:
+            return default
+        return self.base[key]
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __setitem__(self, key, value) -> None:
+        self.gone.discard(key)
+        self.put[key] = value
+
+    def __delitem__(self, key) -> None:
+        self.put.pop(key, None)
+        self.gone.add(key)
+
+
+class _BatchValidator:
+    """
+    Checks each event of a batch against the spec as the events before it
+    leave it, without touching the index. References are checked, and new
+    resource and location names must fit into var ids; adding something that
+    exists or removing nothing is left to the apply pass, which reports it as
+    a no-op.
+    """
+
+    def __init__(self, index: SpecIndex):
+        self.index = index
+        self.resources = _Overlay(index.resources)
+        self.nodes = _Overlay(index.nodes)
+        self.constraints = _Overlay(index.constraints)
+        self.edges = _Overlay(index.edges)
+
+    def check(self, change: SpecChangeEvent) -> Optional[str]:
+        """
+        None if the event is valid (and then recorded), else the reason.
+        """
+        payload = _payload(change)
+        if payload is None:
+            return f"payload does not fit a {change.change_type.value} change"
+
+        if isinstance(payload, AddConstraintChange):
+            c = payload.constraint
+            reason = self._check_vars(_constraint_vars(c))
+            if reason is None and c.id != "__AUTO__" and c.id not in self.constraints:
+                self.constraints[c.id] = c
+            return reason
 
+        if isinstance(payload, RemoveConstraintChange):
+            if payload.constraint_id not in self.constraints:
+                return f"unknown constraint '{payload.constraint_id}'"
+            del self.constraints[payload.constraint_id]
+            return None
 
-def _vars_in_expr(expr: LinearExpr | int) -> Set[str]:
-    if isinstance(expr, int):
-        return set()
-    return {t.var for t in expr.terms}
+        if isinstance(payload, UpdateConstraintChange):
+            current = self.constraints.get(payload.constraint_id)
+            if current is None:
+                return f"unknown constraint '{payload.constraint_id}'"
+            updated = _patched(current, payload)
+            reason = self._check_vars(_constraint_vars(updated))
+            if reason is None:
+                self.constraints[payload.constraint_id] = updated
+            return reason
 
+        if isinstance(payload, AddResourceChange):
+            name = payload.resource.name
+            if not is_resource_name(name):
+                return f"resource name '{name}' is not snake_case (e.g. 'first_aid')"
+            self.resources[name] = payload.resource
+            return None
 
-def _vars_in_constraint(c: Constraint) -> Set[str]:
-    vs = set(_vars_in_expr(c.lhs))
-    vs |= _vars_in_expr(c.rhs)
-    return vs
+        if isinstance(payload, RemoveResourceChange):
+            if payload.name not in self.resources:
+                return f"unknown resource '{payload.name}'"
+            del self.resources[payload.name]
+            self._drop_constraints(
+                self.index.resource_vars.get(payload.name, ()),
+                lambda resource, node: resource == payload.name,
+            )
+            return None
+
+        if isinstance(payload, AddLocationChange):
+            if payload.node:
+                if not is_location_name(payload.node):
+                    return (
+                        f"location name '{payload.node}' is not lowercase "
+                        "letters, digits and underscores (e.g. 'hospital_a')"
+                    )
+                self.nodes[payload.node] = None
+                return None
+            if payload.edge:
+                for node in (payload.edge.src, payload.edge.dst):
+                    if node not in self.nodes:
+                        return f"route to unknown location '{node}'"
+                self.edges[(payload.edge.src, payload.edge.dst)] = payload.edge
+                return None
+            return "no location or route given"
+
+        if isinstance(payload, RemoveLocationChange):
+            if payload.node:
+                if payload.node not in self.nodes:
+                    return f"unknown location '{payload.node}'"
+                del self.nodes[payload.node]
+                for key in [*self.edges.base, *self.edges.put]:
+                    if payload.node in key:
+                        del self.edges[key]
+                self._drop_constraints(
+                    self.index.node_vars.get(payload.node, ()),
+                    lambda resource, node: node == payload.node,
+                )
+                return None
+            if payload.edge:
+                key = (payload.edge.src, payload.edge.dst)
+                if key not in self.edges or not all(n in self.nodes for n in key):
+                    return f"unknown route '{key[0]} -> {key[1]}'"
+                del self.edges[key]
+                return None
+            return "no location or route given"
+
+        if isinstance(payload, SetObjectivesChange):
+            for o in payload.objectives:
+                if o.expr is not None:
+                    reason = self._check_vars({t.var for t in o.expr.terms})
+                    if reason is not None:
+                        return reason
+                elif o.resource is not None and o.resource not in self.resources:
+                    return f"unknown resource '{o.resource}'"
+            return None
+
+        return f"unsupported change type '{change.change_type}'"
+
+    def _check_vars(self, var_ids: Iterable[str]) -> Optional[str]:
+        for vid in sorted(var_ids):
+            resource, node = _split_var_id(vid)
+            if resource not in self.resources or node not in self.nodes:
+                return f"unknown variable '{vid}'"
+        return None
+
+    def _drop_constraints(self, var_ids: Iterable[str], hit) -> None:
+        # constraints the apply pass will cascade away with a resource/location:
+        # unedited ones through the index, the batch's own ones by scanning
+        index = self.index
+        for vid in var_ids:
+            for cid in index.var_constraints.get(vid, ()):
+                if self.constraints.get(cid) is index.constraints[cid]:
+                    del self.constraints[cid]
+        for cid, c in list(self.constraints.put.items()):
+            if any(hit(*_split_var_id(v)) for v in _constraint_vars(c)):
+                del self.constraints[cid]
 
-def increment_version(old: ResourceAllocationSpec, new: ResourceAllocationSpec) -> None:
-    if old != new:
-        new.version += 1
 
 # ============================== MAIN =====================================
 
 
+def apply_changes(
+    spec: ResourceAllocationSpec,
+    changes: Iterable[SpecChangeEvent],
+    outcomes: Optional[list[EventOutcome]] = None,
+) -> ResourceAllocationSpec:
+    """
+    Apply a batch of SpecChangeEvents as one transaction and return the new
+    spec; the content of `spec` is left untouched (its index moves to the new
+    spec, see `_working_copy`).
+
+    All events are validated first, each against the spec as the events
+    before it leave it: unknown variables, constraints, resources or
+    locations and routes to missing locations reject the event. The others
+    are applied in order to one working copy through the spec index, so each
+    costs O(entities it touches) and the touched lists are rebuilt once. The
+    version goes up by one if any event changed the spec. An error halfway
+    leaves `spec` as it was.
+
+    If `outcomes` is given, one EventOutcome per event is appended.
+    """
+    events = list(changes)
+    s = _working_copy(spec)
+    index = s.index
+    validator = _BatchValidator(index)
+    reasons = [validator.check(change) for change in events]
+
+    index.take_journal()
+    results: list[tuple[EventStatus, list[Constraint], SpecDiff]] = []
+    for change, reason in zip(events, reasons):
+        cascade: list[Constraint] = []
+        if reason is not None:
+            results.append(("rejected", cascade, SpecDiff()))
+            continue
+        objectives = s.objectives
+        applied = _apply_in_place(s, index, _payload(change), cascade)
+        diff = SpecDiff.from_journal(
+            index.take_journal(), index, (objectives, s.objectives)
+        )
+        results.append(("applied" if applied and diff else "no-op", cascade, diff))
+
+    if any(status == "applied" for status, _, _ in results):
+        s.version += 1
+    index.sync(s)
+
+    if outcomes is not None:
+        for change, reason, (status, cascade, diff) in zip(events, reasons, results):
+            outcomes.append(
+                {
+                    "event_id": change.event_id,
+                    "status": status,
+                    "reason": reason,
+                    "version": s.version,
+                    "dropped": cascade,
+                    "diff": diff,
+                }
+            )
+    return s
+
+
 def apply_change(
     spec: ResourceAllocationSpec, change: SpecChangeEvent
 ) -> ResourceAllocationSpec:
     """
     Apply a single SpecChangeEvent to a ResourceAllocationSpec and return a new spec.
     Notes:
-      - No canonicalization here (assumed done elsewhere).
-      - Missing targets (e.g., unknown IDs) are treated as no-ops.
+      - Constraints are stored as written; adding one the spec already has,
+        in any equivalent form (`canonical_key`), is a no-op.
+      - Events referring to missing targets (e.g., unknown IDs) are rejected
+        and leave the spec as it was.
       - For update_constraint: patch semantics; provided sides replace entirely.
     """
-    s = deepcopy(spec)
-    ct: ChangeType = change.change_type
-    payload: ChangePayload = change.change_payload
+    return apply_changes(spec, [change])
+
 
+def _apply_in_place(
+    s: ResourceAllocationSpec,
+    index: SpecIndex,
+    payload: ChangePayload,
+    cascade: list[Constraint],
+) -> bool:
+    """
+    Apply one validated event payload to the working copy `s` through its
+    index; True when it changed anything. Constraints removed as a side effect
+    go to `cascade`.
+    """
     # ADD_CONSTRAINT
-    if ct == ChangeType.ADD_CONSTRAINT and isinstance(payload, AddConstraintChange):
+    if isinstance(payload, AddConstraintChange):
         new_c = payload.constraint
+        if _find_equal(index, new_c) is not None:
+            return False  # already required
         cid = new_c.id
-        if cid == "__AUTO__" or any(c.id == cid for c in s.constraints):
-            new_c.id = _next_constraint_id(s.constraints)
-        s.constraints.append(new_c)
-        increment_version(spec, s)
-        return s
+        if cid == "__AUTO__" or cid in index.constraints:
+            # copy: the event payload stays as the parser produced it
+            new_c = new_c.model_copy(update={"id": index.next_constraint_id()})
+        index.put_constraint(new_c)
+        return True
 
     # REMOVE_CONSTRAINT
-    if ct == ChangeType.REMOVE_CONSTRAINT and isinstance(
-        payload, RemoveConstraintChange
-    ):
-        s.constraints = [c for c in s.constraints if c.id != payload.constraint_id]
-        increment_version(spec, s)
-        return s
+    if isinstance(payload, RemoveConstraintChange):
+        return bool(index.remove_constraints([payload.constraint_id]))
 
     # UPDATE_CONSTRAINT (patch)
-    if ct == ChangeType.UPDATE_CONSTRAINT and isinstance(
-        payload, UpdateConstraintChange
-    ):
-        cid = payload.constraint_id
-        idx = next((i for i, c in enumerate(s.constraints) if c.id == cid), None)
-        if idx is None:
-            return s  # no-op
-
-        current_constraint = s.constraints[idx]
-        lhs = getattr(payload, "lhs", None)
-        op = getattr(payload, "op", None)
-        rhs = getattr(payload, "rhs", None)
-        updated = current_constraint.model_copy(
-            update={
-                **({"lhs": lhs} if lhs is not None else {}),
-                **({"op": op} if op is not None else {}),
-                **({"rhs": rhs} if rhs is not None else {}),
-            }
-        )
-        s.constraints[idx] = updated
-        increment_version(spec, s)
-        return s
+    if isinstance(payload, UpdateConstraintChange):
+        current_constraint = index.constraints.get(payload.constraint_id)
+        if current_constraint is None:
+            return False  # no-op
+
+        updated = _patched(current_constraint, payload)
+        if updated == current_constraint:
+            return False
+        index.put_constraint(updated)
+        return True
 
     # ADD_RESOURCE
-    if ct == ChangeType.ADD_RESOURCE and isinstance(payload, AddResourceChange):
+    if isinstance(payload, AddResourceChange):
         res = payload.resource
-        if not any(r.name == res.name for r in s.context.resources):
-            s.context.resources.append(res)
-            # generate vars for new resource across all existing nodes
-            new_vars = [
-                VarSpec(id=f"{res.name}[{node}]", sort="int") for node in s.context.locations.nodes
-            ]
-            # avoid duplicates
-            existing = {v.id for v in s.vars}
-            s.vars.extend([v for v in new_vars if v.id not in existing])
-
-        increment_version(spec, s)
-        return s
+        if res.name in index.resources:
+            return False
+        index.add_resource(res)
+        # generate vars for new resource across all existing nodes
+        for node in index.nodes:
+            index.add_var(VarSpec(id=f"{res.name}[{node}]", sort="int"))
+        return True
 
     # REMOVE_RESOURCE
-    if ct == ChangeType.REMOVE_RESOURCE and isinstance(payload, RemoveResourceChange):
+    if isinstance(payload, RemoveResourceChange):
         name = payload.name
-        before = len(s.context.resources)
-        s.context.resources = [r for r in s.context.resources if r.name != name]
-
-        # remove successful
-        if len(s.context.resources) != before:
-            var_ids = {f"{name}[{node}]" for node in s.context.locations.nodes}
-            s.vars = [v for v in s.vars if v.id not in var_ids]
-            s.constraints = [
-                c for c in s.constraints if _vars_in_constraint(c).isdisjoint(var_ids)
-            ]
-
-        increment_version(spec, s)
-        return s
+        if index.remove_resource(name) is None:
+            return False
+        # only the resource's vars and the constraints using them are touched
+        var_ids = index.resource_vars.pop(name, set())
+        cascade.extend(index.remove_constraints(index.constraints_using(var_ids)))
+        index.remove_vars(var_ids)
+        return True
 
     # ADD_LOCATION (node or edge)
-    if ct == ChangeType.ADD_LOCATION and isinstance(payload, AddLocationChange):
+    if isinstance(payload, AddLocationChange):
         node: Optional[str] = getattr(payload, "node", None)
         edge: Optional[Edge] = getattr(payload, "edge", None)
 
         if node:
-            if node not in s.context.locations.nodes:
-                s.context.locations.nodes.append(node)
-                # generate vars for all resources at this node
-                existing = {v.id for v in s.vars}
-                for r in s.context.resources:
-                    vid = f"{r.name}[{node}]"
-                    if vid not in existing:
-                        s.vars.append(VarSpec(id=vid, sort="int"))
+            if node in index.nodes:
+                return False
+            index.add_node(node)
+            # generate vars for all resources at this node
+            for r in index.resources:
+                index.add_var(VarSpec(id=f"{r}[{node}]", sort="int"))
+            return True
 
         elif edge:
             # add edge if both nodes exist and edge not present
             src, dst = edge.src, edge.dst
-            nodes = set(s.context.locations.nodes)
-            if src in nodes and dst in nodes:
-                exists = any(
-                    e.src == src and e.dst == dst for e in s.context.locations.edges
-                )
-                if not exists:
-                    s.context.locations.edges.append(edge)
+            if src not in index.nodes or dst not in index.nodes:
+                return False
+            if (src, dst) in index.edges:
+                return False
+            index.add_edge(edge)
+            return True
 
-        increment_version(spec, s)
-        return s
+        return False
 
     # REMOVE_LOCATION (node or edge)
-    if ct == ChangeType.REMOVE_LOCATION and isinstance(payload, RemoveLocationChange):
+    if isinstance(payload, RemoveLocationChange):
         node: Optional[str] = getattr(payload, "node", None)
         edge: Optional[Edge] = getattr(payload, "edge", None)
 
         if node:
-            if node in s.context.locations.nodes:
-                # remove node
-                s.context.locations.nodes = [
-                    n for n in s.context.locations.nodes if n != node
-                ]
-                # remove incident edges
-                s.context.locations.edges = [
-                    e
-                    for e in s.context.locations.edges
-                    if e.src != node and e.dst != node
-                ]
-                # remove vars and constraints referencing this node
-                var_ids = {f"{r.name}[{node}]" for r in s.context.resources}
-                s.vars = [v for v in s.vars if v.id not in var_ids]
-                s.constraints = [
-                    c
-                    for c in s.constraints
-                    if _vars_in_constraint(c).isdisjoint(var_ids)
-                ]
+            if node not in index.nodes:
+                return False
+            # remove node
+            index.remove_node(node)
+            # remove incident edges
+            index.remove_edges(
+                [k for k in index.edges if k[0] == node or k[1] == node]
+            )
+            # remove vars and constraints referencing this node
+            var_ids = index.node_vars.pop(node, set())
+            cascade.extend(index.remove_constraints(index.constraints_using(var_ids)))
+            index.remove_vars(var_ids)
+            return True
+
         elif edge:
-            s.context.locations.edges = [
-                e
-                for e in s.context.locations.edges
-                if not (e.src == edge.src and e.dst == edge.dst)
-            ]
+            return index.remove_edges([(edge.src, edge.dst)])
 
-        increment_version(spec, s)
-        return s
+        return False
 
-    # Unknown type = no-op
-    return s
+    # SET_OBJECTIVES (replace)
+    if isinstance(payload, SetObjectivesChange):
+        if s.objectives == payload.objectives:
+            return False
+        s.objectives = list(payload.objectives)
+        return True
+
+    # validation rejects anything else
+    return False
+
+
+def _find_equal(index: SpecIndex, constraint: Constraint) -> Optional[str]:
+    """
+    Id of a constraint in the index that says the same as `constraint`, if
+    any. Only constraints sharing its rarest (non-cancelling) var are checked.
+    """
+    key = canonical_key(constraint)
+    terms = key[0]
+    if not terms:
+        return None
+    candidates = min(
+        (index.var_constraints.get(vid, set()) for vid, _ in terms), key=len
+    )
+    for cid in sorted(candidates):
+        if canonical_key(index.constraints[cid]) == key:
+            return cid
+    return None
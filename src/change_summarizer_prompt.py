@@ -1,7 +1,8 @@
 from langchain_core.prompts import ChatPromptTemplate
 
 CHANGE_SUMMARIZER_SYSTEM_MESSAGE = """
-Your role is to read structured changes of the specification and translate them into clear, concise, natural language summary of changes for the end user.
+Your role is to read the changes of the specification and translate them into clear, concise, natural language summary of changes for the end user.
+The changes come as one line per added, removed or changed item (resources, locations, routes between locations, and rules written as equations over resource[location] amounts), followed by the current objectives if they changed.
 
 Guidelines:
 - Summarize what has changed, focusing on the user's perspective (e.g., what was added, removed, or updated). Focus on the overall meaning and user impact, not the technical details.
@@ -12,6 +13,8 @@ Guidelines:
 - Avoid exposing internal identifiers (like C0001 or array notation such as food[a]).
 - Use everyday language, unless technical terms are essential for clarity.
 - If nothing significant changed, say: "No updates were made."
+- "Dropped requirements" lists rules that were removed automatically because they mentioned a removed resource or location. Mention them briefly so the user knows they are gone.
+- "Rejected changes" lists requested changes that were not made because they referred to something that does not exist, with the reason. Tell the user which request was not carried out and why, in plain words, so they can rephrase it.
 """
 
 
@@ -19,6 +22,9 @@ Guidelines:
 change_summarizer_prompt_template = ChatPromptTemplate.from_messages(
     [
         ("system", CHANGE_SUMMARIZER_SYSTEM_MESSAGE),
-        ("user", "{changes}"),
+        (
+            "user",
+            "Changes:\n{changes}\n\nDropped requirements:\n{dropped}\n\nRejected changes:\n{rejected}",
+        ),
     ]
 )
@@ -0,0 +1,102 @@
+from array import array
+
+# a*x > b  <=>  a*x >= b + 1 over integers (every var is an int)
+_NON_STRICT = {">": (">=", 1), "<": ("<=", -1)}
+
+
+def int_array(values: list[int]) -> array | list[int]:
+    """
+    `values` as an int64 array, or as the list itself when a value does not
+    fit: spec numbers are unbounded (as in Z3), the packed form is not.
+    """
+    try:
+        return array("q", values)
+    except OverflowError:
+        return values
+
+
+def linear_parts(c) -> tuple[dict[str, int], str, int]:
+    """
+    (coefficients by var, op, bound) of constraint `c` as
+
+        sum(coef * var)  <op>  bound
+
+    with every variable on the left (duplicate terms merged, zero
+    coefficients dropped, in order of appearance), every constant on the
+    right, and strict inequalities tightened to >= / <=. The one lowering
+    of a constraint that rows, presolve and the canonical form build on.
+    """
+    coefs: dict[str, int] = {}
+    for t in c.lhs.terms:
+        coefs[t.var] = coefs.get(t.var, 0) + t.coef
+    bound = -c.lhs.const
+    if isinstance(c.rhs, int):
+        bound += c.rhs
+    else:
+        for t in c.rhs.terms:
+            coefs[t.var] = coefs.get(t.var, 0) - t.coef
+        bound += c.rhs.const
+
+    op = c.op
+    if op in _NON_STRICT:
+        op, step = _NON_STRICT[op]
+        bound += step
+    if 0 in coefs.values():
+        coefs = {var: coef for var, coef in coefs.items() if coef != 0}
+    return coefs, op, bound
+
+
+class VarPool:
+    """
+    Interns var ids as small ints. Numbers are never reused, so one pool can
+    serve every version of a spec that shares its index.
+    """
+
+    __slots__ = ("names", "numbers")
+
+    def __init__(self):
+        self.names: list[str] = []
+        self.numbers: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, vid: str) -> int:
+        n = self.numbers.get(vid)
+        if n is None:
+            n = self.numbers[vid] = len(self.names)
+            self.names.append(vid)
+        return n
+
+
+class CompactRow:
+    """
+    A constraint lowered once to
+
+        sum_k coefs[k] * var(var_numbers[k])  <op>  bound
+
+    over interned var numbers, in the form of `linear_parts` (op is one of
+    >=, <=, =). `source` is the constraint it was built from.
+
+    Rows are a cache next to the Pydantic models, not a replacement: specs,
+    `apply_changes` and the checkpointer still hold every Constraint, and a
+    row adds its arrays on top of it. What rows save is lowering unchanged
+    constraints again on every solve (see `LinearSystem.from_spec`).
+    """
+
+    __slots__ = ("source", "var_numbers", "coefs", "op", "bound")
+
+    def __init__(
+        self, source, var_numbers: array, coefs: array | list[int], op: str, bound: int
+    ):
+        self.source = source
+        self.var_numbers = var_numbers
+        self.coefs = coefs
+        self.op = op
+        self.bound = bound
+
+    @classmethod
+    def from_constraint(cls, c, pool: VarPool) -> "CompactRow":
+        coefs, op, bound = linear_parts(c)
+        numbers = array("q", map(pool.intern, coefs))
+        return cls(c, numbers, int_array(list(coefs.values())), op, bound)
@@ -0,0 +1,93 @@
+from typing import Any, Iterable
+import xxhash
+from compact_spec import linear_parts
+
+# separators of the byte encoding (never part of a name): between fields,
+# between terms, and between var and coefficient inside a term
+_RECORD = "\x1e"
+_TERM = "\x1d"
+_FIELD = "\x1f"
+
+# a*x >= b  <=>  -a*x <= -b
+_FLIPPED_OP = {">=": "<=", "<=": ">=", "=": "="}
+
+
+def canonical_parts(c) -> tuple[list[tuple[str, int]], str, int]:
+    """
+    (terms, op, bound) of constraint `c` in canonical form: `linear_parts`
+    with the terms sorted by var and signs flipped so the first coefficient
+    is positive.
+    """
+    coefs, op, bound = linear_parts(c)
+    terms = sorted(coefs.items())
+    if terms and terms[0][1] < 0:
+        terms = [(var, -coef) for var, coef in terms]
+        op, bound = _FLIPPED_OP[op], -bound
+    return terms, op, bound
+
+
+# ============================== HASHES ======================================
+
+
+def expr_hash(expr) -> int:
+    """
+    Content hash of a LinearExpr: duplicate terms merged, zeros dropped,
+    term order ignored.
+    """
+    coefs: dict[str, int] = {}
+    for t in expr.terms:
+        coefs[t.var] = coefs.get(t.var, 0) + t.coef
+    terms = sorted((var, coef) for var, coef in coefs.items() if coef != 0)
+    return _digest("expr", _terms(terms), expr.const)
+
+
+def constraint_hash(c) -> int:
+    """
+    Content hash of a constraint: its id and its canonical form, so
+    equivalent ways of writing the same constraint hash alike.
+    """
+    terms, op, bound = canonical_parts(c)
+    return _digest("constraint", c.id, op, bound, _terms(terms))
+
+
+def entity_hash(category: str, entity: Any) -> int:
+    """
+    Hash of one spec entity, by `spec_diff` category.
+    """
+    match category:
+        case "constraints":
+            return constraint_hash(entity)
+        case "vars":
+            return _digest("var", entity.id, entity.sort)
+        case "resources":
+            return _digest("resource", entity.name, entity.unit)
+        case "nodes":
+            return _digest("node", entity)
+        case "edges":
+            return _digest("edge", entity.src, entity.dst)
+        case _:
+            raise ValueError(f"Unknown category: {category!r}")
+
+
+def objectives_hash(objectives: Iterable) -> int:
+    """
+    Hash of the objectives; their order is a priority, so it counts.
+    """
+    parts = []
+    for o in objectives:
+        expr = expr_hash(o.expr) if o.expr is not None else ""
+        parts.append(_FIELD.join(map(str, (o.sense, o.aggregate, o.resource, expr))))
+    return _digest("objectives", *parts)
+
+
+def hex_digest(h: int) -> str:
+    return f"{h:032x}"
+
+
+def _terms(terms: list[tuple[str, int]]) -> str:
+    return _TERM.join(f"{var}{_FIELD}{coef}" for var, coef in terms)
+
+
+def _digest(tag: str, *fields) -> int:
+    encoded = _RECORD.join((tag, *map(str, fields))).encode()
+    return xxhash.xxh3_128_intdigest(encoded)
@@ -8,6 +8,10 @@ class Intent(str, Enum):
     QUERY_SPEC = "query_spec"
     SOLVE = "solve"
     EXPLAIN_SOLVER = "explain_solver"
+    ALTERNATIVES = "alternatives"
+    UNDO = "undo"
+    REDO = "redo"
+    GOTO_VERSION = "goto_version"
     CLARIFY = "clarify"
     GREET = "greet"
     UNSUPPORTED_REQUEST = "unsupported_request"
@@ -32,3 +36,11 @@ class ControllerLLMOutput(BaseModel):
         default=None,
         description="A concise, user-facing message. Only required when intent is 'greet' or 'clarify'; otherwise, leave as None.",
     )
+    alternatives_count: int | None = Field(
+        default=None,
+        description="How many alternative allocations the user asked for. Only for intent 'alternatives'; leave as None when no number is given.",
+    )
+    target_version: int | None = Field(
+        default=None,
+        description="Plan version the user wants to return to. Only for intent 'goto_version'.",
+    )
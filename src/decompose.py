@@ -0,0 +1,119 @@
+from resource_allocation_spec import ResourceAllocationSpec, Constraint, LinearExpr
+from solver_output import SolverResult
+
+
+def split_components(spec: ResourceAllocationSpec) -> list[list[Constraint]]:
+    """
+    Group constraints into independent sub-problems: two constraints end up in
+    the same group when they are linked by a chain of shared variables.
+    Groups keep the original constraint order.
+    """
+    parent: dict[str, str] = {}
+
+    def find(v: str) -> str:
+        root = v
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        while parent[v] != root:  # path compression
+            parent[v], v = root, parent[v]
+        return root
+
+    constraint_vars: list[list[str]] = []
+    for c in spec.constraints:
+        vs = [t.var for t in c.lhs.terms]
+        if isinstance(c.rhs, LinearExpr):
+            vs.extend(t.var for t in c.rhs.terms)
+        constraint_vars.append(vs)
+        for v in vs[1:]:
+            ra, rb = find(vs[0]), find(v)
+            if ra != rb:
+                parent[rb] = ra
+
+    groups: dict[str, list[Constraint]] = {}
+    for i, (c, vs) in enumerate(zip(spec.constraints, constraint_vars)):
+        # variable-free constraints stand alone
+        key = find(vs[0]) if vs else f"#{i}"
+        groups.setdefault(key, []).append(c)
+    return list(groups.values())
+
+
+def partition(spec: ResourceAllocationSpec, n_parts: int) -> list[ResourceAllocationSpec]:
+    """
+    Split a spec into at most `n_parts` independent sub-specs of similar size
+    (components are packed largest first into the lightest part).
+    Returns `[spec]` when it does not decompose.
+    """
+    components = split_components(spec)
+    if len(components) < 2 or n_parts < 2:
+        return [spec]
+
+    parts: list[list[Constraint]] = [[] for _ in range(min(n_parts, len(components)))]
+    for component in sorted(components, key=len, reverse=True):
+        min(parts, key=len).extend(component)
+
+    # restore the original constraint order inside each part
+    position = {c.id: i for i, c in enumerate(spec.constraints)}
+    sub_specs = []
+    for constraints in parts:
+        constraints.sort(key=lambda c: position[c.id])
+        used: set[str] = set()
+        for c in constraints:
+            used.update(t.var for t in c.lhs.terms)
+            if isinstance(c.rhs, LinearExpr):
+                used.update(t.var for t in c.rhs.terms)
+        part = spec.model_copy(
+            update={
+                "vars": [v for v in spec.vars if v.id in used],
+                "constraints": constraints,
+            }
+        )
+        # the copied index describes the whole spec; don't ship it to workers
+        part._index = None
+        sub_specs.append(part)
+    return sub_specs
+
+
+def merge_results(
+    spec: ResourceAllocationSpec, results: list[SolverResult]
+) -> SolverResult:
+    """
+    Combine the results of independent sub-specs: SAT when every part is SAT
+    (assignments in spec variable order), UNSAT with the cores of every
+    infeasible part, or UNKNOWN when a part is undecided and none is UNSAT.
+    """
+    unsat_parts = [r for r in results if r.get("result") == "UNSAT"]
+    if unsat_parts:
+        cores = [
+            core
+            for r in unsat_parts
+            for core in (r.get("unsat_cores") or [r.get("unsat_constraints_ids")])
+        ]
+        return {
+            "spec_version": spec.version,
+            "result": "UNSAT",
+            "unsat_constraints_ids": cores[0],
+            "unsat_cores": cores,
+            "backend": "+".join(sorted({r.get("backend", "") for r in unsat_parts})),
+        }
+
+    unknown_parts = [r for r in results if r.get("result") == "UNKNOWN"]
+    if unknown_parts:
+        return {
+            "spec_version": spec.version,
+            "result": "UNKNOWN",
+            "reason_unknown": "; ".join(
+                sorted({r.get("reason_unknown") or "unknown" for r in unknown_parts})
+            ),
+            "backend": "+".join(sorted({r.get("backend", "") for r in unknown_parts})),
+        }
+
+    values: dict[str, str] = {}
+    for r in results:
+        for a in r.get("assignments") or []:
+            values[a.split(" = ", 1)[0]] = a
+    return {
+        "spec_version": spec.version,
+        "result": "SAT",
+        "assignments": [values[v.id] for v in spec.vars if v.id in values],
+        "backend": "+".join(sorted({r.get("backend", "") for r in results})),
+    }
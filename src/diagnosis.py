@@ -0,0 +1,79 @@
+import time
+from typing import Optional
+from z3 import Solver, BoolRef, CheckSatResult, unsat
+
+# Z3's "no timeout" value for the solver `timeout` parameter
+NO_TIMEOUT_MS = 4294967295
+
+
+def find_cores(
+    solver: Solver,
+    trackings: list[BoolRef],
+    max_cores: int = 1,
+    time_budget_ms: int = 1000,
+    seed: Optional[list[BoolRef]] = None,
+) -> list[list[BoolRef]]:
+    """
+    Up to `max_cores` pairwise disjoint unsat cores over the given tracking
+    literals. The solver must treat the literals as assumptions (as the
+    incremental compiler does), so any subset can be checked on its own.
+
+    Each core is shrunk by deletion until every literal in it is necessary.
+    When the time budget runs out, the current (possibly non-minimal) core is
+    returned as is. `seed` is a known unsat subset to start from.
+    """
+    deadline = time.monotonic() + time_budget_ms / 1000
+    cores: list[list[BoolRef]] = []
+    remaining = list(trackings)
+
+    try:
+        while len(cores) < max_cores and _remaining_ms(deadline) > 0:
+            if seed is not None and not cores:
+                core = list(seed)
+            else:
+                if _check(solver, remaining, deadline) != unsat:
+                    break
+                core = list(solver.unsat_core())
+
+            core = minimize_core(solver, core, deadline)
+            cores.append(core)
+
+            # the next core must avoid every literal of this one
+            used = {b.get_id() for b in core}
+            remaining = [t for t in remaining if t.get_id() not in used]
+    finally:
+        solver.set("timeout", NO_TIMEOUT_MS)
+
+    return cores
+
+
+def minimize_core(
+    solver: Solver, core: list[BoolRef], deadline: float
+) -> list[BoolRef]:
+    """
+    Deletion-based core minimization: drop a literal whenever the rest stays
+    unsat, shrinking to the solver's core of the smaller set each time.
+    Literals whose check is sat, or unknown (out of time), are kept.
+    """
+    core = list(core)
+    i = 0
+    while i < len(core) and _remaining_ms(deadline) > 0:
+        candidate = core[:i] + core[i + 1 :]
+        if _check(solver, candidate, deadline) == unsat:
+            # literals before i are necessary in any unsat subset, so they stay
+            used = {b.get_id() for b in solver.unsat_core()}
+            core = core[:i] + [b for b in core[i + 1 :] if b.get_id() in used]
+        else:
+            i += 1
+    return core
+
+
+def _check(
+    solver: Solver, assumptions: list[BoolRef], deadline: float
+) -> CheckSatResult:
+    solver.set("timeout", max(1, _remaining_ms(deadline)))
+    return solver.check(*assumptions)
+
+
+def _remaining_ms(deadline: float) -> int:
+    return int((deadline - time.monotonic()) * 1000)
@@ -0,0 +1,229 @@
+import re
+from typing import Optional
+from parser_output import ChangeOutput
+from resource_allocation_spec import (
+    AddConstraintChange,
+    AddLocationChange,
+    AddResourceChange,
+    ChangeType,
+    Constraint,
+    Edge,
+    LOCATION_NAME,
+    LinearExpr,
+    Objective,
+    RESOURCE_NAME,
+    RemoveConstraintChange,
+    RemoveLocationChange,
+    RemoveResourceChange,
+    Resource,
+    SetObjectivesChange,
+    Term,
+    UpdateConstraintChange,
+)
+
+# word operators of the interpreter's constraint form, longest first
+WORD_OPERATORS: list[tuple[str, str]] = [
+    ("greater than or equal to", ">="),
+    ("greater than or equal", ">="),
+    ("less than or equal to", "<="),
+    ("less than or equal", "<="),
+    ("greater than", ">"),
+    ("more than", ">"),
+    ("less than", "<"),
+    ("fewer than", "<"),
+    ("at least", ">="),
+    ("at most", "<="),
+    ("equal to", "="),
+    ("equal", "="),
+    ("exactly", "="),
+]
+
+AGGREGATES = {"total": "sum", "minimum": "min", "maximum": "max"}
+
+_NAME = r'"([^"]+)"'
+# names that fit into var ids, matched case-sensitively; anything else
+# (e.g. "Hospital A") is left to the LLM parser to turn into a valid id
+_RESOURCE = rf'"((?-i:{RESOURCE_NAME}))"'
+_LOCATION = rf'"((?-i:{LOCATION_NAME}))"'
+_OPERATOR = "|".join(
+    r"\s+".join(map(re.escape, words.split())) for words, _ in WORD_OPERATORS
+)
+# <word_operator> <integer | "resource" at "location">
+_CLAUSE = rf'({_OPERATOR})\s+(-?\d+|{_RESOURCE}\s+at\s+{_LOCATION})'
+_FORM = rf'{_RESOURCE}\s+at\s+{_LOCATION}\s+must\s+(.+)'
+_CLAUSE_PATTERN = re.compile(_CLAUSE, re.IGNORECASE)
+
+_GRAMMAR: list[tuple[str, re.Pattern]] = [
+    (name, re.compile(pattern, re.IGNORECASE))
+    for name, pattern in [
+        ("add_location", rf"ADD_LOCATION\s+{_LOCATION}"),
+        ("remove_location", rf"REMOVE_LOCATION\s+{_LOCATION}"),
+        ("add_resource", rf'ADD_RESOURCE\s+{_RESOURCE}(?:\s+unit\s*=\s*(?:"([^"]+)"|(\S+)))?'),
+        ("remove_resource", rf"REMOVE_RESOURCE\s+{_RESOURCE}"),
+        ("add_edge", rf"ADD_EDGE\s+{_LOCATION}\s*->\s*{_LOCATION}"),
+        ("remove_edge", rf"REMOVE_EDGE\s+{_LOCATION}\s*->\s*{_LOCATION}"),
+        ("add_constraint", rf"ADD_CONSTRAINT\s+{_FORM}"),
+        ("update_constraint", rf"UPDATE_CONSTRAINT\s+{_NAME}\s*->\s*{_FORM}"),
+        ("remove_constraint", rf"REMOVE_CONSTRAINT\s+{_NAME}"),
+        ("set_objective", rf'SET_OBJECTIVE\s+(minimize|maximize)\s+(total|minimum|maximum)\s+"((?-i:{RESOURCE_NAME})|\*)"'),
+        ("clear_objectives", r"CLEAR_OBJECTIVES"),
+    ]
+]
+
+
+def split_instructions(text: str) -> list[str]:
+    """
+    The interpreter's comma-separated (or one per line) instructions, with
+    list markers and backticks stripped. Commas inside quotes do not split.
+    """
+    parts = re.split(r',(?=(?:[^"]*"[^"]*")*[^"]*$)|\n', text)
+    instructions = []
+    for part in parts:
+        part = part.strip().strip("`").strip()
+        part = re.sub(r"^(?:[-*]|\d+[.)])\s+", "", part).strip("`").strip()
+        if part:
+            instructions.append(part)
+    return instructions
+
+
+def parse_instruction(instruction: str) -> Optional[list[ChangeOutput]]:
+    """
+    Changes for one instruction, or None if the grammar does not cover it,
+    e.g. because a resource or location name does not fit into var ids.
+    """
+    for name, pattern in _GRAMMAR:
+        m = pattern.fullmatch(instruction)
+        if m is not None:
+            return _build(name, m)
+    return None
+
+
+def parse_instructions(text: str) -> tuple[list[ChangeOutput], list[str]]:
+    """
+    Parse the interpreter output locally. Returns the changes of every
+    instruction the grammar accepts, in the parser's fixed order (see
+    `order_changes`), and the instructions it rejected, for the LLM parser.
+    """
+    changes: list[ChangeOutput] = []
+    rejected: list[str] = []
+    for instruction in split_instructions(text):
+        parsed = parse_instruction(instruction)
+        if parsed is None:
+            rejected.append(instruction)
+        else:
+            changes.extend(parsed)
+    return order_changes(changes), rejected
+
+
+def order_changes(changes: list[ChangeOutput]) -> list[ChangeOutput]:
+    """
+    Stable sort into the order the parser prompt prescribes: additions (nodes
+    before edges), constraint additions, updates and removals, resource and
+    location removals, objectives.
+    """
+    return sorted(changes, key=_rank)
+
+
+# ============================== BUILDERS ======================================
+
+
+def _build(name: str, m: re.Match) -> Optional[list[ChangeOutput]]:
+    match name:
+        case "add_location":
+            return [_change(ChangeType.ADD_LOCATION, AddLocationChange(node=m[1]))]
+        case "remove_location":
+            return [_change(ChangeType.REMOVE_LOCATION, RemoveLocationChange(node=m[1]))]
+        case "add_resource":
+            unit = m[2] or m[3] or "units"
+            resource = Resource(name=m[1], unit=unit)
+            return [_change(ChangeType.ADD_RESOURCE, AddResourceChange(resource=resource))]
+        case "remove_resource":
+            return [_change(ChangeType.REMOVE_RESOURCE, RemoveResourceChange(name=m[1]))]
+        case "add_edge":
+            edge = Edge(src=m[1], dst=m[2])
+            return [_change(ChangeType.ADD_LOCATION, AddLocationChange(edge=edge))]
+        case "remove_edge":
+            edge = Edge(src=m[1], dst=m[2])
+            return [_change(ChangeType.REMOVE_LOCATION, RemoveLocationChange(edge=edge))]
+        case "add_constraint":
+            clauses = _clauses(m[1], m[2], m[3])
+            if clauses is None:
+                return None
+            return [
+                _change(
+                    ChangeType.ADD_CONSTRAINT,
+                    AddConstraintChange(
+                        constraint=Constraint(id="__AUTO__", lhs=lhs, op=op, rhs=rhs)
+                    ),
+                )
+                for lhs, op, rhs in clauses
+            ]
+        case "update_constraint":
+            clauses = _clauses(m[2], m[3], m[4])
+            if clauses is None or len(clauses) != 1:
+                return None
+            ((lhs, op, rhs),) = clauses
+            payload = UpdateConstraintChange(constraint_id=m[1], lhs=lhs, op=op, rhs=rhs)
+            return [_change(ChangeType.UPDATE_CONSTRAINT, payload)]
+        case "remove_constraint":
+            payload = RemoveConstraintChange(constraint_id=m[1])
+            return [_change(ChangeType.REMOVE_CONSTRAINT, payload)]
+        case "set_objective":
+            resource = None if m[3] == "*" else m[3]
+            objective = Objective(
+                sense=m[1].lower(), aggregate=AGGREGATES[m[2].lower()], resource=resource
+            )
+            payload = SetObjectivesChange(objectives=[objective])
+            return [_change(ChangeType.SET_OBJECTIVES, payload)]
+        case "clear_objectives":
+            return [_change(ChangeType.SET_OBJECTIVES, SetObjectivesChange(objectives=[]))]
+    return None
+
+
+def _clauses(
+    resource: str, location: str, rest: str
+) -> Optional[list[tuple[LinearExpr, str, int | LinearExpr]]]:
+    """
+    (lhs, op, rhs) per `and`-joined clause of `"r" at "l" must <clauses>`.
+    """
+    lhs = LinearExpr(terms=[Term(var=f"{resource}[{location}]", coef=1)])
+    out = []
+    for part in re.split(r"\s+and\s+", rest.strip(), flags=re.IGNORECASE):
+        m = _CLAUSE_PATTERN.fullmatch(part.strip())
+        if m is None:
+            return None
+        op = _operator(m[1])
+        if m[3] is not None:
+            rhs = LinearExpr(terms=[Term(var=f"{m[3]}[{m[4]}]", coef=1)])
+        else:
+            rhs = int(m[2])
+        out.append((lhs, op, rhs))
+    return out
+
+
+def _operator(words: str) -> str:
+    words = " ".join(words.lower().split())
+    return dict(WORD_OPERATORS)[words]
+
+
+def _change(change_type: ChangeType, payload) -> ChangeOutput:
+    return ChangeOutput(change_type=change_type, change_payload=payload)
+
+
+def _rank(change: ChangeOutput) -> int:
+    payload = change.change_payload
+    match change.change_type:
+        case ChangeType.ADD_RESOURCE:
+            return 0
+        case ChangeType.ADD_LOCATION:
+            return 1 if getattr(payload, "edge", None) else 0
+        case ChangeType.ADD_CONSTRAINT:
+            return 2
+        case ChangeType.UPDATE_CONSTRAINT:
+            return 3
+        case ChangeType.REMOVE_CONSTRAINT:
+            return 4
+        case ChangeType.REMOVE_RESOURCE | ChangeType.REMOVE_LOCATION:
+            return 5
+        case _:
+            return 6
@@ -0,0 +1,69 @@
+import re
+from typing import Optional
+from controller_output import ControllerLLMOutput, Intent
+
+GREETING_REPLY = (
+    "Hello! Tell me about the locations, resources and needs you are planning for, "
+    "or ask me to work out the distribution for the current plan."
+)
+
+# politeness around a command; stripped before matching
+_POLITE_PREFIX = r"(?:(?:please|pls|ok(?:ay)?|now|so|then|can you|could you|would you|let'?s),?\s+)*"
+_POLITE_SUFFIX = r"(?:\s+(?:please|pls|now|again|thanks|thank you))*"
+
+_THE = r"(?:(?:the|this|that|it|a|an|my|our|current|latest)\s+)*"
+_RESULT = r"(?:result|results|allocation|distribution|solution|answer|outcome)"
+_SPEC = r"(?:spec|specification|setup|constraints|requirements|resources|locations|routes)"
+
+# whole-message rules, in order; the first match wins. Anything they do not
+# cover, or could read two ways, is left to the controller LLM.
+_RULES: list[tuple[Intent, re.Pattern]] = [
+    (intent, re.compile(pattern))
+    for intent, pattern in [
+        (Intent.GREET, r"(?:hi|hello|hey|hiya|howdy|good (?:morning|afternoon|evening))(?: there)?"),
+        (
+            Intent.SOLVE,
+            rf"(?:re-?)?solve(?: {_THE}(?:plan|problem))?(?: it| this)?"
+            rf"|run(?: it| {_THE}(?:solver|plan|optimi[sz]ation))?"
+            rf"|optimi[sz]e(?: it| {_THE}plan)?"
+            rf"|(?:find|compute|calculate|give me|get) {_THE}(?:allocation|distribution|solution|optimal plan)",
+        ),
+        (
+            Intent.QUERY_SPEC,
+            rf"(?:show|list|display|print|summari[sz]e)(?: me)? {_THE}{_SPEC}"
+            rf"|what(?:'s| is| are) {_THE}{_SPEC}",
+        ),
+        (
+            Intent.EXPLAIN_SOLVER,
+            rf"explain {_THE}{_RESULT}"
+            rf"|why (?:this|that) {_RESULT}"
+            rf"|why (?:is|was) (?:it|this|that|the plan) (?:infeasible|impossible|unsolvable)"
+            rf"|why (?:is there|was there) no (?:solution|allocation)",
+        ),
+    ]
+]
+
+_COMMAND = re.compile(rf"{_POLITE_PREFIX}(.+?){_POLITE_SUFFIX}")
+
+
+def normalize(text: str) -> str:
+    """
+    Lower-cased message with collapsed whitespace, closing punctuation and
+    politeness ("please", "can you", ...) stripped.
+    """
+    text = " ".join(text.lower().split()).strip(" .!?,")
+    m = _COMMAND.fullmatch(text)
+    return m[1].strip(" .!?,") if m else text
+
+
+def classify_intent(text: str) -> Optional[ControllerLLMOutput]:
+    """
+    Controller output for a command-like message the rules are sure about,
+    or None to defer to the controller LLM.
+    """
+    command = normalize(text)
+    for intent, pattern in _RULES:
+        if pattern.fullmatch(command):
+            reply = GREETING_REPLY if intent == Intent.GREET else None
+            return ControllerLLMOutput(intent=intent, reply=reply)
+    return None
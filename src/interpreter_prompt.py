@@ -65,6 +65,14 @@ Constraint Rules
 - Do not duplicate constraints that already exist.
 - Default unit is `"units"` if not specified.
 
+====================
+Objective Rules
+====================
+- Only set an objective when the user explicitly asks to optimize, e.g., "use as little food as possible" or "make the smallest water delivery as large as possible".
+- Format: `SET_OBJECTIVE <minimize|maximize> <total|minimum|maximum> "<resource>"`. Use `"*"` as the resource to cover all resources.
+- `SET_OBJECTIVE` replaces any existing objective. Use `CLEAR_OBJECTIVES` to remove it.
+- Do not re-set an objective that already exists in the same form.
+
 ====================
 Allowed Instruction Keywords and Format
 ====================
@@ -77,6 +85,8 @@ Allowed Instruction Keywords and Format
 - `ADD_CONSTRAINT "<resource>" at "<location>" must <word_operator> <value>`
 - `UPDATE_CONSTRAINT "<id>" -> <new_form>`
 - `REMOVE_CONSTRAINT "<id>"`
+- `SET_OBJECTIVE <minimize|maximize> <total|minimum|maximum> "<resource>"`
+- `CLEAR_OBJECTIVES`
 
 ====================
 Output Format
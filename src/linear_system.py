@@ -0,0 +1,125 @@
+from array import array
+from typing import Iterator
+from compact_spec import int_array
+from resource_allocation_spec import ResourceAllocationSpec
+
+# row signature: (op, b, ((var id, coef), ...)) - independent of column numbering
+RowKey = tuple[str, int, tuple[tuple[str, int], ...]]
+
+
+class LinearSystem:
+    """
+    Compiled form of the spec constraints: one row per constraint,
+
+        sum_j A[i, j] * x_j  <ops[i]>  b[i]
+
+    with every variable moved to the left, every constant to the right and
+    strict inequalities tightened (see `compact_spec.linear_parts`), so
+    `ops` only holds >=, <= and =. A is stored in CSR layout (`indptr`,
+    `indices`, `data`) over the columns of `var_ids`; duplicate terms are
+    merged and zero coefficients dropped. `data` and `b` are int64 arrays, or
+    lists of ints when a number does not fit into 64 bits (see `packed`).
+    This is the common input of every solver backend.
+    """
+
+    def __init__(
+        self,
+        var_ids: list[str],
+        constraint_ids: list[str],
+        indptr: array,
+        indices: array,
+        data: array | list[int],
+        ops: list[str],
+        b: array | list[int],
+    ):
+        self.var_ids = var_ids
+        self.var_index = {vid: j for j, vid in enumerate(var_ids)}
+        self.constraint_ids = constraint_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.ops = ops
+        self.b = b
+        self._row_keys: dict[int, RowKey] = {}
+
+    @classmethod
+    def from_spec(cls, spec: ResourceAllocationSpec) -> "LinearSystem":
+        """
+        Build the system from the compact rows cached on `spec.index`; only
+        constraints that changed since an earlier version are lowered again.
+        """
+        index = spec.index
+        pool = index.pool
+        var_ids = [v.id for v in spec.vars]
+        numbers = [pool.intern(vid) for vid in var_ids]
+        rows = [index.row(c) for c in spec.constraints]
+
+        # interned var number -> column, -1 for vars the spec does not declare
+        column = [-1] * len(pool)
+        for j, n in enumerate(numbers):
+            column[n] = j
+
+        constraint_ids: list[str] = []
+        indptr = array("q", [0])
+        indices = array("q")
+        data: list[int] = []
+        ops: list[str] = []
+        b: list[int] = []
+
+        for c, row in zip(spec.constraints, rows):
+            indices.extend(map(column.__getitem__, row.var_numbers))
+            data.extend(row.coefs)
+            indptr.append(len(indices))
+            constraint_ids.append(c.id)
+            ops.append(row.op)
+            b.append(row.bound)
+        if -1 in indices:
+            n = next(n for row in rows for n in row.var_numbers if column[n] == -1)
+            raise ValueError(f"Undeclared variable in expression: '{pool.names[n]}'")
+
+        return cls(
+            var_ids, constraint_ids, indptr, indices, int_array(data), ops, int_array(b)
+        )
+
+    def __len__(self) -> int:
+        return len(self.constraint_ids)
+
+    @property
+    def packed(self) -> bool:
+        """
+        Whether every coefficient and bound is in an int64 array.
+        """
+        return isinstance(self.data, array) and isinstance(self.b, array)
+
+    def row(self, i: int) -> tuple[array, array | list[int], str, int]:
+        """
+        Columns, coefficients, operator and bound of row `i`.
+        """
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.data[start:end], self.ops[i], self.b[i]
+
+    def rows(self) -> Iterator[tuple[str, array, array | list[int], str, int]]:
+        for i, cid in enumerate(self.constraint_ids):
+            yield (cid, *self.row(i))
+
+    def row_key(self, i: int) -> RowKey:
+        key = self._row_keys.get(i)
+        if key is None:
+            key = self._row_keys[i] = self._make_row_key(i)
+        return key
+
+    def to_scipy(self):
+        """
+        A as a scipy.sparse CSR array (requires scipy).
+        """
+        from scipy.sparse import csr_array
+
+        return csr_array(
+            (self.data, self.indices, self.indptr),
+            shape=(len(self), len(self.var_ids)),
+        )
+
+    def _make_row_key(self, i: int) -> RowKey:
+        cols, coefs, op, bound = self.row(i)
+        return (op, bound, tuple((self.var_ids[j], a) for j, a in zip(cols, coefs)))
+
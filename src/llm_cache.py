@@ -0,0 +1,168 @@
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from typing import Any, Optional
+import xxhash
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import ChatGeneration
+from pydantic import BaseModel
+from content_hash import hex_digest
+
+LLM_CACHE_TTL_S = 7 * 24 * 3600
+LLM_CACHE_MAXSIZE = 4096
+# how long a write waits on another process holding the file's lock
+LLM_CACHE_BUSY_TIMEOUT_S = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+# one connection per cache file, shared by its namespaces behind one lock
+_files: dict[str, tuple[sqlite3.Connection, threading.Lock]] = {}
+_files_lock = threading.Lock()
+
+
+def _connect(path: Optional[str]) -> tuple[sqlite3.Connection, threading.Lock]:
+    """
+    Connection and lock for `path`; each in-memory cache gets its own.
+    Connections are usable from any thread, since graph nodes may run on
+    worker threads, and only ever used under their lock.
+    """
+    if path is None:
+        return _open(":memory:"), threading.Lock()
+    path = os.path.abspath(path)
+    with _files_lock:
+        if path not in _files:
+            conn = _open(path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            _files[path] = (conn, threading.Lock())
+        return _files[path]
+
+
+def _open(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=LLM_CACHE_BUSY_TIMEOUT_S, check_same_thread=False)
+    conn.execute(_SCHEMA)
+    conn.commit()
+    return conn
+
+
+def prompt_key(prompt: str, llm_string: str) -> str:
+    """
+    Cache key of one model call: the model configuration and the serialized
+    prompt with whitespace runs collapsed, so re-indented templates and
+    stray spaces in user text still hit.
+    """
+    normalized = " ".join(prompt.split())
+    return hex_digest(xxhash.xxh3_128_intdigest(f"{llm_string}\x1e{normalized}".encode()))
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Exact-match LangChain cache in a SQLite file (in memory by default),
+    passed to a chat model as `cache=`. Each prompt template gets its own
+    `namespace`, so several models can share one file and be cleared apart.
+    Entries expire `ttl_s` seconds after they are written; past `maxsize`
+    entries per namespace, the least recently used are evicted. Caches on
+    one file share its connection; other processes on the file are waited
+    on for up to `LLM_CACHE_BUSY_TIMEOUT_S`.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        path: Optional[str] = None,
+        ttl_s: Optional[float] = LLM_CACHE_TTL_S,
+        maxsize: int = LLM_CACHE_MAXSIZE,
+    ):
+        self.namespace = namespace
+        self.ttl_s = ttl_s
+        self.maxsize = maxsize
+        self._conn, self._lock = _connect(path)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = prompt_key(prompt, llm_string)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl_s is not None and now - created_at > self.ttl_s:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET used_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", LangChainBetaWarning)
+            return loads(value)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = prompt_key(prompt, llm_string)
+        value = dumps([_storable(g) for g in return_val])
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, value, now, now),
+            )
+            self._conn.execute(
+                """
+                DELETE FROM llm_cache WHERE namespace = ? AND key IN (
+                    SELECT key FROM llm_cache WHERE namespace = ?
+                    ORDER BY used_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.namespace, self.namespace, self.maxsize),
+            )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache WHERE namespace = ?", (self.namespace,))
+
+    def __bool__(self) -> bool:
+        # chat models skip a falsy cache, and an empty one would be falsy via __len__
+        return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM llm_cache WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+        return count
+
+
+def _storable(generation):
+    """
+    Structured output keeps the parsed Pydantic object on the message, which
+    does not serialize; store its dict instead, which the parser also accepts.
+    """
+    if not isinstance(generation, ChatGeneration):
+        return generation
+    parsed = generation.message.additional_kwargs.get("parsed")
+    if not isinstance(parsed, BaseModel):
+        return generation
+    additional_kwargs = {
+        **generation.message.additional_kwargs,
+        "parsed": parsed.model_dump(mode="json"),
+    }
+    message = generation.message.model_copy(update={"additional_kwargs": additional_kwargs})
+    return ChatGeneration(message=message, generation_info=generation.generation_info)
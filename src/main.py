@@ -1,5 +1,15 @@
+import asyncio
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
 from enum import Enum
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    AIMessage,
+    AIMessageChunk,
+    SystemMessage,
+)
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.chat_models import init_chat_model
 from langgraph.checkpoint.memory import MemorySaver
@@ -8,14 +18,19 @@ from langgraph.graph.message import add_messages
 from typing import Sequence
 from typing_extensions import Annotated, TypedDict
 from langchain_core.tools import tool
-from apply_spec_change import apply_change
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
 from controller_output import ControllerLLMOutput, Intent
 from controller_prompt import controller_prompt_template
 from resource_allocation_spec import ResourceAllocationSpec, SpecChangeEvent, init_spec
-from typing import Optional, Any, Literal
+from typing import Optional, Any, Literal, TextIO
 import json
+import os
 from pydantic import BaseModel
 from parser_output import ParsingLLMOutput
+from instruction_parser import order_changes, parse_instructions
+from intent_classifier import classify_intent
+from llm_cache import SQLiteLLMCache
 from parser_prompt import parser_prompt_template
 from datetime import datetime, timezone
 from interpreter_prompt import interpreter_prompt_template
@@ -25,8 +40,11 @@ from explain_solver_prompt import (
     unsat_explain_solver_prompt_template,
 )
 from explain_spec_prompt import explain_spec_prompt_template
-from spec_compiler import SpecCompiler
-from z3 import sat, unsat, Z3_INT_SORT
+from solver_backend import SolverRouter, SOLVE_TIMEOUT_MS
+from solver_cache import SolverResultCache, spec_hash
+from solver_output import SolverResult
+from spec_diff import SpecDiff, describe_constraint
+from spec_event_store import SpecEventStore
 
 # import logging
 # logging.basicConfig(level=logging.DEBUG)
@@ -44,18 +62,9 @@ class CurrentUpdateRequest(TypedDict):
     turn_index: int
 
 
-class SolverResult(TypedDict):
-    spec_version: int
-    result: Optional[Literal["SAT", "UNSAT"]]
-    assignments: Optional[list[str]]
-    unsat_constraints_ids: Optional[list[str]]
-    explanation: str
-
-
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
-    spec_change_events: list[SpecChangeEvent]
-    last_applied_change_index: int
+    spec_change_events: list[SpecChangeEvent]  # this turn's events; history is in the spec store
     current_spec: ResourceAllocationSpec
     current_intent: Intent
     current_update_request: Optional[CurrentUpdateRequest]
@@ -67,16 +76,32 @@ class AgentState(TypedDict):
 # ============================= CONTROLLER LLM =================================
 # ==============================================================================
 
+# every model answers repeated prompts from a cache namespaced by its prompt
+# template; set LLM_CACHE_PATH to keep it in a SQLite file across sessions
+llm_cache_path = os.environ.get("LLM_CACHE_PATH")
+
 controller_model = init_chat_model(
-    "gpt-5-2025-08-07", model_provider="openai"
+    "gpt-5-2025-08-07",
+    model_provider="openai",
+    cache=SQLiteLLMCache("controller", llm_cache_path),
 ).with_structured_output(ControllerLLMOutput)
 
 
 def controller_llm_node(state: AgentState) -> AgentState:
-    controller_chain = controller_prompt_template | controller_model
-    response: ControllerLLMOutput = controller_chain.invoke(
-        {"messages": state.get("messages", [])}
-    )
+    messages = state.get("messages", [])
+
+    # command-like messages skip the LLM; answers to a clarifying question never do
+    response: Optional[ControllerLLMOutput] = None
+    if (
+        state.get("current_intent") != Intent.CLARIFY
+        and messages
+        and isinstance(messages[-1], HumanMessage)
+    ):
+        response = classify_intent(messages[-1].content)
+
+    if response is None:
+        controller_chain = controller_prompt_template | controller_model
+        response = controller_chain.invoke({"messages": messages})
 
     if response.intent == Intent.UNSUPPORTED_REQUEST:
         reply = response.reply if response.reply else "Unsupported, sorry."
@@ -94,6 +119,23 @@ def controller_llm_node(state: AgentState) -> AgentState:
             "current_update_request": {},
         }
 
+    if response.intent == Intent.ALTERNATIVES:
+        return {
+            "current_intent": response.intent,
+            "current_update_request": {},
+            "info": {
+                **state.get("info", {}),
+                "alternatives_count": response.alternatives_count,
+            },
+        }
+
+    if response.intent in [Intent.UNDO, Intent.REDO, Intent.GOTO_VERSION]:
+        return {
+            "current_intent": response.intent,
+            "current_update_request": {},
+            "info": {**state.get("info", {}), "target_version": response.target_version},
+        }
+
     if response.intent == Intent.UPDATE_SPEC:
         return {
             "current_intent": response.intent,
@@ -118,7 +160,10 @@ def controller_llm_node(state: AgentState) -> AgentState:
 
 
 interpreter_model = init_chat_model(
-    "gpt-5-2025-08-07", model_provider="openai", temperature=0
+    "gpt-5-2025-08-07",
+    model_provider="openai",
+    temperature=0,
+    cache=SQLiteLLMCache("interpreter", llm_cache_path),
 )
 
 
@@ -145,43 +190,46 @@ def interpreter_llm_node(state: AgentState) -> AgentState:
 # TODO: try -> model="gpt-5-reasoning", temperature=0, reasoning={"effort": "high"}
 
 parser_model = init_chat_model(
-    "gpt-5-2025-08-07", model_provider="openai", temperature=0
+    "gpt-5-2025-08-07",
+    model_provider="openai",
+    temperature=0,
+    cache=SQLiteLLMCache("parser", llm_cache_path),
 ).with_structured_output(ParsingLLMOutput)
 
 
-def parser_llm_node(state: AgentState) -> AgentState:
+def parser_llm_node(state: AgentState, config: RunnableConfig) -> AgentState:
     """
-    Stateless NL to IR using a strict prompt.
+    Instructions to IR: the local grammar first, the strict-prompt LLM only
+    for the instructions the grammar does not cover.
     """
-    update_instructions = (
-        state.get("current_update_request", {}).get("instructions", "").split(",")
-    )
+    instructions = state.get("current_update_request", {}).get("instructions", "")
+    changes, leftover = parse_instructions(instructions)
     # TODO: handle empty instructions
 
-    prompt = parser_prompt_template.format_messages(
-        user_instructions=update_instructions,
-        no_of_instrunctions=len(update_instructions),
-    )
-    response: ParsingLLMOutput = parser_model.invoke(prompt)
+    if leftover:
+        prompt = parser_prompt_template.format_messages(
+            user_instructions=leftover,
+            no_of_instrunctions=len(leftover),
+        )
+        response: ParsingLLMOutput = parser_model.invoke(prompt)
+        changes = order_changes(changes + response.changes)
 
-    # parser_model outputs [SpecChangeEvent]
-    # append to current list
+    # parsed changes -> [SpecChangeEvent]
     # GOTO: UpdateSpecNode
 
     utc_now = datetime.now(timezone.utc)
-    id = len(state.get("spec_change_events", [])) + 1
+    id = get_spec_store(state, config).next_event_id
 
-    for c in response.changes:
+    # only this turn's events live in the graph state
+    state["spec_change_events"] = []
+    for c in changes:
         new_event = SpecChangeEvent(
             event_id=id,
             timestamp=utc_now,
             change_type=c.change_type,
             change_payload=c.change_payload,
         )
-        if state.get("spec_change_events", None):
-            state["spec_change_events"].append(new_event)
-        else:
-            state["spec_change_events"] = [new_event]
+        state["spec_change_events"].append(new_event)
 
         id += 1
 
@@ -191,22 +239,54 @@ def parser_llm_node(state: AgentState) -> AgentState:
 # ==============================================================================
 # ========================= APPLY SPEC CHANGE ==================================
 # ==============================================================================
-def apply_spec_change_node(state: AgentState) -> AgentState:
-    # get last change(s)
-    last_index = state.get("last_applied_change_index", -1)
-    changes = state.get("spec_change_events", [])[last_index + 1 :]
+# event log with snapshots per conversation thread, kept outside the graph state
+spec_stores: dict[str, SpecEventStore] = {}
+
 
-    # get current spec
-    new_spec = state.get("current_spec", init_spec)
+def get_spec_store(state: AgentState, config: RunnableConfig) -> SpecEventStore:
+    thread_id = config.get("configurable", {}).get("thread_id", "")
+    spec = state.get("current_spec", init_spec)
+    store = spec_stores.get(thread_id)
+    if store is None or store.head.version != spec.version:
+        # new thread, or state restored from elsewhere: start history there;
+        # every thread gets its own copy of the shared initial spec (and index)
+        if spec is init_spec:
+            spec = init_spec.model_copy()
+            spec._index = None
+        store = spec_stores[thread_id] = SpecEventStore(spec)
+    return store
+
+
+def get_current_spec(state: AgentState, config: RunnableConfig) -> ResourceAllocationSpec:
+    """
+    The state's spec as the thread's store holds it. The checkpointer hands
+    every turn a fresh copy without the index; the store's head keeps it, with
+    its content hash and compact rows, so they are not rebuilt per turn.
+    """
+    return get_spec_store(state, config).head
 
-    # apply change(s)
-    for change in changes:
-        new_spec = apply_change(new_spec, change)
-        # last_index += 1
+
+def apply_spec_change_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    # get this turn's change(s)
+    changes = state.get("spec_change_events", [])
+
+    # apply the turn's change(s) as one batch (one version) and log them
+    new_spec, outcomes = get_spec_store(state, config).apply(changes)
 
     return {
         "current_spec": new_spec,
-        # "last_applied_change_index": last_index,
+        # net structural change of the turn, the constraints removed along
+        # with resources/locations and the changes that were refused
+        "info": {
+            **state.get("info", {}),
+            "spec_diff": SpecDiff.merge(o["diff"] for o in outcomes).describe(),
+            "dropped_constraints": [c for o in outcomes for c in o["dropped"]],
+            "rejected_changes": [
+                f"{change.change_type.value}: {o['reason']}"
+                for change, o in zip(changes, outcomes)
+                if o["status"] == "rejected"
+            ],
+        },
     }
 
 
@@ -215,7 +295,9 @@ def apply_spec_change_node(state: AgentState) -> AgentState:
 # ==============================================================================
 
 change_summarizer_model = init_chat_model(
-    "gpt-5-mini-2025-08-07", model_provider="openai"
+    "gpt-5-mini-2025-08-07",
+    model_provider="openai",
+    cache=SQLiteLLMCache("change_summarizer", llm_cache_path),
 )
 
 
@@ -223,31 +305,35 @@ def change_summarizer_llm_node(state: AgentState) -> AgentState:
     """
     Stateless: changes -> NL
     """
-    # assuming all changes were applied successfully in "apply_spec_change_node"
-    last_index = state.get("last_applied_change_index", -1)
-    changes = state.get("spec_change_events", [])[last_index + 1 :]
-
-    prompt = change_summarizer_prompt_template.format_messages(changes=changes)
+    # the compact diff computed in "apply_spec_change_node", not the raw events
+    info = state.get("info", {})
+    dropped = info.get("dropped_constraints", [])
+    prompt = change_summarizer_prompt_template.format_messages(
+        changes=info.get("spec_diff", "no changes"),
+        dropped="\n".join(describe_constraint(c) for c in dropped) or "none",
+        rejected="\n".join(info.get("rejected_changes", [])) or "none",
+    )
     response = change_summarizer_model.invoke(prompt)
 
-    last_index = last_index + len(changes)
-
     return {
         "messages": [AIMessage(content=response.content)],
-        "last_applied_change_index": last_index,
     }
 
 
 # ==============================================================================
 # =========================== EXPLAIN SPEC LLM =================================
 # ==============================================================================
-explain_spec_model = init_chat_model("gpt-5-mini-2025-08-07", model_provider="openai")
+explain_spec_model = init_chat_model(
+    "gpt-5-mini-2025-08-07",
+    model_provider="openai",
+    cache=SQLiteLLMCache("explain_spec", llm_cache_path),
+)
 
 
 def explain_spec_llm_node(state: AgentState) -> AgentState:
     spec = state.get("current_spec", init_spec)
     prompt = explain_spec_prompt_template.format_messages(spec=spec)
-    response = explain_solver_model.invoke(prompt)
+    response = explain_spec_model.invoke(prompt)
     explanation = response.content
 
     return {
@@ -258,7 +344,30 @@ def explain_spec_llm_node(state: AgentState) -> AgentState:
 # ==============================================================================
 # =============================== SOLVER =======================================
 # ==============================================================================
-def solver_node(state: AgentState) -> AgentState:
+# one backend router (holding a long-lived Z3 solver) per conversation thread
+solver_routers: dict[str, SolverRouter] = {}
+
+# solver outcomes shared by all threads, keyed by canonical spec hash
+solver_result_cache = SolverResultCache(path=os.environ.get("SOLVER_CACHE_DIR"))
+
+# per-solve limits: a spec Z3 cannot decide in time yields an UNKNOWN result
+solver_timeout_ms = int(os.environ.get("SOLVER_TIMEOUT_MS", SOLVE_TIMEOUT_MS))
+solver_memory_mb = int(os.environ.get("SOLVER_MEMORY_MB", 0)) or None
+
+
+def get_solver_router(config: RunnableConfig) -> SolverRouter:
+    thread_id = config.get("configurable", {}).get("thread_id", "")
+    router = solver_routers.get(thread_id)
+    if router is None:
+        router = solver_routers[thread_id] = SolverRouter(
+            max_workers=os.cpu_count() or 1,
+            timeout_ms=solver_timeout_ms,
+            memory_mb=solver_memory_mb,
+        )
+    return router
+
+
+def solver_node(state: AgentState, config: RunnableConfig) -> AgentState:
     # get spec from state
     spec = state.get("current_spec", None)
 
@@ -269,49 +378,32 @@ def solver_node(state: AgentState) -> AgentState:
                 "explanation": "no constraints or requirements to solve.",
             }
         }
+    spec = get_current_spec(state, config)
 
-    # compile into solver instance
-    compiler = SpecCompiler()
-    solver = compiler.compile(spec)
-
-    # run get model or unsat core
-    result = solver.check()
-
-    if result == sat:
-        model = solver.model()
-        assignments = []
-        for d in model.decls():
-            val = model[d]
-            # filter out tracking literals (sort=bool)
-            if val.sort().kind() == Z3_INT_SORT:
-                assignments.append(f"{d.name()} = {val}")
-        return {
-            "solver_result": {
-                "spec_version": spec.version,
-                "result": "SAT",
-                "assignments": assignments,
-            }
-        }
+    # identical spec solved before (any version, any thread)
+    cache_key = spec_hash(spec)
+    cached = solver_result_cache.get(cache_key)
+    if cached is not None:
+        return {"solver_result": {**cached, "spec_version": spec.version}}
 
-    elif result == unsat:
-        unsat_core = solver.unsat_core()
+    # pick a backend for this spec and solve
+    solver_result = get_solver_router(config).solve(spec)
 
-        return {
-            "solver_result": {
-                "spec_version": spec.version,
-                "result": "UNSAT",
-                "unsat_constraints_ids": [c.decl().name() for c in unsat_core],
-            }
-        }
-    else:
-        raise ValueError(f"unknown result: {result}")
+    # undecided and best-so-far results depend on timing; only cache proven ones
+    if solver_result["result"] != "UNKNOWN" and solver_result.get("optimal", True):
+        solver_result_cache.put(cache_key, solver_result)
+    return {"solver_result": solver_result}
     # GOTO: explain_solver_llm_node
 
 
 # ==============================================================================
 # ========================== EXPLAIN SOLVER LLM ================================
 # ==============================================================================
-explain_solver_model = init_chat_model("gpt-5-mini-2025-08-07", model_provider="openai")
+explain_solver_model = init_chat_model(
+    "gpt-5-mini-2025-08-07",
+    model_provider="openai",
+    cache=SQLiteLLMCache("explain_solver", llm_cache_path),
+)
 
 
 def explain_solver_llm_node(state: AgentState) -> AgentState:
@@ -335,7 +427,11 @@ def explain_solver_llm_node(state: AgentState) -> AgentState:
         explanation = response.content
 
     elif r == "UNSAT" and solver_result.get("unsat_constraints_ids"):
-        conflict_ids = solver_result.get("unsat_constraints_ids")
+        # every minimal core (they are disjoint), or the single reported one
+        cores = solver_result.get("unsat_cores") or [
+            solver_result.get("unsat_constraints_ids")
+        ]
+        conflict_ids = {cid for core in cores for cid in core}
         constraints = state.get("current_spec", {}).constraints
         conflicted_constraints = [c for c in constraints if c.id in conflict_ids]
 
@@ -345,13 +441,122 @@ def explain_solver_llm_node(state: AgentState) -> AgentState:
         response = explain_solver_model.invoke(prompt)
         explanation = response.content
 
+    elif r == "UNKNOWN":
+        explanation = (
+            "The solver could not decide whether the requirements can be met "
+            f"within its limits ({solver_result.get('reason_unknown', 'unknown')}, "
+            f"{solver_result.get('elapsed_ms', '?')} ms). "
+            "Try simplifying or removing some constraints."
+        )
+
     # GOTO: END
     return {
         "messages": [AIMessage(content=explanation)],
-        "solver_result": {"explanation": explanation},
+        # keep the outcome so later explain requests can reuse it
+        "solver_result": {**solver_result, "explanation": explanation},
     }
 
 
+# ==============================================================================
+# ============================= ALTERNATIVES ===================================
+# ==============================================================================
+# allocations offered when the user does not say how many they want
+DEFAULT_ALTERNATIVES = 3
+MAX_ALTERNATIVES = 10
+
+
+def alternatives_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    """
+    Find up to K distinct allocations and explain each one as soon as the
+    solver produces it; every explanation is also streamed as a custom event
+    ({"alternative": i, "text": ...}) so the first option shows immediately.
+    """
+    spec = get_current_spec(state, config)
+    count = state.get("info", {}).get("alternatives_count") or DEFAULT_ALTERNATIVES
+    count = max(1, min(count, MAX_ALTERNATIVES))
+    write = get_stream_writer()
+
+    found: list[list[str]] = []
+    explanations: list[str] = []
+    pending: list[Future] = []
+
+    def publish(future: Future) -> None:
+        text = f"Option {len(explanations) + 1}:\n{future.result().content}"
+        explanations.append(text)
+        write({"alternative": len(explanations), "text": text})
+
+    # each option is explained on a worker while the solver looks for the next
+    # one; explanations are published in order, as soon as they are ready
+    router = get_solver_router(config)
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        for assignments in router.alternatives(spec, count):
+            found.append(assignments)
+            prompt = sat_explain_solver_prompt_template.format_messages(
+                resources=spec.context.resources, assignments=assignments
+            )
+            # copied context: the call stays a child of this node's run
+            pending.append(
+                pool.submit(copy_context().run, explain_solver_model.invoke, prompt)
+            )
+            while pending and pending[0].done():
+                publish(pending.pop(0))
+        for future in pending:
+            publish(future)
+
+    if not found:
+        # infeasible (or undecided): let the solver path explain why
+        return {"solver_result": {}}
+
+    # GOTO: END
+    explanation = "\n\n".join(explanations)
+    return {
+        "messages": [AIMessage(content=explanation)],
+        "solver_result": {
+            "spec_version": spec.version,
+            "result": "SAT",
+            "assignments": found[0],
+            "alternatives": found,
+            "backend": router.z3.name,
+            "explanation": explanation,
+        },
+    }
+
+
+
+# ==============================================================================
+# =============================== HISTORY ======================================
+# ==============================================================================
+def history_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    """
+    Undo / redo / go to a version through the spec store (no LLM, no replay of
+    the pipeline). The restored spec gets its solver result back from the
+    result cache when it was solved before.
+    """
+    store = get_spec_store(state, config)
+    match state.get("current_intent"):
+        case Intent.UNDO:
+            spec, missing = store.undo(), "There is no earlier change to undo."
+        case Intent.REDO:
+            spec, missing = store.redo(), "There is no undone change to redo."
+        case _:
+            target = state.get("info", {}).get("target_version")
+            missing = f"Version {target} of the plan is not available."
+            try:
+                spec = store.goto(target) if target is not None else None
+            except KeyError:
+                spec = None
+
+    if spec is None:
+        return {"messages": [AIMessage(content=missing)]}
+
+    # GOTO: END
+    cached = solver_result_cache.get(spec_hash(spec))
+    return {
+        "messages": [AIMessage(content=f"Restored the plan as of version {spec.version}.")],
+        "current_spec": spec,
+        "solver_result": {**cached, "spec_version": spec.version} if cached else {},
+    }
+
 # ******************************************************************************
 # ============================= GRAPH WIRING ===================================
 # ******************************************************************************
@@ -368,6 +573,8 @@ class NodeName(str, Enum):
     EXPLAIN_SPEC_LLM = "explain_spec_llm"
     SOLVER = "solver"
     EXPLAIN_SOLVER_LLM = "explain_solver_llm"
+    ALTERNATIVES = "alternatives"
+    HISTORY = "history"
 
 
 workflow.add_node(NodeName.CONTROLLER_LLM, controller_llm_node)
@@ -378,6 +585,8 @@ workflow.add_node(NodeName.CHANGE_SUMMARIZER, change_summarizer_llm_node)
 workflow.add_node(NodeName.EXPLAIN_SPEC_LLM, explain_spec_llm_node)
 workflow.add_node(NodeName.SOLVER, solver_node)
 workflow.add_node(NodeName.EXPLAIN_SOLVER_LLM, explain_solver_llm_node)
+workflow.add_node(NodeName.ALTERNATIVES, alternatives_node)
+workflow.add_node(NodeName.HISTORY, history_node)
 
 
 def intent_router(state: AgentState):
@@ -389,7 +598,16 @@ def intent_router(state: AgentState):
         case Intent.SOLVE:
             return NodeName.SOLVER
         case Intent.EXPLAIN_SOLVER:
+            # re-solve (usually a cache hit) when the result is for an older spec
+            spec = state.get("current_spec", init_spec)
+            solver_result = state.get("solver_result", {})
+            if solver_result.get("spec_version") != spec.version:
+                return NodeName.SOLVER
             return NodeName.EXPLAIN_SOLVER_LLM
+        case Intent.ALTERNATIVES:
+            return NodeName.ALTERNATIVES
+        case Intent.UNDO | Intent.REDO | Intent.GOTO_VERSION:
+            return NodeName.HISTORY
         case Intent.CLARIFY | Intent.GREET | Intent.UNSUPPORTED_REQUEST:
             return END
         case _:
@@ -400,28 +618,144 @@ workflow.add_edge(START, NodeName.CONTROLLER_LLM)
 workflow.add_conditional_edges(NodeName.CONTROLLER_LLM, intent_router)
 workflow.add_edge(NodeName.INTERPRETER_LLM, NodeName.PARSER_LLM)
 workflow.add_edge(NodeName.PARSER_LLM, NodeName.APPLY_SPEC_CHANGE)
-workflow.add_edge(NodeName.APPLY_SPEC_CHANGE, NodeName.CHANGE_SUMMARIZER)
 workflow.add_edge(NodeName.CHANGE_SUMMARIZER, END)
 workflow.add_edge(NodeName.SOLVER, NodeName.EXPLAIN_SOLVER_LLM)
 workflow.add_edge(NodeName.EXPLAIN_SOLVER_LLM, END)
 workflow.add_edge(NodeName.EXPLAIN_SPEC_LLM, END)
+workflow.add_edge(NodeName.HISTORY, END)
+
+
+# solve every new version of the spec along with the change summary
+auto_solve = os.environ.get("AUTO_SOLVE", "") not in ("", "0")
+
+
+def apply_router(state: AgentState):
+    """
+    Summarize the turn's changes and, with AUTO_SOLVE, solve the new spec at
+    the same time (the branches write disjoint state keys). The solver's
+    explanation follows once both are done.
+    """
+    spec = state.get("current_spec", init_spec)
+    solved = state.get("solver_result", {}).get("spec_version") == spec.version
+    if auto_solve and not solved:
+        return [NodeName.CHANGE_SUMMARIZER, NodeName.SOLVER]
+    return [NodeName.CHANGE_SUMMARIZER]
+
+
+workflow.add_conditional_edges(
+    NodeName.APPLY_SPEC_CHANGE,
+    apply_router,
+    [NodeName.CHANGE_SUMMARIZER, NodeName.SOLVER],
+)
+
+
+def alternatives_router(state: AgentState):
+    if state.get("solver_result", {}).get("alternatives"):
+        return END
+    return NodeName.SOLVER
+
+
+workflow.add_conditional_edges(NodeName.ALTERNATIVES, alternatives_router)
 
 # ============================= APP & MEMORY ===================================
 memory = MemorySaver()
 app = workflow.compile(checkpointer=memory)
-config = {"configurable": {"thread_id": "abc123"}}
 
 
-while True:
-    query = input("User: ")
+# ============================== ASYNC CLI =====================================
+
+# nodes whose model output is the user-facing reply, streamed token by token
+REPLY_NODES = {
+    NodeName.CHANGE_SUMMARIZER,
+    NodeName.EXPLAIN_SPEC_LLM,
+    NodeName.EXPLAIN_SOLVER_LLM,
+}
+
+
+async def respond(query: str, thread_id: str, out: TextIO = sys.stdout) -> AgentState:
+    """
+    Run one turn of session `thread_id` and write the reply to `out` as it
+    arrives: reply-node tokens as they stream, alternatives as each one is
+    explained, anything else (greetings, clarifications, history, cache hits)
+    at the end. Sessions are independent, so several turns can run on one
+    event loop.
+    """
+    session = {"configurable": {"thread_id": thread_id}}
+    shown: list[str] = []  # replies already written, by content
+    options: list[str] = []
+    message_id = None
+    output: AgentState = {}
+    async for mode, chunk in app.astream(
+        {"messages": [HumanMessage(query)]},
+        session,
+        stream_mode=["messages", "custom", "values"],
+    ):
+        if mode == "messages":
+            token, metadata = chunk
+            # whole messages (node outputs, cache hits) come with the final state
+            if not isinstance(token, AIMessageChunk) or not token.content:
+                continue
+            if metadata.get("langgraph_node") not in REPLY_NODES:
+                continue
+            if token.id != message_id:
+                out.write("\nAI: " if message_id is not None else "AI: ")
+                message_id = token.id
+                shown.append("")
+            shown[-1] += token.content
+            out.write(token.content)
+            out.flush()
+        elif mode == "custom" and "alternative" in chunk:
+            if message_id is not None:
+                out.write("\n")
+                message_id = None
+            out.write(f"AI: {chunk['text']}\n")
+            out.flush()
+            options.append(chunk["text"])
+        elif mode == "values":
+            output = chunk
+
+    if message_id is not None:
+        out.write("\n")
+    if options:
+        shown.append("\n\n".join(options))
+
+    # this turn's replies that did not stream
+    messages = list(output.get("messages", []))
+    turn = max(
+        (i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1
+    )
+    for message in messages[turn + 1 :]:
+        if message.content in shown:
+            shown.remove(message.content)
+        else:
+            out.write(f"AI: {message.content}\n")
+    out.flush()
+    return output
 
-    if query == "QUIT" or query == "q":
-        print("...bye...")
-        break
-    if query == "DEBUG":
-        print(output["messages"])
-        continue
 
-    output = app.invoke({"messages": [HumanMessage(query)]}, config)
-    # output["messages"][-1].pretty_print()
-    print(f"AI: {output["messages"][-1].content}")
+async def repl(thread_id: str = "abc123") -> None:
+    """
+    Interactive CLI. `SESSION <name>` switches to (or starts) another
+    conversation; each keeps its own spec, history and solver.
+    """
+    outputs: dict[str, AgentState] = {}
+    while True:
+        query = await asyncio.to_thread(input, "User: ")
+
+        if query == "QUIT" or query == "q":
+            print("...bye...")
+            break
+        if query == "DEBUG":
+            print(outputs.get(thread_id, {}).get("messages"))
+            continue
+        if query.startswith("SESSION "):
+            thread_id = query.removeprefix("SESSION ").strip() or thread_id
+            print(f"...session {thread_id}...")
+            continue
+
+        outputs[thread_id] = await respond(query, thread_id)
+
+
+# solver worker processes re-import this module; only the user runs the REPL
+if __name__ == "__main__":
+    asyncio.run(repl())
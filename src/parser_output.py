@@ -8,7 +8,7 @@ class ChangeOutput(BaseModel):
         description=(
             "The kind of atomic update to apply. Choose EXACTLY one from: "
             "'add_constraint', 'remove_constraint', 'update_constraint', "
-            "'add_resource', 'remove_resource', 'add_location', 'remove_location'."
+            "'add_resource', 'remove_resource', 'add_location', 'remove_location', 'set_objectives'."
         ),
     )
     change_payload: ChangePayload = Field(
@@ -25,6 +25,7 @@ class ChangeOutput(BaseModel):
             "  - A key node with its value being the identifier of the node, AND/OR"
             "  - A key edge with its value being an object containing two keys: src (the source node) and dst (the destination node)."
             "- remove_location -> Same structure as add_location. Provide either a key node with its value being the node identifier, and/or a key edge with its value containing src and dst."
+            "- set_objectives -> The key is objectives. The value is the full list of objectives, each with sense, aggregate and optionally resource."
             "Only include the keys and values that are relevant to the chosen change_type."
         ),
     )
@@ -39,7 +40,7 @@ class ParsingLLMOutput(BaseModel):
             "Deterministic order (if multiple): "
             "1) add_resource, 2) add_location (node, then edge), "
             "3) add_constraint, 4) update_constraint, 5) remove_constraint, "
-            "6) remove_resource, 7) remove_location. "
+            "6) remove_resource, 7) remove_location, 8) set_objectives. "
         ),
     )
 
@@ -17,6 +17,7 @@ GENERAL RULES
   3) update_constraint
   4) remove_constraint
   5) remove_resource / remove_location
+  6) set_objectives
 - Do NOT invent resources, locations, edges, or variables.
 - Resource names and location names must be used exactly as given (inside double quote) in the instruction input (case and spelling). Do not normalize, rename, or alter them.
 - Variable IDs must always be in the format: resource_name[location_name].
@@ -52,6 +53,7 @@ Each change maps to one class:
 - remove_resource -> RemoveResourceChange
 - add_location -> AddLocationChange
 - remove_location -> RemoveLocationChange
+- set_objectives -> SetObjectivesChange
 
 ====================
 CONSTRAINT ENCODING
@@ -80,6 +82,15 @@ RESOURCE & LOCATION UPDATES
   - To remove a node: include the node name.
   - To remove an edge: include both source and destination.
 
+====================
+OBJECTIVES
+====================
+- set_objectives: include "objectives", the full list of objectives (it replaces existing ones).
+  - SET_OBJECTIVE <sense> <aggregate> "<resource>" -> objectives = [{{"sense": <sense>, "aggregate": <aggregate>, "resource": "<resource>"}}]
+  - Map aggregate words: "total" -> "sum", "minimum" -> "min", "maximum" -> "max".
+  - For resource "*", omit the resource key.
+  - CLEAR_OBJECTIVES -> objectives = [].
+
 ====================
 FAILURE MODE
 ====================
@@ -0,0 +1,264 @@
+from array import array
+from typing import Optional
+from compact_spec import int_array
+from linear_system import LinearSystem
+
+# row under presolve: (coefficients by column, op in {">=", "<=", "="}, bound, origins)
+Row = tuple[dict[int, int], str, int, frozenset[str]]
+
+
+class PresolveResult:
+    """
+    Reduced problem produced by `presolve`.
+
+    - `system`: remaining multi-variable rows over the original columns.
+    - `origins[i]`: ids of the spec constraints that row i was derived from.
+    - `lower`/`upper`: variable bounds by column, with `lower_origins`/
+      `upper_origins` naming the constraints each bound came from.
+    - `fixed`: columns whose lower and upper bound meet, with their value.
+    - `conflict`: constraint ids proving infeasibility, if detected early.
+    """
+
+    def __init__(
+        self,
+        system: LinearSystem,
+        origins: list[tuple[str, ...]],
+        lower: dict[int, int],
+        upper: dict[int, int],
+        lower_origins: dict[int, frozenset[str]],
+        upper_origins: dict[int, frozenset[str]],
+        fixed: dict[int, int],
+        referenced: set[int],
+        conflict: Optional[list[str]] = None,
+    ):
+        self.system = system
+        self.origins = origins
+        self.lower = lower
+        self.upper = upper
+        self.lower_origins = lower_origins
+        self.upper_origins = upper_origins
+        self.fixed = fixed
+        self.referenced = referenced
+        self.conflict = conflict
+
+    @classmethod
+    def identity(cls, system: LinearSystem) -> "PresolveResult":
+        """
+        Unreduced result: every row kept as is, no bounds.
+        """
+        return cls(
+            system,
+            [(cid,) for cid in system.constraint_ids],
+            {},
+            {},
+            {},
+            {},
+            {},
+            set(system.indices),
+        )
+
+    def value_hint(self, j: int) -> Optional[int]:
+        """
+        A feasible value for a column that no remaining row mentions.
+        """
+        if j in self.lower:
+            return self.lower[j]
+        return self.upper.get(j)
+
+
+def presolve(system: LinearSystem, max_passes: int = 16) -> PresolveResult:
+    """
+    Cheap reductions before solving:
+      - single-variable rows collapse into variable bounds,
+      - fixed variables are substituted into the remaining rows,
+      - empty, duplicate and bound-implied rows are dropped,
+      - contradicting bounds or rows are reported as a small conflict set.
+    Every derived row and bound keeps the ids of the constraints it came from,
+    so unsat cores can still be expressed in terms of the original spec.
+    """
+    state = _Presolver(system)
+    return state.run(max_passes)
+
+
+class _Presolver:
+    def __init__(self, system: LinearSystem):
+        self.system = system
+        self.lower: dict[int, int] = {}
+        self.upper: dict[int, int] = {}
+        self.lower_origins: dict[int, frozenset[str]] = {}
+        self.upper_origins: dict[int, frozenset[str]] = {}
+        self.fixed: dict[int, int] = {}
+        self.conflict: Optional[frozenset[str]] = None
+
+    def run(self, max_passes: int) -> PresolveResult:
+        rows: list[Row] = []
+        for cid, cols, coefs, op, b in self.system.rows():
+            rows.append((dict(zip(cols, coefs)), op, b, frozenset((cid,))))
+        referenced = set(self.system.indices)
+
+        # singleton rows -> bounds, fixed vars -> substitution, until stable
+        for _ in range(max_passes):
+            fixed_before = len(self.fixed)
+            remaining: list[Row] = []
+            for row in rows:
+                coefs, op, b, origins = self._substitute(row)
+                if len(coefs) > 1:
+                    remaining.append((coefs, op, b, origins))
+                elif len(coefs) == 1:
+                    ((j, a),) = coefs.items()
+                    self._tighten(j, a, op, b, origins)
+                elif not _holds(0, op, b):
+                    self.conflict = origins
+                if self.conflict is not None:
+                    return self._result([], referenced)
+            progressed = len(remaining) < len(rows)
+            rows = remaining
+            if not progressed and len(self.fixed) == fixed_before:
+                break
+
+        # drop duplicates and rows implied by bounds, detect rows bounds violate
+        kept: list[Row] = []
+        seen: set[tuple] = set()
+        for coefs, op, b, origins in rows:
+            key = (tuple(sorted(coefs.items())), op, b)
+            if key in seen:
+                continue
+            seen.add(key)
+            (lo, lo_from), (hi, hi_from) = self._activity(coefs)
+            if op in (">=", "=") and hi is not None and hi < b:
+                self.conflict = origins | hi_from
+            elif op in ("<=", "=") and lo is not None and lo > b:
+                self.conflict = origins | lo_from
+            if self.conflict is not None:
+                return self._result([], referenced)
+
+            implied_ge = lo is not None and lo >= b
+            implied_le = hi is not None and hi <= b
+            if (op == ">=" and implied_ge) or (op == "<=" and implied_le):
+                continue
+            if op == "=" and implied_ge and implied_le:
+                continue
+            kept.append((coefs, op, b, origins))
+
+        return self._result(kept, referenced)
+
+    def _substitute(self, row: Row) -> Row:
+        coefs, op, b, origins = row
+        if not any(j in self.fixed for j in coefs):
+            return row
+        reduced: dict[int, int] = {}
+        for j, a in coefs.items():
+            value = self.fixed.get(j)
+            if value is not None:
+                b -= a * value
+                origins = origins | self.lower_origins[j] | self.upper_origins[j]
+            else:
+                reduced[j] = a
+        return reduced, op, b, origins
+
+    def _tighten(self, j: int, a: int, op: str, b: int, origins: frozenset[str]) -> None:
+        if op == "=":
+            if b % a != 0:
+                self.conflict = origins
+                return
+            self._set_lower(j, b // a, origins)
+            self._set_upper(j, b // a, origins)
+        elif (op == ">=") == (a > 0):
+            self._set_lower(j, -((-b) // a), origins)  # ceil(b / a)
+        else:
+            self._set_upper(j, b // a, origins)  # floor(b / a)
+
+        if j in self.lower and j in self.upper and self.lower[j] > self.upper[j]:
+            self.conflict = self.lower_origins[j] | self.upper_origins[j]
+
+    def _set_lower(self, j: int, value: int, origins: frozenset[str]) -> None:
+        if j not in self.lower or value > self.lower[j]:
+            self.lower[j] = value
+            self.lower_origins[j] = origins
+            self._update_fixed(j)
+
+    def _set_upper(self, j: int, value: int, origins: frozenset[str]) -> None:
+        if j not in self.upper or value < self.upper[j]:
+            self.upper[j] = value
+            self.upper_origins[j] = origins
+            self._update_fixed(j)
+
+    def _update_fixed(self, j: int) -> None:
+        if j in self.lower and self.upper.get(j) == self.lower[j]:
+            self.fixed[j] = self.lower[j]
+        else:
+            self.fixed.pop(j, None)
+
+    def _activity(self, coefs: dict[int, int]):
+        """
+        Smallest and largest value of sum(a_j * x_j) under the current bounds
+        (None when unbounded), with the origins of the bounds used.
+        """
+        lo, hi = 0, 0
+        lo_from: frozenset[str] = frozenset()
+        hi_from: frozenset[str] = frozenset()
+        for j, a in coefs.items():
+            low_side = (self.lower, self.lower_origins) if a > 0 else (self.upper, self.upper_origins)
+            high_side = (self.upper, self.upper_origins) if a > 0 else (self.lower, self.lower_origins)
+            if lo is not None:
+                if j in low_side[0]:
+                    lo += a * low_side[0][j]
+                    lo_from |= low_side[1][j]
+                else:
+                    lo = None
+            if hi is not None:
+                if j in high_side[0]:
+                    hi += a * high_side[0][j]
+                    hi_from |= high_side[1][j]
+                else:
+                    hi = None
+        return (lo, lo_from), (hi, hi_from)
+
+    def _result(self, rows: list[Row], referenced: set[int]) -> PresolveResult:
+        indptr = array("q", [0])
+        indices = array("q")
+        data: list[int] = []
+        ops: list[str] = []
+        b: list[int] = []
+        origins: list[tuple[str, ...]] = []
+        for coefs, op, bound, row_origins in rows:
+            for j in sorted(coefs):
+                indices.append(j)
+                data.append(coefs[j])
+            indptr.append(len(indices))
+            ops.append(op)
+            b.append(bound)
+            origins.append(tuple(sorted(row_origins)))
+
+        reduced = LinearSystem(
+            self.system.var_ids,
+            [o[0] for o in origins],
+            indptr,
+            indices,
+            int_array(data),
+            ops,
+            int_array(b),
+        )
+        return PresolveResult(
+            reduced,
+            origins,
+            self.lower,
+            self.upper,
+            self.lower_origins,
+            self.upper_origins,
+            self.fixed,
+            referenced,
+            conflict=sorted(self.conflict) if self.conflict is not None else None,
+        )
+
+
+def _holds(value: int, op: str, b: int) -> bool:
+    match op:
+        case ">=":
+            return value >= b
+        case "<=":
+            return value <= b
+        case "=":
+            return value == b
+        case _:
+            raise ValueError(f"Unsupported operator: {op!r}")
@@ -1,7 +1,10 @@
+import re
 from enum import Enum
 from typing import Literal, Union, Annotated, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from datetime import datetime
+from content_hash import canonical_parts, constraint_hash, expr_hash, objectives_hash
+from spec_index import SpecIndex
 
 
 class Resource(BaseModel):
@@ -19,15 +22,27 @@ class Locations(BaseModel):
     nodes: list[str] = Field(description="List of location names, e.g. ['a','location_b'].")
     edges: list[Edge] = Field(description="Graph edges as a list of {src,dst} pairs")
 
+# the two parts of a VarId; resources and locations must match them
+RESOURCE_NAME = r"[a-z_][a-z0-9_]*"
+LOCATION_NAME = r"[a-z0-9_]+"
+
 VarId = Annotated[
     str,
     Field(
-        pattern=r"^[a-z_][a-z0-9_]*\[[a-z0-9_]+\]$",
+        pattern=rf"^{RESOURCE_NAME}\[{LOCATION_NAME}\]$",
         description="Variable id formatted as '<resource>[<location>]' (snake_case), e.g. 'food[a]'.",
     ),
 ]
 
 
+def is_resource_name(name: str) -> bool:
+    return re.fullmatch(RESOURCE_NAME, name) is not None
+
+
+def is_location_name(name: str) -> bool:
+    return re.fullmatch(LOCATION_NAME, name) is not None
+
+
 class VarSpec(BaseModel):
     id: VarId
     sort: Literal["int"] = Field(
@@ -53,6 +68,9 @@ class LinearExpr(BaseModel):
         default=0, description="Integer constant added to the expression."
     )
 
+    def content_hash(self) -> int:
+        return expr_hash(self)
+
 
 class Constraint(BaseModel):
     id: str = Field(
@@ -67,6 +85,30 @@ class Constraint(BaseModel):
     )
     # text: str = Field(description="Human-readable statement of the constraint")
 
+    def content_hash(self) -> int:
+        return constraint_hash(self)
+
+
+class Objective(BaseModel):
+    sense: Literal["minimize", "maximize"] = Field(
+        description="Optimization direction."
+    )
+    aggregate: Literal["sum", "min", "max"] = Field(
+        default="sum",
+        description=(
+            "How the objective terms combine: 'sum' adds them up, 'min'/'max' take the "
+            "smallest/largest term (e.g. maximize the minimum allocation)."
+        ),
+    )
+    resource: Optional[str] = Field(
+        default=None,
+        description="Use every variable of this resource as a term; omit for all resources.",
+    )
+    expr: Optional[LinearExpr] = Field(
+        default=None,
+        description="Explicit linear expression; when set, overrides 'resource'.",
+    )
+
 
 class AllocationContext(BaseModel):
     resources: list[Resource] = Field(description="Resources mentioned in the text.")
@@ -87,6 +129,10 @@ class ResourceAllocationSpec(BaseModel):
     constraints: list[Constraint] = Field(
         default_factory=list, description="Linear constraints derived from user text."
     )
+    objectives: list[Objective] = Field(
+        default_factory=list,
+        description="Optional optimization goals, in priority order (first is most important).",
+    )
     assumptions: list[str] = Field(
         default_factory=list, description="Global assumptions, e.g., non-negativity."
     )
@@ -94,6 +140,33 @@ class ResourceAllocationSpec(BaseModel):
         default="",
         description="Optional brief free-text notes for ambiguities or skipped constraints.",
     )
+    # derived lookups, never serialized; see `index`
+    _index: Optional[SpecIndex] = PrivateAttr(default=None)
+
+    @property
+    def index(self) -> SpecIndex:
+        """
+        O(1) lookups by constraint id, var id, resource, node and edge.
+        Built on first use and rebuilt if the lists were edited directly.
+        """
+        if self._index is None or not self._index.is_current(self):
+            self._index = SpecIndex(self)
+        return self._index
+
+    def content_hash(self) -> int:
+        """
+        Stable 128-bit hash of the problem: context, vars, constraints (in
+        canonical form) and objectives. List order, version, assumptions and
+        notes do not count. Kept up to date by the index as changes are
+        applied, so it costs O(1) per version after the first call.
+        """
+        return self.index.content_hash() ^ objectives_hash(self.objectives)
+
+    def __eq__(self, other: object) -> bool:
+        # the derived index never makes two specs differ
+        if not isinstance(other, ResourceAllocationSpec):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
 
 
 init_spec = ResourceAllocationSpec(
@@ -139,6 +212,10 @@ class RemoveLocationChange(BaseModel):
     node: Optional[str] = Field(None, description="Location node to remove, e.g., 'C'.")
     edge: Optional[Edge] = Field(None, description="Graph edge to remove, e.g., {src:'A', dst:'B'}.")
 
+class SetObjectivesChange(BaseModel):
+    # Replace semantics: the given list becomes the full set of objectives.
+    objectives: list[Objective] = Field(..., description="New objectives in priority order; empty list clears them.")
+
 ChangePayload = Union[
     AddConstraintChange,
     RemoveConstraintChange,
@@ -147,6 +224,7 @@ ChangePayload = Union[
     RemoveResourceChange,
     AddLocationChange,
     RemoveLocationChange,
+    SetObjectivesChange,
 ]
 
 # ================================== Change Types ========================================
@@ -159,6 +237,7 @@ class ChangeType(str, Enum):
     REMOVE_RESOURCE = "remove_resource"
     ADD_LOCATION = "add_location"
     REMOVE_LOCATION = "remove_location"
+    SET_OBJECTIVES = "set_objectives"
 
 # ================================== Change Event ========================================
 
@@ -171,30 +250,16 @@ class SpecChangeEvent(BaseModel):
 
 
 
-# =========================================================================
-
-# TODO: canonicalize
-# def canonicalize(self) -> "ResourceAllocationSpec":
-#     """
-#     Example: rewrite (x > k) as (x >= k+1). No arithmetic on symbolic rhs terms
-#     beyond shifting constants.
-#     """
-#     new_constraints: List[Constraint] = []
-#     for c in self.constraints:
-#         if c.op == ">":
-#             # lhs > rhs  =>  lhs >= rhs + 1
-#             if isinstance(c.rhs, int):
-#                 new_constraints.append(
-#                     Constraint(id=c.id, lhs=c.lhs, op=">=", rhs=c.rhs + 1)
-#                 )
-#             elif isinstance(c.rhs, LinearExpr):
-#                 rhs = c.rhs.model_copy(deep=True)
-#                 rhs.const += 1
-#                 new_constraints.append(
-#                     Constraint(id=c.id, lhs=c.lhs, op=">=", rhs=rhs)
-#                 )
-#             else:
-#                 new_constraints.append(c)
-#         else:
-#             new_constraints.append(c)
-#     return self.model_copy(update={"constraints": new_constraints})
+# ================================== Canonical Form ========================================
+
+# (terms as (var, coef) pairs, op, constant rhs) of a canonical constraint
+CanonicalKey = tuple[tuple[tuple[str, int], ...], str, int]
+
+
+def canonical_key(c: Constraint) -> CanonicalKey:
+    """
+    Id-independent identity of a constraint: equal for equivalent ways of
+    writing it, without rewriting `c` itself.
+    """
+    terms, op, bound = canonical_parts(c)
+    return (tuple(terms), op, bound)
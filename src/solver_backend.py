@@ -0,0 +1,649 @@
+import math
+import multiprocessing
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+from z3 import SolverFor, sat, unsat, unknown, set_param, Z3Exception
+from alternatives import DistanceMetric, enumerate_models
+from decompose import partition, merge_results
+from diagnosis import NO_TIMEOUT_MS, find_cores
+from linear_system import LinearSystem
+from presolve import PresolveResult, presolve
+from resource_allocation_spec import ResourceAllocationSpec, LinearExpr, Objective
+from solver_output import SolverResult
+from spec_compiler import SpecCompiler, IncrementalSpecCompiler
+
+try:  # optional MILP fast path; Z3 handles everything without it
+    import numpy as np
+    from scipy.optimize import Bounds, LinearConstraint, milp
+    from scipy.sparse import csr_array
+except ImportError:
+    milp = None
+
+
+# per-solve limit for satisfiability checks (0 = no limit)
+SOLVE_TIMEOUT_MS = 30_000
+
+# time for the second attempt with the QF_LIA tactic after an unknown (0 = no retry)
+RETRY_TIMEOUT_MS = 10_000
+
+# upper bound for optimizing specs; past it the best allocation found so far is used
+OPTIMIZE_TIMEOUT_MS = 10_000
+
+# specs with at least this many vars + constraints go to the MILP engine
+MILP_MIN_SIZE = 500
+
+# time allowed for shrinking (and enumerating) unsat cores
+CORE_BUDGET_MS = 1000
+
+# constraint count from which independent sub-problems are solved in parallel
+PARALLEL_MIN_CONSTRAINTS = 2000
+
+
+def _objective_label(o: Objective) -> str:
+    return f"{o.sense} {o.aggregate} of {o.resource or 'all resources'}"
+
+
+def _deadline(timeout_ms: int) -> Optional[float]:
+    """
+    `time.monotonic()` value `timeout_ms` from now; None for no limit (0).
+    """
+    return time.monotonic() + timeout_ms / 1000 if timeout_ms else None
+
+
+def _budget_ms(limit_ms: int, deadline: Optional[float]) -> int:
+    """
+    `limit_ms` (0 = no limit) cut to the time left before `deadline` (None =
+    no deadline). At least 1 ms once anything limits it, as 0 means no limit.
+    """
+    if deadline is None:
+        return limit_ms
+    left = max(1, int((deadline - time.monotonic()) * 1000))
+    return min(limit_ms, left) if limit_ms else left
+
+
+def _statistics(solver) -> dict[str, float]:
+    stats = solver.statistics()
+    return {key: stats.get_key_value(key) for key in stats.keys()}
+
+
+# ============================== BACKENDS =====================================
+
+
+class SolverBackend(ABC):
+    name: str
+
+    def supports(self, spec: ResourceAllocationSpec) -> bool:
+        return True
+
+    @abstractmethod
+    def solve(
+        self, spec: ResourceAllocationSpec, deadline: Optional[float] = None
+    ) -> SolverResult:
+        """
+        Solve `spec`, giving up by `deadline` (a `time.monotonic()` value) on
+        top of the backend's own limits.
+        """
+
+
+class Z3Backend(SolverBackend):
+    """
+    General SMT backend and provider of unsat cores.
+    Plain satisfiability reuses one incremental compiler across spec versions;
+    specs with objectives are optimized with z3.Optimize.
+    Unsat cores are minimized (and, with `max_cores` > 1, disjoint cores
+    enumerated) within `core_budget_ms`; `max_cores=0` reports the raw core.
+
+    Each check is limited to `timeout_ms`. When it ends undecided, the spec is
+    tried once more on a fresh QF_LIA solver for `retry_timeout_ms`, and an
+    UNKNOWN result (with Z3's reason and statistics) is returned if that fails
+    too. Optimization is limited to `optimize_timeout_ms`. A `deadline` passed
+    to `solve` caps all of these, core shrinking included, so the retry only
+    gets whatever time the first check left. `memory_mb` caps Z3's memory;
+    the limit is process-wide.
+    """
+
+    name = "z3"
+
+    def __init__(
+        self,
+        optimize_timeout_ms: int = OPTIMIZE_TIMEOUT_MS,
+        max_cores: int = 1,
+        core_budget_ms: int = CORE_BUDGET_MS,
+        timeout_ms: int = SOLVE_TIMEOUT_MS,
+        retry_timeout_ms: int = RETRY_TIMEOUT_MS,
+        memory_mb: Optional[int] = None,
+    ):
+        self.compiler = IncrementalSpecCompiler()
+        # unpresolved twin, compiled only to shrink unsat cores
+        self.diagnosis = IncrementalSpecCompiler(use_presolve=False)
+        self.optimize_timeout_ms = optimize_timeout_ms
+        self.max_cores = max_cores
+        self.core_budget_ms = core_budget_ms
+        self.timeout_ms = timeout_ms
+        self.retry_timeout_ms = retry_timeout_ms
+        if memory_mb:
+            set_param("memory_max_size", memory_mb)
+
+    def solve(
+        self, spec: ResourceAllocationSpec, deadline: Optional[float] = None
+    ) -> SolverResult:
+        if spec.objectives:
+            return self._optimize(spec, deadline)
+
+        # compile into the long-lived solver instance (only changed constraints)
+        solver = self.compiler.compile(spec)
+        solver.set("timeout", _budget_ms(self.timeout_ms, deadline) or NO_TIMEOUT_MS)
+        result = self.compiler.check()
+
+        if result == sat:
+            return {
+                "spec_version": spec.version,
+                "result": "SAT",
+                "assignments": self.compiler.assignments(solver.model()),
+                "backend": self.name,
+            }
+        elif result == unsat:
+            cores = [self.compiler.unsat_core_ids()]
+            if self.max_cores > 0:
+                cores = self._diagnose(spec, cores[0], deadline) or cores
+            return {
+                "spec_version": spec.version,
+                "result": "UNSAT",
+                "unsat_constraints_ids": cores[0],
+                "unsat_cores": cores,
+                "backend": self.name,
+            }
+
+        unknown_result: SolverResult = {
+            "spec_version": spec.version,
+            "result": "UNKNOWN",
+            "reason_unknown": solver.reason_unknown(),
+            "statistics": _statistics(solver),
+            "backend": self.name,
+        }
+        if self.retry_timeout_ms > 0 and (deadline is None or time.monotonic() < deadline):
+            retry_ms = _budget_ms(self.retry_timeout_ms, deadline)
+            return self._retry(spec, retry_ms) or unknown_result
+        return unknown_result
+
+    def _retry(self, spec: ResourceAllocationSpec, timeout_ms: int) -> Optional[SolverResult]:
+        """
+        Second attempt on a non-incremental solver using Z3's QF_LIA tactic
+        (preprocessing plus integer-arithmetic strategies the incremental
+        solver does not apply). None when it is undecided as well.
+        """
+        compiler = SpecCompiler()
+        solver = compiler.compile(spec, solver=SolverFor("QF_LIA"))
+        solver.set("timeout", timeout_ms)
+        result = solver.check()
+
+        if result == sat:
+            return {
+                "spec_version": spec.version,
+                "result": "SAT",
+                "assignments": compiler.assignments(solver.model()),
+                "backend": self.name,
+            }
+        elif result == unsat:
+            core = compiler.unsat_core_ids()
+            return {
+                "spec_version": spec.version,
+                "result": "UNSAT",
+                "unsat_constraints_ids": core,
+                "unsat_cores": [core],
+                "backend": self.name,
+            }
+        return None
+
+    def alternatives(
+        self,
+        spec: ResourceAllocationSpec,
+        k: int,
+        min_distance: int = 1,
+        metric: DistanceMetric = "hamming",
+    ) -> Iterator[list[str]]:
+        """
+        Up to `k` distinct allocations (assignments as in `solve`), yielded as
+        soon as each is found. All come from one compiled solver; every
+        allocation differs from the earlier ones by at least `min_distance`
+        over the variables the constraints mention. Objectives are ignored.
+        """
+        compiler = SpecCompiler()
+        solver = compiler.compile(spec)
+        solver.set("timeout", self.timeout_ms or NO_TIMEOUT_MS)
+
+        mentioned: set[str] = set()
+        for c in spec.constraints:
+            mentioned.update(t.var for t in c.lhs.terms)
+            if isinstance(c.rhs, LinearExpr):
+                mentioned.update(t.var for t in c.rhs.terms)
+        variables = [v for v in compiler.vars if str(v) in mentioned]
+
+        for model in enumerate_models(solver, variables, k, min_distance, metric):
+            yield compiler.assignments(model)
+
+    def _diagnose(
+        self,
+        spec: ResourceAllocationSpec,
+        raw_core: list[str],
+        deadline: Optional[float] = None,
+    ) -> list[list[str]]:
+        """
+        Minimal, pairwise disjoint cores of `spec`, starting from `raw_core`.
+        Presolved rows are guarded by all the constraints they came from, so
+        dropping a constraint there does not drop its effect exactly; cores
+        are shrunk on the unpresolved `diagnosis` compiler instead.
+        """
+        compiler = self.diagnosis
+        compiler.compile(spec)
+        seed = [compiler.literals[cid][1] for cid in dict.fromkeys(raw_core)]
+
+        cores = find_cores(
+            compiler.solver,
+            compiler.constraint_trackings,
+            max_cores=self.max_cores,
+            time_budget_ms=_budget_ms(self.core_budget_ms, deadline),
+            seed=seed,
+        )
+        return [[compiler.tracking_ids[b.decl().name()] for b in core] for core in cores]
+
+    def _optimize(
+        self, spec: ResourceAllocationSpec, deadline: Optional[float] = None
+    ) -> SolverResult:
+        compiler = SpecCompiler()
+        timeout_ms = _budget_ms(self.optimize_timeout_ms, deadline)
+        opt = compiler.compile_optimize(spec, timeout_ms=timeout_ms or None)
+        result = opt.check()
+
+        if result == unsat:
+            # objectives do not change feasibility: diagnose the constraints
+            cores = [compiler.unsat_core_ids()]
+            if self.max_cores > 0:
+                cores = self._diagnose(spec, cores[0], deadline) or cores
+            return {
+                "spec_version": spec.version,
+                "result": "UNSAT",
+                "unsat_constraints_ids": cores[0],
+                "unsat_cores": cores,
+                "backend": self.name,
+            }
+
+        # on timeout, fall back to the best allocation found so far (if any)
+        try:
+            model = opt.model()
+        except Z3Exception:
+            model = None
+        if model is None or (result == unknown and len(model) == 0):
+            return {
+                "spec_version": spec.version,
+                "result": "UNKNOWN",
+                "reason_unknown": opt.reason_unknown(),
+                "statistics": _statistics(opt),
+                "backend": self.name,
+            }
+
+        return {
+            "spec_version": spec.version,
+            "result": "SAT",
+            "assignments": compiler.assignments(model),
+            "optimal": result == sat,
+            "objective_values": [
+                f"{_objective_label(o)} = {model.eval(handle.value())}"
+                for o, handle in zip(spec.objectives, compiler.objectives)
+            ],
+            "backend": self.name,
+        }
+
+
+class MilpBackend(SolverBackend):
+    """
+    Mixed-integer linear programming backend on HiGHS (scipy.optimize.milp).
+    Runs on the presolved system; objectives are optimized lexicographically by
+    fixing each optimum before the next one. Infeasible or unbounded specs are
+    handed to `fallback`, which provides the unsat core. All HiGHS runs of one
+    solve share `time_limit_ms`, and a fallback gets only the time left of it.
+    """
+
+    name = "milp"
+
+    def __init__(
+        self, fallback: SolverBackend, time_limit_ms: int = OPTIMIZE_TIMEOUT_MS
+    ):
+        self.fallback = fallback
+        self.time_limit_ms = time_limit_ms
+
+    def supports(self, spec: ResourceAllocationSpec) -> bool:
+        if milp is None:
+            return False
+        # max-min / min-max stay linear; min-min / max-max would need binaries
+        return all(
+            o.aggregate == "sum" or (o.aggregate == "min") == (o.sense == "maximize")
+            for o in spec.objectives
+        )
+
+    def solve(
+        self, spec: ResourceAllocationSpec, deadline: Optional[float] = None
+    ) -> SolverResult:
+        own = _deadline(self.time_limit_ms)
+        if deadline is None or (own is not None and own < deadline):
+            deadline = own
+        full = LinearSystem.from_spec(spec)
+        pre = presolve(full)
+        # conflicts get their core from Z3, which also takes numbers past int64
+        if pre.conflict is not None or not (full.packed and pre.system.packed):
+            return self.fallback.solve(spec, deadline)
+
+        system = pre.system
+        n = len(system.var_ids)
+        used = set(pre.referenced)
+
+        def column(var: str) -> int:
+            j = system.var_index.get(var)
+            if j is None:
+                raise ValueError(f"Undeclared variable in objective: '{var}'")
+            used.add(j)
+            return j
+
+        # rows beyond the system: objective helpers and locked optima,
+        # as (coefficients by column, lower bound, upper bound)
+        extra_rows: list[tuple[dict[int, int], float, float]] = []
+
+        # (signed goal coefficients, sign, constant offset) per objective;
+        # min/max aggregates get an auxiliary column each
+        objectives: list[tuple[dict[int, int], int, int]] = []
+        for o in spec.objectives:
+            terms = self._objective_terms(o, spec)
+            goal: dict[int, int] = {}
+            if o.aggregate == "sum":
+                for var, coef in terms:
+                    j = column(var)
+                    goal[j] = goal.get(j, 0) + coef
+            elif terms:
+                aux = n
+                n += 1
+                for var, coef in terms:
+                    # max-min: aux <= term, min-max: aux >= term
+                    if o.aggregate == "min":
+                        extra_rows.append(({aux: 1, column(var): -coef}, -math.inf, 0))
+                    else:
+                        extra_rows.append(({aux: 1, column(var): -coef}, 0, math.inf))
+                goal[aux] = 1
+            sign = 1 if o.sense == "minimize" else -1
+            offset = o.expr.const if o.expr is not None else 0
+            objectives.append(({j: sign * v for j, v in goal.items()}, sign, offset))
+
+        if not used:
+            return self.fallback.solve(spec, deadline)
+
+        x = None
+        optimal = True
+        values: list[int] = []
+        for goal, sign, offset in objectives or [({}, 1, 0)]:
+            res = self._run(pre, extra_rows, n, goal, deadline)
+            if res.status == 2 or res.status == 3 or res.x is None:
+                # infeasible, unbounded or no incumbent: let Z3 report it
+                return self.fallback.solve(spec, deadline)
+            x = res.x
+            if res.status != 0:
+                optimal = False
+                break
+            # lock this objective at its optimum before the next one
+            value = round(res.fun)
+            extra_rows.append((goal, value, value))
+            values.append(sign * value + offset)
+
+        # HiGHS can report a point outside the column bounds as optimal
+        if not _satisfies(full, np.round(x[: len(full.var_ids)])):
+            return self.fallback.solve(spec, deadline)
+
+        assignments = [
+            f"{vid} = {round(x[j])}"
+            for j, vid in enumerate(system.var_ids)
+            if j in used
+        ]
+        result: SolverResult = {
+            "spec_version": spec.version,
+            "result": "SAT",
+            "assignments": assignments,
+            "backend": self.name,
+        }
+        if spec.objectives:
+            result["optimal"] = optimal
+            result["objective_values"] = [
+                f"{_objective_label(o)} = {v}" for o, v in zip(spec.objectives, values)
+            ]
+        return result
+
+    def _objective_terms(
+        self, o: Objective, spec: ResourceAllocationSpec
+    ) -> list[tuple[str, int]]:
+        if o.expr is not None:
+            return [(t.var, t.coef) for t in o.expr.terms]
+        prefix = f"{o.resource}[" if o.resource else ""
+        return [(v.id, 1) for v in spec.vars if v.id.startswith(prefix)]
+
+    def _run(
+        self,
+        pre: PresolveResult,
+        extra_rows: list[tuple[dict[int, int], float, float]],
+        n: int,
+        goal: dict[int, int],
+        deadline: Optional[float],
+    ):
+        # reduced rows first, then the extra rows appended to the CSR arrays
+        system = pre.system
+        indptr = np.frombuffer(system.indptr, dtype=np.int64)
+        indices = np.frombuffer(system.indices, dtype=np.int64)
+        data = np.frombuffer(system.data, dtype=np.int64)
+        lb, ub = _row_bounds(system)
+        if extra_rows:
+            tail_indptr, tail_indices, tail_data = [], [], []
+            offset = len(indices)
+            for coefs, _, _ in extra_rows:
+                tail_indices.extend(coefs.keys())
+                tail_data.extend(coefs.values())
+                tail_indptr.append(offset + len(tail_indices))
+            indptr = np.concatenate([indptr, tail_indptr])
+            indices = np.concatenate([indices, tail_indices])
+            data = np.concatenate([data, tail_data])
+            lb = np.concatenate([lb, [lo for _, lo, _ in extra_rows]])
+            ub = np.concatenate([ub, [hi for _, _, hi in extra_rows]])
+
+        c = np.zeros(n)
+        for j, v in goal.items():
+            c[j] = v
+
+        constraints = []
+        if len(lb):
+            a = csr_array((data, indices, indptr), shape=(len(lb), n))
+            constraints.append(LinearConstraint(a, lb, ub))
+        # presolved variable bounds; auxiliary columns stay free
+        col_lb = np.full(n, -np.inf)
+        col_ub = np.full(n, np.inf)
+        for j, v in pre.lower.items():
+            col_lb[j] = v
+        for j, v in pre.upper.items():
+            col_ub[j] = v
+
+        options = {}
+        if deadline is not None:
+            options["time_limit"] = _budget_ms(0, deadline) / 1000
+        return milp(
+            c,
+            constraints=constraints,
+            integrality=np.ones(n),
+            bounds=Bounds(col_lb, col_ub),
+            options=options,
+        )
+
+
+def _row_bounds(system: LinearSystem) -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    Row bounds lb <= A x <= ub for all rows at once.
+    """
+    ops = np.array(system.ops, dtype=object)
+    b = np.frombuffer(system.b, dtype=np.int64).astype(float)
+    lb = np.full(len(b), -np.inf)
+    ub = np.full(len(b), np.inf)
+
+    ge, le = ops != "<=", ops != ">="
+    lb[ge] = b[ge]
+    ub[le] = b[le]
+    return lb, ub
+
+
+def _satisfies(system: LinearSystem, x: "np.ndarray") -> bool:
+    """
+    Whether integer point `x` meets every row of `system`.
+    """
+    if not len(system):
+        return True
+    lb, ub = _row_bounds(system)
+    ax = system.to_scipy() @ x
+    return bool(np.all(ax >= lb) and np.all(ax <= ub))
+
+
+# ============================== SELECTION =====================================
+
+
+class SolverRouter:
+    """
+    Per-conversation set of backends. Each solve picks one from spec size and
+    shape: small specs stay on the incremental Z3 solver, large or optimizing
+    specs go to the MILP engine when it can express them.
+    Large specs without objectives that Z3 would get and that split into
+    independent sub-problems are solved part by part across `max_workers`
+    processes.
+    `timeout_ms` is one deadline for each whole solve, whichever backends it
+    goes through (fallbacks and core shrinking included); `memory_mb` caps
+    Z3's memory (see `Z3Backend`). Results carry the wall time spent in
+    `elapsed_ms`.
+    """
+
+    def __init__(
+        self,
+        milp_min_size: int = MILP_MIN_SIZE,
+        max_cores: int = 1,
+        core_budget_ms: int = CORE_BUDGET_MS,
+        max_workers: int = 1,
+        parallel_min_constraints: int = PARALLEL_MIN_CONSTRAINTS,
+        timeout_ms: int = SOLVE_TIMEOUT_MS,
+        memory_mb: Optional[int] = None,
+    ):
+        self.z3 = Z3Backend(
+            max_cores=max_cores,
+            core_budget_ms=core_budget_ms,
+            timeout_ms=timeout_ms,
+            memory_mb=memory_mb,
+        )
+        self.milp = MilpBackend(fallback=self.z3, time_limit_ms=timeout_ms)
+        self.timeout_ms = timeout_ms
+        self.milp_min_size = milp_min_size
+        self.max_workers = max_workers
+        self.parallel_min_constraints = parallel_min_constraints
+        # settings for the single-process routers of the worker processes
+        self.part_options = {
+            "milp_min_size": milp_min_size,
+            "max_cores": max_cores,
+            "core_budget_ms": core_budget_ms,
+            "timeout_ms": timeout_ms,
+            "memory_mb": memory_mb,
+        }
+
+    def select(self, spec: ResourceAllocationSpec) -> SolverBackend:
+        size = len(spec.vars) + len(spec.constraints)
+        if self.milp.supports(spec) and (
+            spec.objectives or size >= self.milp_min_size
+        ):
+            return self.milp
+        return self.z3
+
+    def solve(
+        self, spec: ResourceAllocationSpec, timeout_ms: Optional[int] = None
+    ) -> SolverResult:
+        """
+        Solve `spec` within `timeout_ms`, the router's own limit by default.
+        """
+        start = time.monotonic()
+        if timeout_ms is None:
+            timeout_ms = self.timeout_ms
+        result = self._solve(spec, _deadline(timeout_ms))
+        result["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+        return result
+
+    def alternatives(
+        self,
+        spec: ResourceAllocationSpec,
+        k: int,
+        min_distance: int = 1,
+        metric: DistanceMetric = "hamming",
+    ) -> Iterator[list[str]]:
+        return self.z3.alternatives(spec, k, min_distance, metric)
+
+    def _solve(
+        self, spec: ResourceAllocationSpec, deadline: Optional[float]
+    ) -> SolverResult:
+        backend = self.select(spec)
+        # the MILP engine beats process fan-out on anything it takes; only
+        # Z3-bound specs are worth splitting
+        if (
+            backend is self.z3
+            and self.max_workers > 1
+            and not spec.objectives  # objectives couple every part
+            and len(spec.constraints) >= self.parallel_min_constraints
+        ):
+            parts = partition(spec, self.max_workers)
+            if len(parts) > 1:
+                return self._solve_parallel(spec, parts, deadline)
+        return backend.solve(spec, deadline)
+
+    def _solve_parallel(
+        self,
+        spec: ResourceAllocationSpec,
+        parts: list[ResourceAllocationSpec],
+        deadline: Optional[float],
+    ) -> SolverResult:
+        executor = _get_executor(self.max_workers)
+        # parts run side by side, each within what is left of the deadline
+        timeout_ms = [_budget_ms(0, deadline)] * len(parts)
+        options = [self.part_options] * len(parts)
+        results = list(executor.map(_solve_part, parts, options, timeout_ms))
+        return merge_results(spec, results)
+
+
+# ======================= PARALLEL SOLVING =====================================
+_executor: ProcessPoolExecutor | None = None
+
+
+def _get_executor(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Shared worker pool, created on first use. Workers are started from a
+    clean interpreter rather than forked from the (multi-threaded) agent.
+    """
+    global _executor
+    if _executor is None or _executor._max_workers < max_workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in methods else "spawn"
+        )
+        _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+    return _executor
+
+
+# one router per settings in each worker process, so its incremental Z3 solver
+# carries over between the parts (and solves) the worker is given
+_worker_routers: dict[tuple, SolverRouter] = {}
+
+
+def _solve_part(
+    spec: ResourceAllocationSpec, options: dict, timeout_ms: int
+) -> SolverResult:
+    key = tuple(sorted(options.items()))
+    router = _worker_routers.get(key)
+    if router is None:
+        router = _worker_routers[key] = SolverRouter(**options)
+    return router.solve(spec, timeout_ms)
@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+from content_hash import hex_digest
+from resource_allocation_spec import ResourceAllocationSpec
+from solver_output import SolverResult
+
+# only the solver outcome is cached; version and explanation belong to the caller
+CACHED_FIELDS = (
+    "result",
+    "assignments",
+    "unsat_constraints_ids",
+    "unsat_cores",
+    "optimal",
+    "objective_values",
+)
+
+
+def spec_hash(spec: ResourceAllocationSpec) -> str:
+    """
+    Cache key of a spec: its content hash (context, vars, canonical constraints,
+    objectives). Ordering of list fields, version, assumptions and notes do not
+    affect it, so identical problems share a key across versions and threads.
+    """
+    return hex_digest(spec.content_hash())
+
+
+class SolverResultCache:
+    """
+    LRU cache of solver outcomes keyed by `spec_hash`.
+    With `path` set, entries are also written as `<path>/<key>.json` and
+    in-memory misses fall back to disk. Safe to share across threads.
+    """
+
+    def __init__(self, maxsize: int = 256, path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.path = path
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def get(self, key: str) -> Optional[SolverResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return dict(entry)
+
+        entry = self._read(key)
+        if entry is None:
+            return None
+        self._remember(key, entry)
+        return dict(entry)
+
+    def put(self, key: str, result: SolverResult) -> None:
+        entry = {k: result[k] for k in CACHED_FIELDS if k in result}
+        self._remember(key, entry)
+        self._write(key, entry)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._entries:
+                return True
+        return (
+            self.path is not None and os.path.exists(self._file(key))
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _remember(self, key: str, entry: dict) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def _read(self, key: str) -> Optional[dict]:
+        if not self.path:
+            return None
+        try:
+            with open(self._file(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key: str, entry: dict) -> None:
+        if not self.path:
+            return
+        # write-then-rename so concurrent readers never see a partial file;
+        # the temp name is unique per writer, not just per process
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self.path, suffix=".tmp", delete=False
+        ) as f:
+            json.dump(entry, f)
+        try:
+            os.replace(f.name, self._file(key))
+        except OSError:
+            os.unlink(f.name)
+            raise
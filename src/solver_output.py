@@ -0,0 +1,18 @@
+from typing import Optional, Literal
+from typing_extensions import TypedDict
+
+
+class SolverResult(TypedDict):
+    spec_version: int
+    result: Optional[Literal["SAT", "UNSAT", "UNKNOWN"]]
+    assignments: Optional[list[str]]
+    unsat_constraints_ids: Optional[list[str]]  # first (minimal) core
+    unsat_cores: Optional[list[list[str]]]  # pairwise disjoint cores
+    alternatives: Optional[list[list[str]]]  # distinct allocations, first = assignments
+    optimal: Optional[bool]  # only set when the spec has objectives
+    objective_values: Optional[list[str]]
+    backend: Optional[str]  # solver backend that produced the result
+    reason_unknown: Optional[str]  # why Z3 gave up (timeout, memory, ...)
+    statistics: Optional[dict[str, float]]  # Z3 statistics of an UNKNOWN check
+    elapsed_ms: Optional[int]
+    explanation: str
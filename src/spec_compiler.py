@@ -1,5 +1,31 @@
-from z3 import Solver, Int, Bool, Sum, IntVal, BoolRef, ArithRef
-from resource_allocation_spec import ResourceAllocationSpec, Constraint, LinearExpr
+from typing import Optional
+from z3 import (
+    Solver,
+    Optimize,
+    OptimizeObjective,
+    Or,
+    Int,
+    Bool,
+    Sum,
+    IntVal,
+    BoolRef,
+    ArithRef,
+    CheckSatResult,
+    Implies,
+    And,
+    ModelRef,
+    unsat,
+    is_int_value,
+)
+from linear_system import LinearSystem, RowKey
+from presolve import PresolveResult, presolve
+from resource_allocation_spec import (
+    Constraint,
+    ResourceAllocationSpec,
+    LinearExpr,
+    Objective,
+    Term,
+)
 
 
 class SpecCompiler:
@@ -8,8 +34,59 @@ class SpecCompiler:
         self.vars: list[ArithRef] = []
         self.constraint_trackings: list[BoolRef] = []
         self.constraint_expressions: list[BoolRef] = []
+        self.objectives: list[OptimizeObjective] = []
 
-    def compile(self, spec: ResourceAllocationSpec) -> Solver:
+    def compile(
+        self, spec: ResourceAllocationSpec, solver: Optional[Solver] = None
+    ) -> Solver:
+        """
+        Compile into `solver` (a fresh default Z3 solver when omitted).
+        """
+        return self._compile_into(solver if solver is not None else Solver(), spec)
+
+    def compile_optimize(
+        self, spec: ResourceAllocationSpec, timeout_ms: Optional[int] = None
+    ) -> Optimize:
+        """
+        Compile into a Z3 Optimize instance with the spec objectives in priority
+        (lexicographic) order. With `timeout_ms`, `check()` returns unknown on
+        timeout and `model()` holds the best allocation found so far.
+        """
+        opt = self._compile_into(Optimize(), spec)
+        if timeout_ms is not None:
+            opt.set("timeout", timeout_ms)
+
+        var_dict = {str(v): v for v in self.vars}
+        for i, objective in enumerate(spec.objectives):
+            goal = self._create_objective_expression(i, objective, var_dict, opt)
+            if objective.sense == "minimize":
+                self.objectives.append(opt.minimize(goal))
+            else:
+                self.objectives.append(opt.maximize(goal))
+
+        return opt
+
+    def assignments(self, model: ModelRef) -> list[str]:
+        """
+        Format model values of the compiled spec's variables, e.g. 'food[a] = 3'.
+        Variables left unconstrained by the model are skipped.
+        """
+        assignments = []
+        for v in self.vars:
+            val = model.eval(v, model_completion=False)
+            if is_int_value(val):
+                assignments.append(f"{v} = {val}")
+        return assignments
+
+    def unsat_core_ids(self) -> list[str]:
+        """
+        Constraint ids of the last unsat core (tracking literals are named by id).
+        """
+        return [c.decl().name() for c in self.solver.unsat_core()]
+
+    def _compile_into(
+        self, s: Solver | Optimize, spec: ResourceAllocationSpec
+    ) -> Solver | Optimize:
         # build variables dict
         var_dict: dict[str, ArithRef] = {}
         for var in spec.vars:
@@ -20,22 +97,21 @@ class SpecCompiler:
                     f"Unsupported sort for variable '{var.id}': {var.sort}"
                 )
 
+        # lower all constraints to rows in one pass
+        system = LinearSystem.from_spec(spec)
+        columns = [var_dict[vid] for vid in system.var_ids]
+
         # build tracking literals for constraints
         # build constraint expression dict
         constraint_tracking_dict: dict[str, BoolRef] = {}
         constraint_expr_dict: dict[str, BoolRef] = {}
-        for c in spec.constraints:
-            constraint_tracking_dict[c.id] = Bool(c.id)
-            constraint_expr_dict[c.id] = self._create_constraint_expression(c, var_dict)
-
-        # instantiate solver instance
-        s = Solver()
+        for i, cid in enumerate(system.constraint_ids):
+            constraint_tracking_dict[cid] = Bool(cid)
+            constraint_expr_dict[cid] = self._create_row_expression(system, i, columns)
 
         # add allocation requirements with tracking
-        for c in spec.constraints:
-            s.assert_and_track(
-                constraint_expr_dict[c.id], constraint_tracking_dict[c.id]
-            )
+        for cid in system.constraint_ids:
+            s.assert_and_track(constraint_expr_dict[cid], constraint_tracking_dict[cid])
 
         # populate fields
         self.solver = s
@@ -66,33 +142,236 @@ class SpecCompiler:
         else:
             return IntVal(0) + IntVal(expr.const)  # IntVal(0) for consistent shape
 
-    def _create_constraint_expression(
-        self, c: Constraint, var_dict: dict[str, ArithRef]
-    ) -> BoolRef:
-        # LHS is always a LinearExpr (var or expr)
-        if isinstance(c.lhs, LinearExpr):
-            lhs = self._convert_linear_expr_to_expr_operant(c.lhs, var_dict)
+    def _create_objective_expression(
+        self,
+        index: int,
+        objective: Objective,
+        var_dict: dict[str, ArithRef],
+        opt: Optimize,
+    ) -> ArithRef:
+        """
+        Build the goal term of an objective. 'min'/'max' aggregates are modelled
+        with an auxiliary variable pinned to the smallest/largest term.
+        """
+        if objective.expr is not None:
+            expr = objective.expr
         else:
-            raise ValueError(f"Unsupported LHS for constraint {c.id}: {c.rhs!r}")
+            prefix = f"{objective.resource}[" if objective.resource else ""
+            expr = LinearExpr(
+                terms=[Term(var=vid) for vid in var_dict if vid.startswith(prefix)]
+            )
+
+        if objective.aggregate == "sum":
+            return self._convert_linear_expr_to_expr_operant(expr, var_dict)
 
-        # RHS can be an int or a LinearExpr
-        if isinstance(c.rhs, int):
-            rhs = IntVal(c.rhs)
-        elif isinstance(c.rhs, LinearExpr):
-            rhs = self._convert_linear_expr_to_expr_operant(c.rhs, var_dict)
+        terms = []
+        for t in expr.terms:
+            if t.var not in var_dict:
+                raise ValueError(f"Undeclared variable in objective: '{t.var}'")
+            terms.append(t.coef * var_dict[t.var])
+        if not terms:
+            return IntVal(expr.const)
+
+        aux = Int(f"__objective_{index}")
+        for t in terms:
+            opt.add(aux <= t if objective.aggregate == "min" else aux >= t)
+        opt.add(Or([aux == t for t in terms]))
+        return aux + IntVal(expr.const)
+
+    def _create_row_expression(
+        self, system: LinearSystem, i: int, columns: list[ArithRef]
+    ) -> BoolRef:
+        """
+        Convert row i of the linear system into a Z3 constraint:
+        sum(A[i, j] * x_j) <op> b[i]
+        """
+        cols, coefs, op, bound = system.row(i)
+        if len(cols) == 1:
+            lhs = coefs[0] * columns[cols[0]]
+        elif cols:
+            lhs = Sum([a * columns[j] for j, a in zip(cols, coefs)])
         else:
-            raise ValueError(f"Unsupported RHS for constraint {c.id}: {c.rhs!r}")
+            lhs = IntVal(0)
+        rhs = IntVal(bound)
 
-        match c.op:
+        match op:
             case ">=":
                 return lhs >= rhs
-            case ">":
-                return lhs > rhs
             case "=":
                 return lhs == rhs
             case "<=":
                 return lhs <= rhs
-            case "<":
-                return lhs < rhs
             case _:
-                raise ValueError(f"Unsupported operator in constraint {c.id}: {c.op!r}")
+                raise ValueError(
+                    f"Unsupported operator in constraint {system.constraint_ids[i]}: {op!r}"
+                )
+
+
+class IncrementalSpecCompiler(SpecCompiler):
+    """
+    Long-lived compiler that keeps a single Z3 solver across spec versions.
+
+    The spec is presolved first (see `presolve`); the reduced rows and bounds are
+    asserted once as `tracking literals of their origins -> expression`.
+    A check only assumes the tracking literals of constraints present in the
+    latest compiled spec, so removed or modified constraints are retracted by no
+    longer being assumed (a modified constraint gets a fresh literal), and only
+    new derived rows get translated.
+    Once too many retired assertions pile up, the solver is rebuilt from scratch.
+    With `use_presolve=False` every constraint is asserted as is, which keeps
+    any subset of tracking literals exactly checkable (used for diagnosis).
+    """
+
+    def __init__(self, max_retired: int = 1024, use_presolve: bool = True):
+        super().__init__()
+        self.max_retired = max_retired
+        self.use_presolve = use_presolve
+        self.solver = Solver()
+        self.var_cache: dict[str, ArithRef] = {}
+        # constraint id -> (row key, tracking literal)
+        self.literals: dict[str, tuple[RowKey, BoolRef]] = {}
+        # tracking literal name -> constraint id
+        self.tracking_ids: dict[str, str] = {}
+        # (tracking literal names, content) of everything asserted -> expression
+        self.asserted: dict[tuple, BoolRef] = {}
+        self.presolved: Optional[PresolveResult] = None
+        self.retired = 0
+        self._generation = 0
+        # constraint id -> the constraint object its literal was made for
+        self.sources: dict[str, Constraint] = {}
+
+    def compile(self, spec: ResourceAllocationSpec) -> Solver:
+        if self.retired > max(self.max_retired, len(spec.constraints)):
+            self._reset()
+
+        # reuse cached variables, only create the new ones
+        var_dict: dict[str, ArithRef] = {}
+        for var in spec.vars:
+            if var.sort != "int":
+                raise ValueError(
+                    f"Unsupported sort for variable '{var.id}': {var.sort}"
+                )
+            if var.id not in self.var_cache:
+                self.var_cache[var.id] = Int(var.id)
+            var_dict[var.id] = self.var_cache[var.id]
+
+        # one tracking literal per constraint, renewed when its row changes;
+        # constraint objects compiled before (apply_changes shares unchanged
+        # ones between versions) keep theirs without recomputing the row key
+        system = LinearSystem.from_spec(spec)
+        sources = {c.id: c for c in spec.constraints}
+        for i, cid in enumerate(system.constraint_ids):
+            cached = self.literals.get(cid)
+            if cached is not None and self.sources.get(cid) is sources[cid]:
+                continue
+            key = system.row_key(i)
+            if cached is None or cached[0] != key:
+                self.literals[cid] = (key, self._new_tracking_literal(cid))
+        for cid in [cid for cid in self.literals if cid not in sources]:
+            del self.literals[cid]
+        self.sources = sources
+
+        # populate fields
+        self.vars = [var_dict[vid] for vid in system.var_ids]
+        self.constraint_trackings = [
+            self.literals[cid][1] for cid in system.constraint_ids
+        ]
+        self.constraint_expressions = []
+
+        if self.use_presolve:
+            self.presolved = presolve(system)
+        else:
+            self.presolved = PresolveResult.identity(system)
+        if self.presolved.conflict is not None:
+            return self.solver
+
+        # assert reduced rows and the bounds of the columns they use
+        current: set[tuple] = set()
+        reduced = self.presolved.system
+        for i in range(len(reduced)):
+            origins = self.presolved.origins[i]
+            key = (self._literal_names(origins), reduced.row_key(i))
+            expr = self.asserted.get(key)
+            if expr is None:
+                expr = self._create_row_expression(reduced, i, self.vars)
+                self._assert(key, origins, expr)
+            current.add(key)
+            self.constraint_expressions.append(expr)
+
+        for j in sorted(set(reduced.indices)):
+            for bounds, origins_by_col, op in (
+                (self.presolved.lower, self.presolved.lower_origins, ">="),
+                (self.presolved.upper, self.presolved.upper_origins, "<="),
+            ):
+                if j not in bounds:
+                    continue
+                origins = tuple(sorted(origins_by_col[j]))
+                key = (self._literal_names(origins), (op, system.var_ids[j], bounds[j]))
+                expr = self.asserted.get(key)
+                if expr is None:
+                    var = self.vars[j]
+                    expr = var >= bounds[j] if op == ">=" else var <= bounds[j]
+                    self._assert(key, origins, expr)
+                current.add(key)
+                self.constraint_expressions.append(expr)
+
+        self.retired = len(self.asserted) - len(current)
+        return self.solver
+
+    def check(self) -> CheckSatResult:
+        """
+        Check the last compiled spec, assuming only its active constraints.
+        """
+        if self.presolved is not None and self.presolved.conflict is not None:
+            return unsat
+        return self.solver.check(*self.constraint_trackings)
+
+    def assignments(self, model: ModelRef) -> list[str]:
+        """
+        Values of the variables the spec constraints mention. Variables removed
+        by presolve take their fixed (or bounding) value.
+        """
+        in_rows = set(self.presolved.system.indices)
+        assignments = []
+        for j, v in enumerate(self.vars):
+            if j not in self.presolved.referenced:
+                continue
+            if j in in_rows:
+                val = model.eval(v, model_completion=True)
+            else:
+                val = self.presolved.value_hint(j)
+                if val is None:
+                    continue
+            assignments.append(f"{v} = {val}")
+        return assignments
+
+    def unsat_core_ids(self) -> list[str]:
+        """
+        Map the last unsat core back to constraint ids.
+        """
+        if self.presolved is not None and self.presolved.conflict is not None:
+            return list(self.presolved.conflict)
+        return [self.tracking_ids[b.decl().name()] for b in self.solver.unsat_core()]
+
+    def _literal_names(self, origins: tuple[str, ...]) -> tuple[str, ...]:
+        return tuple(str(self.literals[cid][1]) for cid in origins)
+
+    def _assert(self, key: tuple, origins: tuple[str, ...], expr: BoolRef) -> None:
+        trackings = [self.literals[cid][1] for cid in origins]
+        guard = trackings[0] if len(trackings) == 1 else And(trackings)
+        self.solver.add(Implies(guard, expr))
+        self.asserted[key] = expr
+
+    def _new_tracking_literal(self, constraint_id: str) -> BoolRef:
+        # first literal keeps the plain id, later revisions get a suffix
+        name = constraint_id
+        if name in self.tracking_ids:
+            self._generation += 1
+            name = f"{constraint_id}#{self._generation}"
+        self.tracking_ids[name] = constraint_id
+        return Bool(name)
+
+    def _reset(self) -> None:
+        self.solver = Solver()
+        self.asserted = {}
+        self.retired = 0
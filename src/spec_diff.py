@@ -0,0 +1,143 @@
+from typing import Any, Hashable, Iterable, Optional
+from content_hash import entity_hash
+from resource_allocation_spec import (
+    Constraint,
+    Edge,
+    LinearExpr,
+    Objective,
+    Resource,
+    VarSpec,
+)
+
+
+def fingerprint(category: str, entity: Any) -> Optional[int]:
+    """
+    Content key of a spec entity (`content_hash.entity_hash`), None for a
+    missing side; equal keys mean equal content.
+    """
+    return None if entity is None else entity_hash(category, entity)
+
+
+class SpecDiff:
+    """
+    Structural difference between two specs: per category, key -> (before,
+    after), where a None side means added or removed. Entries whose content
+    did not change are never stored, so an empty diff means equal specs
+    (objectives are compared as a whole).
+    """
+
+    def __init__(self):
+        self.entries: dict[str, dict[Hashable, tuple[Any, Any]]] = {}
+        self.objectives: Optional[tuple[list[Objective], list[Objective]]] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.entries) or self.objectives is not None
+
+    def put(self, category: str, key: Hashable, before: Any, after: Any) -> None:
+        if before is after or fingerprint(category, before) == fingerprint(category, after):
+            self.entries.get(category, {}).pop(key, None)
+            if category in self.entries and not self.entries[category]:
+                del self.entries[category]
+            return
+        self.entries.setdefault(category, {})[key] = (before, after)
+
+    def added(self, category: str) -> list:
+        return [a for b, a in self.entries.get(category, {}).values() if b is None]
+
+    def removed(self, category: str) -> list:
+        return [b for b, a in self.entries.get(category, {}).values() if a is None]
+
+    def modified(self, category: str) -> list[tuple[Any, Any]]:
+        return [
+            (b, a)
+            for b, a in self.entries.get(category, {}).values()
+            if b is not None and a is not None
+        ]
+
+    @classmethod
+    def from_journal(
+        cls,
+        journal: dict[str, dict],
+        index,
+        objectives: Optional[tuple[list[Objective], list[Objective]]] = None,
+    ) -> "SpecDiff":
+        """
+        Diff of the edits recorded by `SpecIndex.take_journal` (O(edits)).
+        """
+        diff = cls()
+        for category, originals in journal.items():
+            for key, before in originals.items():
+                diff.put(category, key, before, index.current(category, key))
+        if objectives is not None and objectives[0] != objectives[1]:
+            diff.objectives = objectives
+        return diff
+
+    @classmethod
+    def merge(cls, diffs: Iterable["SpecDiff"]) -> "SpecDiff":
+        """
+        Net effect of consecutive diffs (e.g. one per event of a batch).
+        """
+        merged = cls()
+        first: dict[tuple[str, Hashable], Any] = {}
+        last: dict[tuple[str, Hashable], Any] = {}
+        for d in diffs:
+            for category, entries in d.entries.items():
+                for key, (before, after) in entries.items():
+                    first.setdefault((category, key), before)
+                    last[(category, key)] = after
+            if d.objectives is not None:
+                before = merged.objectives[0] if merged.objectives else d.objectives[0]
+                merged.objectives = (before, d.objectives[1])
+        for (category, key), before in first.items():
+            merged.put(category, key, before, last[(category, key)])
+        if merged.objectives is not None and merged.objectives[0] == merged.objectives[1]:
+            merged.objectives = None
+        return merged
+
+    def describe(self) -> str:
+        """
+        Compact text listing of the diff, e.g. for an LLM prompt. Vars are
+        left out: they follow from the resources and nodes.
+        """
+        lines = []
+        for category in ("resources", "nodes", "edges", "constraints"):
+            for entity in self.added(category):
+                lines.append(f"added {category[:-1]}: {_show(entity)}")
+            for entity in self.removed(category):
+                lines.append(f"removed {category[:-1]}: {_show(entity)}")
+            for before, after in self.modified(category):
+                lines.append(
+                    f"changed {category[:-1]}: {_show(before)} -> {_show(after)}"
+                )
+        if self.objectives is not None:
+            goals = [_show(o) for o in self.objectives[1]] or ["none"]
+            lines.append(f"objectives now: {'; '.join(goals)}")
+        return "\n".join(lines) or "no changes"
+
+
+def describe_constraint(c: Constraint) -> str:
+    return _show(c)
+
+
+def _show(entity: Any) -> str:
+    if isinstance(entity, Constraint):
+        return f"{_show_expr(entity.lhs)} {entity.op} {_show_expr(entity.rhs)}"
+    if isinstance(entity, VarSpec):
+        return entity.id
+    if isinstance(entity, Resource):
+        return f"{entity.name} ({entity.unit})"
+    if isinstance(entity, Edge):
+        return f"{entity.src} -> {entity.dst}"
+    if isinstance(entity, Objective):
+        target = "custom expression" if entity.expr else entity.resource or "all resources"
+        return f"{entity.sense} {entity.aggregate} of {target}"
+    return str(entity)
+
+
+def _show_expr(expr: LinearExpr | int) -> str:
+    if isinstance(expr, int):
+        return str(expr)
+    parts = [t.var if t.coef == 1 else f"{t.coef}*{t.var}" for t in expr.terms]
+    if expr.const or not parts:
+        parts.append(str(expr.const))
+    return " + ".join(parts)
@@ -0,0 +1,204 @@
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Optional
+from apply_spec_change import EventOutcome, apply_changes
+from resource_allocation_spec import (
+    AddConstraintChange,
+    ResourceAllocationSpec,
+    SpecChangeEvent,
+)
+
+# events between two snapshots
+SNAPSHOT_EVERY = 50
+
+# snapshots kept before older history is compacted away
+MAX_SNAPSHOTS = 20
+
+# most recent spec versions kept as ready objects for undo/redo
+RECENT_VERSIONS = 32
+
+
+class SpecEventStore:
+    """
+    Event-sourced history of one conversation's spec.
+
+    Every applied SpecChangeEvent is logged with the spec version its batch
+    produced (no-op and rejected events are not kept), and the spec is
+    snapshotted at least every `snapshot_every` events. Added constraints are
+    logged with the id they were given, so a replay does not depend on the
+    id counter of the live index.
+    Snapshots are the immutable spec objects `apply_changes` returns, so they
+    share all unchanged entities with each other and cost little memory.
+    `spec_at(version)` starts from the nearest snapshot and replays only the
+    events after it. Once more than `max_snapshots` snapshots exist, the
+    oldest ones and the events before them are compacted away.
+
+    The head can be moved with `undo`, `redo` and `goto`: recently visited
+    versions come straight from a small window of spec objects, older ones
+    from `spec_at`. Applying events after moving back discards the versions
+    ahead of the head, like any undo history.
+    """
+
+    def __init__(
+        self,
+        base: ResourceAllocationSpec,
+        snapshot_every: int = SNAPSHOT_EVERY,
+        max_snapshots: int = MAX_SNAPSHOTS,
+        recent_versions: int = RECENT_VERSIONS,
+    ):
+        self.head = base
+        self.snapshot_every = snapshot_every
+        self.max_snapshots = max_snapshots
+        # (event, spec version after it); _log[0] is event number _start
+        self._log: list[tuple[SpecChangeEvent, int]] = []
+        self._start = 0
+        # (version, event number the snapshot precedes, spec), by version
+        self._snapshots: list[tuple[int, int, ResourceAllocationSpec]] = [
+            (base.version, 0, base)
+        ]
+        self._next_event_id = 1
+        self.recent_versions = recent_versions
+        self._recent: OrderedDict[int, ResourceAllocationSpec] = OrderedDict()
+        self._remember(base)
+
+    def __len__(self) -> int:
+        return len(self._log)
+
+    @property
+    def next_event_id(self) -> int:
+        return self._next_event_id
+
+    @property
+    def oldest_version(self) -> int:
+        return self._snapshots[0][0]
+
+    @property
+    def latest_version(self) -> int:
+        return self._log[-1][1] if self._log else self._snapshots[-1][0]
+
+    def apply(
+        self, events: list[SpecChangeEvent]
+    ) -> tuple[ResourceAllocationSpec, list[EventOutcome]]:
+        """
+        Apply events to the head spec and log them.
+        """
+        if self.head.version < self.latest_version:
+            self._truncate_after(self.head.version)
+
+        outcomes: list[EventOutcome] = []
+        self.head = apply_changes(self.head, events, outcomes=outcomes)
+        self._remember(self.head)
+        for event, outcome in zip(events, outcomes):
+            if outcome["status"] == "applied":
+                self._log.append((_resolved(event, outcome), outcome["version"]))
+            self._next_event_id = max(self._next_event_id, event.event_id + 1)
+
+        if self._end - self._snapshots[-1][1] >= self.snapshot_every:
+            self._snapshots.append((self.head.version, self._end, self.head))
+            if len(self._snapshots) > self.max_snapshots:
+                self.compact(self._snapshots[-self.max_snapshots][0])
+        return self.head, outcomes
+
+    def spec_at(self, version: int) -> ResourceAllocationSpec:
+        """
+        The spec as it was at `version`: nearest snapshot plus replayed tail.
+        """
+        if version == self.head.version:
+            return self.head
+        if version in self._recent:
+            self._recent.move_to_end(version)
+            return self._recent[version]
+        versions = [v for v, _, _ in self._snapshots]
+        i = bisect_right(versions, version) - 1
+        if i < 0 or version > self.latest_version:
+            raise KeyError(f"Version {version} is not in the retained history")
+
+        # replay batch by batch: each batch is one version step
+        _, position, spec = self._snapshots[i]
+        batches: dict[int, list[SpecChangeEvent]] = {}
+        for event, after in self._log[position - self._start :]:
+            if after > version:
+                break
+            batches.setdefault(after, []).append(event)
+        for batch in batches.values():
+            spec = apply_changes(spec, batch)
+        self._remember(spec)
+        return spec
+
+    def goto(self, version: int) -> ResourceAllocationSpec:
+        """
+        Move the head to `version` (older or, after an undo, newer).
+        """
+        self.head = self.spec_at(version)
+        return self.head
+
+    def undo(self) -> Optional[ResourceAllocationSpec]:
+        if self.head.version <= self.oldest_version:
+            return None
+        return self.goto(self.head.version - 1)
+
+    def redo(self) -> Optional[ResourceAllocationSpec]:
+        if self.head.version >= self.latest_version:
+            return None
+        return self.goto(self.head.version + 1)
+
+    def events(
+        self, since_version: Optional[int] = None
+    ) -> list[tuple[SpecChangeEvent, int]]:
+        """
+        Retained (event, version after it) pairs, optionally only those that
+        came after `since_version`.
+        """
+        if since_version is None:
+            return list(self._log)
+        return [(e, v) for e, v in self._log if v > since_version]
+
+    def compact(self, before_version: int) -> None:
+        """
+        Forget history that is only needed for versions below `before_version`.
+        """
+        versions = [v for v, _, _ in self._snapshots]
+        i = bisect_right(versions, before_version) - 1
+        if i <= 0:
+            return
+        position = self._snapshots[i][1]
+        del self._log[: position - self._start]
+        self._start = position
+        del self._snapshots[:i]
+        for v in [v for v in self._recent if v < self._snapshots[0][0]]:
+            del self._recent[v]
+
+    def _truncate_after(self, version: int) -> None:
+        # drop the versions ahead of the head (the redo history)
+        keep = len(self._log)
+        while keep > 0 and self._log[keep - 1][1] > version:
+            keep -= 1
+        del self._log[keep:]
+        self._snapshots = [s for s in self._snapshots if s[0] <= version]
+        for v in [v for v in self._recent if v > version]:
+            del self._recent[v]
+
+    def _remember(self, spec: ResourceAllocationSpec) -> None:
+        self._recent[spec.version] = spec
+        self._recent.move_to_end(spec.version)
+        while len(self._recent) > self.recent_versions:
+            self._recent.popitem(last=False)
+
+    @property
+    def _end(self) -> int:
+        return self._start + len(self._log)
+
+
+def _resolved(event: SpecChangeEvent, outcome: EventOutcome) -> SpecChangeEvent:
+    """
+    `event` with an added constraint's `__AUTO__` (or clashing) id replaced by
+    the one `apply_changes` assigned.
+    """
+    if not isinstance(event.change_payload, AddConstraintChange):
+        return event
+    (added,) = outcome["diff"].added("constraints")
+    if added.id == event.change_payload.constraint.id:
+        return event
+    constraint = event.change_payload.constraint.model_copy(update={"id": added.id})
+    payload = AddConstraintChange(constraint=constraint)
+    return event.model_copy(update={"change_payload": payload})
@@ -0,0 +1,311 @@
+import re
+from typing import Iterable, Optional
+from compact_spec import CompactRow, VarPool
+from content_hash import entity_hash
+
+_CONSTRAINT_NUMBER = re.compile(r"^[A-Za-z]*0*([0-9]+)$")
+
+
+class SpecIndex:
+    """
+    Derived lookups over a ResourceAllocationSpec, each in spec order:
+      - `constraints`: constraint id -> constraint
+      - `vars`: var id -> var
+      - `resources`: resource name -> resource
+      - `nodes`: node names (a dict used as an ordered set)
+      - `edges`: (src, dst) -> edge
+      - `max_constraint_number`: running max of N over ids like 'C000N'
+      - `var_constraints`: var id -> ids of the constraints that mention it
+      - `resource_vars` / `node_vars`: resource / node -> ids of its vars
+      - `pool`: interned var numbers for the compact rows built by `row`
+      - `content_hash()`: XOR of the hashes of all entities above, computed
+        on first use and then updated by every edit
+
+    `apply_changes` edits the maps through the methods below and then calls
+    `sync`, which writes only the touched lists back to the spec. Every edit
+    is journaled (category -> key -> entity before the first edit, None if
+    absent) until `take_journal`, which is what `spec_diff` builds on.
+    Use `spec.index` to get it: the index is rebuilt whenever the spec lists
+    were replaced or resized behind its back.
+    """
+
+    def __init__(self, spec):
+        self.constraints = {}
+        self.vars = {}
+        self.var_constraints: dict[str, set[str]] = {}
+        self.resource_vars: dict[str, set[str]] = {}
+        self.node_vars: dict[str, set[str]] = {}
+        for c in spec.constraints:
+            self.constraints[c.id] = c
+            self._link(c)
+        for v in spec.vars:
+            self.vars[v.id] = v
+            self._group(v.id)
+        self.resources = {r.name: r for r in spec.context.resources}
+        self.nodes = dict.fromkeys(spec.context.locations.nodes)
+        self.edges = {(e.src, e.dst): e for e in spec.context.locations.edges}
+        self.pool = VarPool()
+        self._rows: dict[str, CompactRow] = {}
+        self.max_constraint_number = 0
+        for cid in self.constraints:
+            self._track_constraint_number(cid)
+        self._dirty: set[str] = set()
+        self._journal: dict[str, dict] = {}
+        self._hash: Optional[int] = None
+        self._record(spec)
+
+    def is_current(self, spec) -> bool:
+        """
+        True when the spec lists are the ones this index last saw (O(1)).
+        """
+        lists = self._lists(spec)
+        return all(a is b for a, b in zip(lists, self._seen)) and [
+            len(x) for x in lists
+        ] == self._seen_lengths
+
+    # ============================== CONSTRAINTS ===============================
+
+    def next_constraint_id(self) -> str:
+        return f"C{self.max_constraint_number + 1:04d}"
+
+    def put_constraint(self, constraint) -> None:
+        """
+        Add a constraint, or replace the one with the same id in place.
+        """
+        old = self.constraints.get(constraint.id)
+        self._note("constraints", constraint.id, old)
+        if old is not None:
+            self._unlink(old)
+            self._rows.pop(constraint.id, None)
+        self.constraints[constraint.id] = constraint
+        self._rehash("constraints", old, constraint)
+        self._link(constraint)
+        self._track_constraint_number(constraint.id)
+        self._dirty.add("constraints")
+
+    def remove_constraints(self, ids: Iterable[str]) -> list:
+        """
+        Remove constraints by id; returns the removed constraints.
+        """
+        removed = []
+        for cid in ids:
+            c = self.constraints.pop(cid, None)
+            if c is not None:
+                self._note("constraints", cid, c)
+                self._rehash("constraints", c, None)
+                self._unlink(c)
+                self._rows.pop(cid, None)
+                removed.append(c)
+        if removed:
+            self._dirty.add("constraints")
+        return removed
+
+    def constraints_using(self, var_ids: Iterable[str]) -> list[str]:
+        """
+        Ids of the constraints that mention any of the vars, sorted.
+        """
+        hits: set[str] = set()
+        for vid in var_ids:
+            hits |= self.var_constraints.get(vid, set())
+        return sorted(hits)
+
+    def row(self, constraint) -> CompactRow:
+        """
+        The constraint as a compact row, built once per constraint object and
+        kept across the versions that share this index.
+        """
+        row = self._rows.get(constraint.id)
+        if row is None or row.source is not constraint:
+            row = CompactRow.from_constraint(constraint, self.pool)
+            self._rows[constraint.id] = row
+        return row
+
+    # ================================ VARS ====================================
+
+    def add_var(self, var) -> bool:
+        if var.id in self.vars:
+            return False
+        self._note("vars", var.id, None)
+        self._rehash("vars", None, var)
+        self.vars[var.id] = var
+        self._group(var.id)
+        self._dirty.add("vars")
+        return True
+
+    def remove_vars(self, ids: Iterable[str]) -> None:
+        for vid in list(ids):
+            var = self.vars.pop(vid, None)
+            if var is not None:
+                self._note("vars", vid, var)
+                self._rehash("vars", var, None)
+                resource, node = _split_var_id(vid)
+                self.resource_vars.get(resource, set()).discard(vid)
+                self.node_vars.get(node, set()).discard(vid)
+                self._dirty.add("vars")
+
+    # ============================== CONTEXT ===================================
+
+    def add_resource(self, resource) -> None:
+        old = self.resources.get(resource.name)
+        self._note("resources", resource.name, old)
+        self._rehash("resources", old, resource)
+        self.resources[resource.name] = resource
+        self._dirty.add("resources")
+
+    def remove_resource(self, name: str) -> Optional[object]:
+        resource = self.resources.pop(name, None)
+        if resource is not None:
+            self._note("resources", name, resource)
+            self._rehash("resources", resource, None)
+            self._dirty.add("resources")
+        return resource
+
+    def add_node(self, node: str) -> None:
+        old = node if node in self.nodes else None
+        self._note("nodes", node, old)
+        self._rehash("nodes", old, node)
+        self.nodes[node] = None
+        self._dirty.add("nodes")
+
+    def remove_node(self, node: str) -> None:
+        self._note("nodes", node, node)
+        self._rehash("nodes", node, None)
+        del self.nodes[node]
+        self._dirty.add("nodes")
+
+    def add_edge(self, edge) -> None:
+        key = (edge.src, edge.dst)
+        old = self.edges.get(key)
+        self._note("edges", key, old)
+        self._rehash("edges", old, edge)
+        self.edges[key] = edge
+        self._dirty.add("edges")
+
+    def remove_edges(self, keys: Iterable[tuple[str, str]]) -> bool:
+        removed = []
+        for key in list(keys):
+            edge = self.edges.pop(key, None)
+            if edge is not None:
+                self._note("edges", key, edge)
+                self._rehash("edges", edge, None)
+                removed.append(key)
+        if removed:
+            self._dirty.add("edges")
+        return bool(removed)
+
+    # ================================ SYNC ====================================
+
+    def sync(self, spec) -> None:
+        """
+        Write the touched maps back to the spec lists, as new list objects.
+        """
+        if "constraints" in self._dirty:
+            spec.constraints = list(self.constraints.values())
+        if "vars" in self._dirty:
+            spec.vars = list(self.vars.values())
+        if "resources" in self._dirty:
+            spec.context.resources = list(self.resources.values())
+        if "nodes" in self._dirty:
+            spec.context.locations.nodes = list(self.nodes)
+        if "edges" in self._dirty:
+            spec.context.locations.edges = list(self.edges.values())
+        self._dirty.clear()
+        self._record(spec)
+
+    # ================================ HASH ====================================
+
+    def content_hash(self) -> int:
+        """
+        Order-independent hash of every constraint, var, resource, node and
+        edge (see `content_hash.entity_hash`).
+        """
+        if self._hash is None:
+            h = 0
+            for category in ("constraints", "vars", "resources", "nodes", "edges"):
+                for entity in self._entities(category):
+                    h ^= entity_hash(category, entity)
+            self._hash = h
+        return self._hash
+
+    def _rehash(self, category: str, before, after) -> None:
+        # swap one entity's hash in the running XOR, once it exists
+        if self._hash is None or before is after:
+            return
+        if before is not None:
+            self._hash ^= entity_hash(category, before)
+        if after is not None:
+            self._hash ^= entity_hash(category, after)
+
+    def _entities(self, category: str):
+        if category == "nodes":
+            return self.nodes.keys()
+        return getattr(self, category).values()
+
+    # ============================== JOURNAL ===================================
+
+    def current(self, category: str, key):
+        """
+        The entity stored under `key` (for nodes: the node name), else None.
+        """
+        if category == "nodes":
+            return key if key in self.nodes else None
+        return getattr(self, category).get(key)
+
+    def take_journal(self) -> dict[str, dict]:
+        """
+        Entities as they were before the edits since the last call.
+        """
+        journal, self._journal = self._journal, {}
+        return journal
+
+    def _note(self, category: str, key, before) -> None:
+        self._journal.setdefault(category, {}).setdefault(key, before)
+
+    def _link(self, constraint) -> None:
+        for vid in _constraint_vars(constraint):
+            self.var_constraints.setdefault(vid, set()).add(constraint.id)
+
+    def _unlink(self, constraint) -> None:
+        for vid in _constraint_vars(constraint):
+            ids = self.var_constraints.get(vid)
+            if ids is not None:
+                ids.discard(constraint.id)
+                if not ids:
+                    del self.var_constraints[vid]
+
+    def _group(self, vid: str) -> None:
+        resource, node = _split_var_id(vid)
+        self.resource_vars.setdefault(resource, set()).add(vid)
+        self.node_vars.setdefault(node, set()).add(vid)
+
+    def _track_constraint_number(self, cid: str) -> None:
+        m = _CONSTRAINT_NUMBER.match(cid)
+        if m:
+            self.max_constraint_number = max(self.max_constraint_number, int(m.group(1)))
+
+    def _record(self, spec) -> None:
+        self._seen = self._lists(spec)
+        self._seen_lengths = [len(x) for x in self._seen]
+
+    @staticmethod
+    def _lists(spec) -> tuple[list, ...]:
+        return (
+            spec.constraints,
+            spec.vars,
+            spec.context.resources,
+            spec.context.locations.nodes,
+            spec.context.locations.edges,
+        )
+
+
+def _constraint_vars(constraint) -> set[str]:
+    vs = {t.var for t in constraint.lhs.terms}
+    if not isinstance(constraint.rhs, int):
+        vs.update(t.var for t in constraint.rhs.terms)
+    return vs
+
+
+def _split_var_id(vid: str) -> tuple[str, str]:
+    # '<resource>[<node>]'
+    resource, _, rest = vid.partition("[")
+    return resource, rest[:-1]
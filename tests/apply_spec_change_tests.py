@@ -0,0 +1,304 @@
+from resource_allocation_spec import (
+    Resource,
+    VarSpec,
+    Constraint,
+    LinearExpr,
+    Term,
+    ChangeType,
+    AddConstraintChange,
+    AddLocationChange,
+    AddResourceChange,
+    RemoveConstraintChange,
+    RemoveLocationChange,
+    RemoveResourceChange,
+    UpdateConstraintChange,
+    Edge,
+)
+from apply_spec_change import apply_change, apply_changes
+from conftest import make_base_spec as _spec, make_event as _event
+
+
+def _add(var: str, rhs: int, cid: str = "__AUTO__") -> AddConstraintChange:
+    return AddConstraintChange(
+        constraint=Constraint(
+            id=cid,
+            lhs=LinearExpr(terms=[Term(var=var, coef=1)]),
+            op="<=",
+            rhs=rhs,
+        )
+    )
+
+
+def test_apply_changes_uses_one_working_copy():
+    # ===== arrange =====
+    spec = _spec()
+    add = _add("food[b]", 5)
+    events = [
+        _event(1, ChangeType.ADD_CONSTRAINT, add),
+        _event(2, ChangeType.ADD_LOCATION, AddLocationChange(node="c")),
+        _event(3, ChangeType.ADD_RESOURCE, AddResourceChange(resource=Resource(name="food", unit="units"))),
+        _event(4, ChangeType.REMOVE_CONSTRAINT, RemoveConstraintChange(constraint_id="C0001")),
+    ]
+
+    # ===== act =====
+    new_spec = apply_changes(spec, events)
+
+    # ===== assert =====
+    # one version step for the whole batch
+    assert new_spec.version == 2
+    assert [c.id for c in new_spec.constraints] == ["C0002"]
+    assert [v.id for v in new_spec.vars] == ["food[a]", "food[b]", "food[c]"]
+    assert new_spec.context.locations.nodes == ["a", "b", "c"]
+    # the input spec and the event payload are left untouched
+    assert spec == _spec()
+    assert add.constraint.id == "__AUTO__"
+    # untouched entities are shared, not copied
+    assert new_spec.vars[0] is spec.vars[0]
+
+
+def test_apply_change_matches_batch():
+    # ===== arrange =====
+    spec = _spec()
+    events = [
+        _event(1, ChangeType.ADD_CONSTRAINT, _add("food[b]", 5, cid="C0001")),
+        _event(2, ChangeType.REMOVE_CONSTRAINT, RemoveConstraintChange(constraint_id="C0404")),
+    ]
+
+    # ===== act =====
+    one_by_one = spec
+    for event in events:
+        one_by_one = apply_change(one_by_one, event)
+    batch = apply_changes(spec, events)
+
+    # ===== assert =====
+    assert one_by_one == batch
+    assert batch.version == 2
+    assert [c.id for c in batch.constraints] == ["C0001", "C0002"]
+
+
+def test_index_stays_consistent_across_batches():
+    # ===== arrange =====
+    spec = _spec()
+    events = [
+        _event(1, ChangeType.ADD_LOCATION, AddLocationChange(node="c")),
+        _event(2, ChangeType.ADD_LOCATION, AddLocationChange(edge=Edge(src="a", dst="c"))),
+        _event(3, ChangeType.ADD_CONSTRAINT, _add("food[c]", 2)),
+        _event(4, ChangeType.REMOVE_LOCATION, RemoveLocationChange(node="a")),
+    ]
+
+    # ===== act =====
+    new_spec = apply_changes(spec, events)
+    index = new_spec.index
+
+    # ===== assert =====
+    assert list(index.constraints) == [c.id for c in new_spec.constraints] == ["C0002"]
+    assert set(index.vars) == {v.id for v in new_spec.vars} == {"food[b]", "food[c]"}
+    assert list(index.nodes) == new_spec.context.locations.nodes == ["b", "c"]
+    assert index.edges == {}
+    # ids keep counting up after removals
+    assert index.next_constraint_id() == "C0003"
+    # the old spec rebuilds its own index on demand
+    assert list(spec.index.nodes) == ["a", "b"]
+    assert new_spec.index is index
+
+
+def test_index_rebuilds_after_direct_edit():
+    # ===== arrange =====
+    spec = _spec()
+    first = spec.index
+
+    # ===== act =====
+    spec.constraints.append(_add("food[b]", 3, cid="C0009").constraint)
+
+    # ===== assert =====
+    assert spec.index is not first
+    assert spec.index.next_constraint_id() == "C0010"
+    assert spec == spec.model_copy(deep=True)
+
+
+def test_cascading_removal_reports_dropped_constraints():
+    # ===== arrange =====
+    spec = _spec()
+    spec.context.resources.append(Resource(name="water", unit="liters"))
+    spec.vars += [VarSpec(id="water[a]", sort="int"), VarSpec(id="water[b]", sort="int")]
+    spec.constraints += [
+        _add("water[b]", 4, cid="C0002").constraint,
+        Constraint(
+            id="C0003",
+            lhs=LinearExpr(terms=[Term(var="water[a]", coef=1)]),
+            op="<=",
+            rhs=LinearExpr(terms=[Term(var="food[b]", coef=2)]),
+        ),
+    ]
+    events = [
+        _event(7, ChangeType.REMOVE_RESOURCE, RemoveResourceChange(name="water")),
+        _event(8, ChangeType.REMOVE_LOCATION, RemoveLocationChange(node="a")),
+    ]
+    outcomes = []
+
+    # ===== act =====
+    new_spec = apply_changes(spec, events, outcomes=outcomes)
+
+    # ===== assert =====
+    assert [(o["event_id"], o["version"]) for o in outcomes] == [(7, 2), (8, 2)]
+    assert [[c.id for c in o["dropped"]] for o in outcomes] == [
+        ["C0002", "C0003"],
+        ["C0001"],
+    ]
+    assert new_spec.constraints == []
+    assert [v.id for v in new_spec.vars] == ["food[b]"]
+    assert new_spec.index.var_constraints == {}
+    assert new_spec.index.resource_vars == {"food": {"food[b]"}}
+    assert new_spec.index.node_vars == {"b": {"food[b]"}}
+
+
+def test_batch_is_validated_before_it_is_applied():
+    # ===== arrange =====
+    spec = _spec()
+    events = [
+        _event(1, ChangeType.ADD_LOCATION, AddLocationChange(node="c")),
+        # valid: the node comes from the event before it
+        _event(2, ChangeType.ADD_CONSTRAINT, _add("food[c]", 3, cid="C0005")),
+        _event(3, ChangeType.ADD_CONSTRAINT, _add("water[a]", 3)),
+        _event(4, ChangeType.ADD_LOCATION, AddLocationChange(edge=Edge(src="a", dst="d"))),
+        _event(5, ChangeType.REMOVE_LOCATION, RemoveLocationChange(node="c")),
+        # C0005 went away with location c
+        _event(6, ChangeType.UPDATE_CONSTRAINT, UpdateConstraintChange(constraint_id="C0005", rhs=1)),
+        _event(7, ChangeType.ADD_RESOURCE, AddResourceChange(resource=Resource(name="food", unit="units"))),
+        # same fields as a removal: parsed into the first matching payload model
+        _event(8, ChangeType.REMOVE_LOCATION, AddLocationChange(node="b")),
+    ]
+    outcomes = []
+
+    # ===== act =====
+    new_spec = apply_changes(spec, events, outcomes=outcomes)
+
+    # ===== assert =====
+    assert [(o["event_id"], o["status"], o["reason"]) for o in outcomes] == [
+        (1, "applied", None),
+        (2, "applied", None),
+        (3, "rejected", "unknown variable 'water[a]'"),
+        (4, "rejected", "route to unknown location 'd'"),
+        (5, "applied", None),
+        (6, "rejected", "unknown constraint 'C0005'"),
+        (7, "no-op", None),
+        (8, "applied", None),
+    ]
+    assert {o["version"] for o in outcomes} == {new_spec.version} == {2}
+    assert new_spec.context.locations.nodes == ["a"]
+    assert [c.id for c in new_spec.constraints] == ["C0001"]
+
+
+def test_names_that_do_not_fit_var_ids_are_rejected():
+    # ===== arrange =====
+    spec = _spec()
+    events = [
+        _event(1, ChangeType.ADD_LOCATION, AddLocationChange(node="Hospital A")),
+        _event(2, ChangeType.ADD_RESOURCE, AddResourceChange(resource=Resource(name="First Aid", unit="kits"))),
+        _event(3, ChangeType.ADD_LOCATION, AddLocationChange(node="hospital_a")),
+    ]
+    outcomes = []
+
+    # ===== act =====
+    new_spec = apply_changes(spec, events, outcomes=outcomes)
+
+    # ===== assert =====
+    assert [(o["event_id"], o["status"]) for o in outcomes] == [
+        (1, "rejected"),
+        (2, "rejected"),
+        (3, "applied"),
+    ]
+    assert "Hospital A" in outcomes[0]["reason"]
+    assert "First Aid" in outcomes[1]["reason"]
+    assert new_spec.context.locations.nodes == ["a", "b", "hospital_a"]
+    assert [r.name for r in new_spec.context.resources] == ["food"]
+
+
+def test_rejected_batch_keeps_the_version():
+    # ===== arrange =====
+    spec = _spec()
+    event = _event(1, ChangeType.REMOVE_RESOURCE, RemoveResourceChange(name="water"))
+    outcomes = []
+
+    # ===== act =====
+    new_spec = apply_changes(spec, [event], outcomes=outcomes)
+
+    # ===== assert =====
+    assert outcomes[0]["status"] == "rejected"
+    assert new_spec == spec
+
+
+def test_added_constraints_are_kept_as_written_and_deduplicated():
+    # ===== arrange =====
+    spec = _spec()
+    strict = AddConstraintChange(
+        constraint=Constraint(
+            id="__AUTO__",
+            lhs=LinearExpr(terms=[Term(var="food[b]", coef=1)], const=2),
+            op="<",
+            rhs=LinearExpr(terms=[Term(var="food[a]", coef=1)]),
+        )
+    )
+    # food[a] >= 1 again, written as 0 < food[a]
+    same = AddConstraintChange(
+        constraint=Constraint(
+            id="__AUTO__",
+            lhs=LinearExpr(terms=[]),
+            op="<",
+            rhs=LinearExpr(terms=[Term(var="food[a]", coef=1)]),
+        )
+    )
+    outcomes = []
+
+    # ===== act =====
+    new_spec = apply_changes(
+        spec,
+        [_event(1, ChangeType.ADD_CONSTRAINT, strict), _event(2, ChangeType.ADD_CONSTRAINT, same)],
+        outcomes=outcomes,
+    )
+
+    # ===== assert =====
+    assert [o["status"] for o in outcomes] == ["applied", "no-op"]
+    # stored as the user wrote it, with an id; only the duplicate check is canonical
+    added = new_spec.constraints[1]
+    assert added == strict.constraint.model_copy(update={"id": added.id})
+    assert added.id != "__AUTO__"
+
+
+def test_update_patches_the_sides_as_written():
+    # ===== arrange =====
+    spec = _spec()
+    more = Constraint(
+        id="__AUTO__",
+        lhs=LinearExpr(terms=[Term(var="food[b]", coef=1)]),
+        op=">",
+        rhs=LinearExpr(terms=[Term(var="food[a]", coef=1)]),
+    )
+    spec = apply_changes(spec, [_event(1, ChangeType.ADD_CONSTRAINT, AddConstraintChange(constraint=more))])
+    cid = spec.constraints[-1].id
+    patch = UpdateConstraintChange(constraint_id=cid, rhs=4)
+
+    # ===== act =====
+    new_spec = apply_changes(spec, [_event(2, ChangeType.UPDATE_CONSTRAINT, patch)])
+
+    # ===== assert =====
+    updated = new_spec.constraints[-1]
+    assert (updated.lhs, updated.op, updated.rhs) == (more.lhs, ">", 4)
+
+
+def test_applies_from_one_spec_never_share_an_index():
+    # ===== arrange =====
+    spec = _spec()
+    before = spec.model_copy(deep=True)
+    add = AddLocationChange(node="c")
+    remove = RemoveResourceChange(name="food")
+
+    # ===== act =====
+    first = apply_changes(spec, [_event(1, ChangeType.ADD_LOCATION, add)])
+    second = apply_changes(spec, [_event(1, ChangeType.REMOVE_RESOURCE, remove)])
+
+    # ===== assert =====
+    assert spec == before
+    assert first.index is not second.index
+    assert "c" in first.index.nodes and "c" not in second.index.nodes
+    assert "food" in first.index.resources and "food" not in second.index.resources
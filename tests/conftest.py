@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+from typing import Iterable
+from resource_allocation_spec import (
+    ResourceAllocationSpec,
+    AllocationContext,
+    Locations,
+    Resource,
+    VarSpec,
+    Constraint,
+    LinearExpr,
+    Objective,
+    Term,
+    SpecChangeEvent,
+    ChangeType,
+)
+
+# spec factories shared by the test modules (`from conftest import ...`)
+
+
+def make_spec(
+    constraints: Iterable[Constraint] = (),
+    nodes: Iterable[str] = ("a", "b"),
+    resource: str = "food",
+    unit: str = "units",
+    version: int = 1,
+    objectives: Iterable[Objective] = (),
+) -> ResourceAllocationSpec:
+    """
+    One resource over `nodes`, with an int var per node.
+    """
+    nodes = list(nodes)
+    return ResourceAllocationSpec(
+        version=version,
+        context=AllocationContext(
+            resources=[Resource(name=resource, unit=unit)],
+            locations=Locations(nodes=nodes, edges=[]),
+        ),
+        vars=[VarSpec(id=f"{resource}[{n}]", sort="int") for n in nodes],
+        constraints=list(constraints),
+        objectives=list(objectives),
+    )
+
+
+def make_constraint(cid: str, terms: dict[str, int], op: str, rhs) -> Constraint:
+    return Constraint(
+        id=cid,
+        lhs=LinearExpr(terms=[Term(var=v, coef=k) for v, k in terms.items()]),
+        op=op,
+        rhs=rhs,
+    )
+
+
+def make_event(i: int, change_type: ChangeType, payload) -> SpecChangeEvent:
+    return SpecChangeEvent(
+        event_id=i,
+        timestamp=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        change_type=change_type,
+        change_payload=payload,
+    )
+
+
+def make_base_spec(nodes: Iterable[str] = ("a", "b")) -> ResourceAllocationSpec:
+    """
+    `make_spec` over `nodes` with one constraint, C0001: food[a] >= 1.
+    """
+    return make_spec([make_constraint("C0001", {"food[a]": 1}, ">=", 1)], nodes=nodes)
@@ -0,0 +1,80 @@
+from resource_allocation_spec import (
+    Resource,
+    Constraint,
+    LinearExpr,
+    Term,
+    Edge,
+    Objective,
+    ChangeType,
+    AddConstraintChange,
+    AddLocationChange,
+    AddResourceChange,
+    RemoveResourceChange,
+    SetObjectivesChange,
+    UpdateConstraintChange,
+)
+from apply_spec_change import apply_changes
+from conftest import make_base_spec as _spec, make_constraint, make_event as _event
+
+
+def test_equivalent_constraints_hash_alike():
+    # ===== arrange =====
+    # food[a] + food[b] - food[b] > 2   vs   3 <= food[a]
+    written = Constraint(
+        id="C0001",
+        lhs=LinearExpr(terms=[Term(var="food[a]"), Term(var="food[b]"), Term(var="food[b]", coef=-1)]),
+        op=">",
+        rhs=2,
+    )
+    flipped = Constraint(
+        id="C0001",
+        lhs=LinearExpr(const=3),
+        op="<=",
+        rhs=LinearExpr(terms=[Term(var="food[a]")]),
+    )
+
+    # ===== act / assert =====
+    assert written.content_hash() == flipped.content_hash()
+    assert written.content_hash() != flipped.model_copy(update={"id": "C0002"}).content_hash()
+    assert written.lhs.content_hash() == LinearExpr(terms=[Term(var="food[a]")]).content_hash()
+
+
+def test_spec_hash_is_kept_up_to_date_incrementally():
+    # ===== arrange =====
+    spec = _spec()
+    before = spec.content_hash()
+    events = [
+        _event(1, ChangeType.ADD_RESOURCE, AddResourceChange(resource=Resource(name="water", unit="liters"))),
+        _event(2, ChangeType.ADD_LOCATION, AddLocationChange(node="c")),
+        _event(3, ChangeType.ADD_LOCATION, AddLocationChange(edge=Edge(src="a", dst="c"))),
+        _event(4, ChangeType.ADD_CONSTRAINT, AddConstraintChange(
+            constraint=make_constraint("__AUTO__", {"water[c]": 2}, "<", 9)
+        )),
+        _event(5, ChangeType.UPDATE_CONSTRAINT, UpdateConstraintChange(constraint_id="C0001", rhs=2)),
+        _event(6, ChangeType.SET_OBJECTIVES, SetObjectivesChange(
+            objectives=[Objective(sense="maximize", resource="water")]
+        )),
+    ]
+
+    # ===== act =====
+    new_spec = apply_changes(spec, events)
+    # the index came along from `spec`, hash included
+    carried = new_spec.index._hash is not None
+    incremental = new_spec.content_hash()
+    fresh = new_spec.model_copy(deep=True)
+    reordered = fresh.model_copy(update={"vars": fresh.vars[::-1], "version": 9})
+    back = apply_changes(
+        new_spec,
+        [
+            _event(7, ChangeType.REMOVE_RESOURCE, RemoveResourceChange(name="water")),
+            _event(8, ChangeType.UPDATE_CONSTRAINT, UpdateConstraintChange(constraint_id="C0001", rhs=1)),
+        ],
+    )
+
+    # ===== assert =====
+    assert carried
+    assert incremental != before
+    assert incremental == fresh.content_hash() == reordered.content_hash()
+    # what is left after undoing the changes by hand: node c and the edge
+    assert back.content_hash() != before
+    assert back.model_copy(deep=True).content_hash() == back.content_hash()
@@ -0,0 +1,119 @@
+from resource_allocation_spec import (
+    ResourceAllocationSpec,
+    Constraint,
+)
+from decompose import split_components, partition
+from solver_backend import SolverRouter
+from conftest import make_constraint as _c, make_spec
+
+
+def _spec(constraints: list[Constraint]) -> ResourceAllocationSpec:
+    return make_spec(constraints, nodes=["a", "b", "c", "d"])
+
+
+def test_split_components_follows_shared_vars():
+    # ===== arrange =====
+    spec = _spec(
+        [
+            _c("C0001", {"food[a]": 1, "food[b]": 1}, "<=", 10),
+            _c("C0002", {"food[c]": 1}, ">=", 2),
+            _c("C0003", {"food[b]": 1}, ">=", 3),
+            _c("C0004", {"food[d]": 1, "food[c]": -1}, "=", 0),
+        ]
+    )
+
+    # ===== act =====
+    components = split_components(spec)
+
+    # ===== assert =====
+    assert [[c.id for c in group] for group in components] == [
+        ["C0001", "C0003"],
+        ["C0002", "C0004"],
+    ]
+
+
+def test_partition_keeps_only_used_vars():
+    # ===== arrange =====
+    spec = _spec(
+        [
+            _c("C0001", {"food[a]": 1}, ">=", 1),
+            _c("C0002", {"food[b]": 1}, ">=", 1),
+            _c("C0003", {"food[c]": 1}, ">=", 1),
+        ]
+    )
+
+    spec.index  # built, as after any apply
+
+    # ===== act =====
+    parts = partition(spec, 2)
+
+    # ===== assert =====
+    assert len(parts) == 2
+    assert all(p._index is None for p in parts)
+    assert sorted(c.id for p in parts for c in p.constraints) == [
+        "C0001",
+        "C0002",
+        "C0003",
+    ]
+    for p in parts:
+        used = {t.var for c in p.constraints for t in c.lhs.terms}
+        assert {v.id for v in p.vars} == used
+
+
+def test_parallel_solve_merges_parts():
+    # ===== arrange =====
+    sat_spec = _spec(
+        [
+            _c("C0001", {"food[a]": 1, "food[b]": 1}, "=", 5),
+            _c("C0002", {"food[a]": 1}, "=", 5),
+            _c("C0003", {"food[c]": 1}, "=", 3),
+            _c("C0004", {"food[d]": 1, "food[c]": 1}, "=", 4),
+        ]
+    )
+    unsat_spec = _spec(
+        [
+            _c("C0001", {"food[a]": 1}, ">=", 4),
+            _c("C0002", {"food[a]": 1}, "<", 4),
+            _c("C0003", {"food[c]": 1}, ">=", 0),
+            _c("C0004", {"food[d]": 1, "food[c]": 1}, "<", 0),
+            _c("C0005", {"food[d]": 1}, ">=", 0),
+        ]
+    )
+    router = SolverRouter(max_workers=2, parallel_min_constraints=1)
+
+    # ===== act =====
+    sat_result = router.solve(sat_spec)
+    unsat_result = router.solve(unsat_spec)
+
+    # ===== assert =====
+    assert sat_result["result"] == "SAT"
+    assert sat_result["assignments"] == [
+        "food[a] = 5",
+        "food[b] = 0",
+        "food[c] = 3",
+        "food[d] = 1",
+    ]
+    assert unsat_result["result"] == "UNSAT"
+    assert sorted(map(sorted, unsat_result["unsat_cores"])) == [
+        ["C0001", "C0002"],
+        ["C0003", "C0004", "C0005"],
+    ]
+    assert unsat_result["unsat_constraints_ids"] in unsat_result["unsat_cores"]
+
+
+def test_milp_bound_spec_is_not_split():
+    # ===== arrange =====
+    spec = _spec(
+        [
+            _c("C0001", {"food[a]": 1}, ">=", 1),
+            _c("C0002", {"food[c]": 1}, ">=", 2),
+        ]
+    )
+    router = SolverRouter(max_workers=2, parallel_min_constraints=1, milp_min_size=1)
+
+    # ===== act =====
+    result = router.solve(spec)
+
+    # ===== assert =====
+    assert result["result"] == "SAT"
+    assert result["backend"] == router.milp.name
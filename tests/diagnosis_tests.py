@@ -0,0 +1,88 @@
+from resource_allocation_spec import (
+    ResourceAllocationSpec,
+    Constraint,
+    Objective,
+)
+from spec_compiler import IncrementalSpecCompiler
+from diagnosis import find_cores
+from solver_backend import Z3Backend
+from conftest import make_constraint as _c, make_spec
+
+
+def _spec(constraints: list[Constraint]) -> ResourceAllocationSpec:
+    return make_spec(constraints, nodes=["a", "b", "c"])
+
+
+# two independent conflicts plus harmless constraints
+CONSTRAINTS = [
+    _c("C0001", {"food[a]": 1, "food[b]": 1}, ">=", 10),
+    _c("C0002", {"food[a]": 1}, ">=", 0),
+    _c("C0003", {"food[a]": 1, "food[b]": 2}, "<=", 4),
+    _c("C0004", {"food[b]": 1}, ">=", 0),
+    _c("C0005", {"food[c]": 1}, ">", 7),
+    _c("C0006", {"food[c]": 1, "food[a]": -1}, "<", 3),
+    _c("C0007", {"food[c]": 1}, "<=", 5),
+]
+
+
+def test_find_disjoint_minimal_cores():
+    # ===== arrange =====
+    compiler = IncrementalSpecCompiler(use_presolve=False)
+    compiler.compile(_spec(CONSTRAINTS))
+
+    # ===== act =====
+    cores = find_cores(
+        compiler.solver, compiler.constraint_trackings, max_cores=3, time_budget_ms=5000
+    )
+
+    # ===== assert =====
+    core_ids = sorted(sorted(str(b) for b in core) for core in cores)
+    assert core_ids == [["C0001", "C0003", "C0004"], ["C0005", "C0007"]]
+
+
+def test_backend_diagnoses_presolve_conflict():
+    # ===== arrange =====
+    # presolve catches this one before Z3 runs
+    spec = _spec(
+        [
+            _c("C0001", {"food[a]": 1}, ">=", 0),
+            _c("C0002", {"food[b]": 1}, ">=", 0),
+            _c("C0003", {"food[a]": 1}, "<=", 3),
+            _c("C0004", {"food[b]": 1}, "<=", 3),
+            _c("C0005", {"food[a]": 1, "food[b]": 1}, ">=", 7),
+            _c("C0006", {"food[c]": 1}, "=", 1),
+        ]
+    )
+
+    # ===== act =====
+    result = Z3Backend(max_cores=2).solve(spec)
+
+    # ===== assert =====
+    assert result["result"] == "UNSAT"
+    assert sorted(result["unsat_constraints_ids"]) == ["C0003", "C0004", "C0005"]
+    assert len(result["unsat_cores"]) == 1
+
+
+def test_backend_shrinks_cores_found_through_presolve():
+    # ===== arrange =====
+    # presolve fixes food[a] = 0 into C0004, so the solver's raw core names
+    # C0001 too, although C0004 has no integer solution on its own
+    spec = _spec(
+        [
+            _c("C0001", {"food[a]": 1}, "=", 0),
+            _c("C0004", {"food[a]": 2, "food[b]": 2, "food[c]": 2}, "=", -1),
+            _c("C0005", {"food[b]": 1, "food[c]": 1}, ">=", 10),
+            _c("C0006", {"food[b]": 1, "food[c]": 1}, "<=", 3),
+        ]
+    )
+    optimizing = spec.model_copy(update={"objectives": [Objective(sense="minimize", resource="food")]})
+
+    # ===== act =====
+    result = Z3Backend(max_cores=2).solve(spec)
+    optimized = Z3Backend(max_cores=2).solve(optimizing)
+
+    # ===== assert =====
+    assert result["result"] == optimized["result"] == "UNSAT"
+    for r in (result, optimized):
+        assert sorted(sorted(core) for core in r["unsat_cores"]) == [["C0004"], ["C0005", "C0006"]]
+        assert r["unsat_constraints_ids"] == r["unsat_cores"][0]
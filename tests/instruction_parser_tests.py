@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+from resource_allocation_spec import (
+    ChangeType,
+    AddLocationChange,
+    RemoveLocationChange,
+    SpecChangeEvent,
+)
+from instruction_parser import parse_instruction, parse_instructions, split_instructions
+
+
+def test_instructions_parse_in_fixed_order():
+    # ===== arrange =====
+    text = (
+        '- ADD_CONSTRAINT "food" at "a" must greater than or equal 2 and less than "water" at "d", '
+        '- REMOVE_EDGE "a" -> "b", '
+        '- ADD_EDGE "a" -> "d", '
+        '- ADD_LOCATION "d", '
+        '- ADD_RESOURCE "first_aid_kit" unit=kits, '
+        '- SET_OBJECTIVE maximize minimum "*"'
+    )
+
+    # ===== act =====
+    changes, rejected = parse_instructions(text)
+
+    # ===== assert =====
+    assert rejected == []
+    assert [c.change_type for c in changes] == [
+        ChangeType.ADD_LOCATION,
+        ChangeType.ADD_RESOURCE,
+        ChangeType.ADD_LOCATION,
+        ChangeType.ADD_CONSTRAINT,
+        ChangeType.ADD_CONSTRAINT,
+        ChangeType.REMOVE_LOCATION,
+        ChangeType.SET_OBJECTIVES,
+    ]
+    node, resource, edge, low, high, removed, objectives = (c.change_payload for c in changes)
+    assert (node.node, edge.edge.dst) == ("d", "d")
+    assert (resource.resource.name, resource.resource.unit) == ("first_aid_kit", "kits")
+    assert (low.constraint.lhs.terms[0].var, low.constraint.op, low.constraint.rhs) == ("food[a]", ">=", 2)
+    assert (high.constraint.op, high.constraint.rhs.terms[0].var) == ("<", "water[d]")
+    assert isinstance(removed, RemoveLocationChange) and removed.edge.src == "a"
+    assert (objectives.objectives[0].aggregate, objectives.objectives[0].resource) == ("min", None)
+    # the payload type survives the trip into an event
+    event = SpecChangeEvent(
+        event_id=1,
+        timestamp=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        change_type=changes[5].change_type,
+        change_payload=removed,
+    )
+    assert isinstance(event.change_payload, RemoveLocationChange)
+
+
+def test_unknown_forms_are_left_for_the_llm():
+    # ===== arrange =====
+    text = (
+        'UPDATE_CONSTRAINT "C0002" -> "water" at "a" must equal 4, '
+        'ADD_CONSTRAINT "food" at "a" must not equal 3, '
+        'ADD_CONSTRAINT "food" at "A" must at least 3, '
+        'ADD_CONSTRAINT "food" at "hospital-a" must at least 3, '
+        'ADD_LOCATION "A", ADD_RESOURCE "first-aid", ADD_EDGE "a" -> "hospital-a", '
+        'REMOVE_CONSTRAINT "C0005", CLEAR_OBJECTIVES, '
+        'UPDATE_CONSTRAINT "C0003" -> "water" at "a" must at least 1 and at most 5'
+    )
+
+    # ===== act =====
+    changes, rejected = parse_instructions(text)
+
+    # ===== assert =====
+    assert [c.change_type for c in changes] == [
+        ChangeType.UPDATE_CONSTRAINT,
+        ChangeType.REMOVE_CONSTRAINT,
+        ChangeType.SET_OBJECTIVES,
+    ]
+    update = changes[0].change_payload
+    assert (update.constraint_id, update.op, update.rhs) == ("C0002", "=", 4)
+    assert changes[2].change_payload.objectives == []
+    assert rejected == [
+        'ADD_CONSTRAINT "food" at "a" must not equal 3',
+        'ADD_CONSTRAINT "food" at "A" must at least 3',
+        'ADD_CONSTRAINT "food" at "hospital-a" must at least 3',
+        'ADD_LOCATION "A"',
+        'ADD_RESOURCE "first-aid"',
+        'ADD_EDGE "a" -> "hospital-a"',
+        'UPDATE_CONSTRAINT "C0003" -> "water" at "a" must at least 1 and at most 5',
+    ]
+    assert split_instructions('ADD_LOCATION "x, y"\n`ADD_LOCATION "z"`') == [
+        'ADD_LOCATION "x, y"',
+        'ADD_LOCATION "z"',
+    ]
+    assert parse_instruction('ADD_LOCATION "x, y"') is None
+    assert parse_instruction('add_location "x_1"')[0].change_payload == AddLocationChange(node="x_1")
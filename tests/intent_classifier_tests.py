@@ -0,0 +1,53 @@
+from controller_output import Intent
+from intent_classifier import GREETING_REPLY, classify_intent, normalize
+
+
+def test_command_like_messages_are_classified():
+    # ===== arrange =====
+    messages = {
+        "hi": Intent.GREET,
+        "Good morning!": Intent.GREET,
+        "solve": Intent.SOLVE,
+        "Please solve it.": Intent.SOLVE,
+        "can you run the solver again": Intent.SOLVE,
+        "find the optimal plan": Intent.SOLVE,
+        "show me the constraints": Intent.QUERY_SPEC,
+        "What are the resources?": Intent.QUERY_SPEC,
+        "explain the result": Intent.EXPLAIN_SOLVER,
+        "Why is it infeasible?": Intent.EXPLAIN_SOLVER,
+    }
+
+    # ===== act =====
+    outputs = {text: classify_intent(text) for text in messages}
+
+    # ===== assert =====
+    assert {text: output.intent for text, output in outputs.items()} == messages
+    assert outputs["hi"].reply == GREETING_REPLY
+    assert outputs["solve"].reply is None
+
+
+def test_uncertain_messages_defer_to_llm():
+    # ===== arrange =====
+    messages = [
+        "add 5 food at a",
+        "solve for water at a",
+        "hi, location b needs 10 water",
+        "why",
+        "show the plan",
+        "explain how this works",
+        "undo",
+    ]
+
+    # ===== act =====
+    outputs = [classify_intent(text) for text in messages]
+
+    # ===== assert =====
+    assert outputs == [None] * len(messages)
+
+
+def test_normalize_strips_politeness_and_punctuation():
+    # ===== act =====
+    command = normalize("  OK, can you   Solve it please!! ")
+
+    # ===== assert =====
+    assert command == "solve it"
@@ -0,0 +1,97 @@
+import pytest
+from resource_allocation_spec import (
+    ResourceAllocationSpec,
+    Constraint,
+    LinearExpr,
+    Term,
+    SpecChangeEvent,
+    ChangeType,
+    UpdateConstraintChange,
+)
+from apply_spec_change import apply_change
+from linear_system import LinearSystem
+from conftest import make_spec
+
+
+def _spec(constraints: list[Constraint]) -> ResourceAllocationSpec:
+    return make_spec(constraints, nodes=["a", "b", "c"], resource="water", unit="liters")
+
+
+def _expr(terms: dict[str, int], const: int = 0) -> LinearExpr:
+    return LinearExpr(terms=[Term(var=v, coef=k) for v, k in terms.items()], const=const)
+
+
+def test_rows_move_vars_left_and_constants_right():
+    # ===== arrange =====
+    # water[c] + 1 > water[a] + water[b] + 2*water[c] - water[c]
+    spec = _spec(
+        [
+            Constraint(id="C0001", lhs=_expr({"water[a]": 1}), op=">=", rhs=4),
+            Constraint(
+                id="C0002",
+                lhs=_expr({"water[c]": 1}, const=1),
+                op=">",
+                rhs=LinearExpr(
+                    terms=[
+                        Term(var="water[a]", coef=1),
+                        Term(var="water[b]", coef=1),
+                        Term(var="water[c]", coef=2),
+                        Term(var="water[c]", coef=-1),
+                    ],
+                    const=2,
+                ),
+            ),
+        ]
+    )
+
+    # ===== act =====
+    system = LinearSystem.from_spec(spec)
+
+    # ===== assert =====
+    assert len(system) == 2
+    assert list(system.indptr) == [0, 1, 3]
+    cols, coefs, op, b = system.row(1)
+    # water[c] cancels out
+    assert [system.var_ids[j] for j in cols] == ["water[a]", "water[b]"]
+    assert list(coefs) == [-1, -1]
+    assert (op, b) == (">=", 2)
+    assert system.to_scipy().shape == (2, 3)
+
+
+def test_compact_rows_are_reused_across_versions():
+    # ===== arrange =====
+    spec = _spec(
+        [
+            Constraint(id="C0001", lhs=_expr({"water[a]": 1, "water[b]": 2}), op=">=", rhs=4),
+            Constraint(id="C0002", lhs=_expr({"water[b]": 1}), op="=", rhs=5),
+        ]
+    )
+    LinearSystem.from_spec(spec)
+    rows = dict(spec.index._rows)
+    event = SpecChangeEvent(
+        event_id=1,
+        timestamp="2025-01-01T00:00:00Z",
+        change_type=ChangeType.UPDATE_CONSTRAINT,
+        change_payload=UpdateConstraintChange(constraint_id="C0002", rhs=6),
+    )
+
+    # ===== act =====
+    new_spec = apply_change(spec, event)
+    system = LinearSystem.from_spec(new_spec)
+
+    # ===== assert =====
+    assert new_spec.index._rows["C0001"] is rows["C0001"]
+    assert new_spec.index._rows["C0002"] is not rows["C0002"]
+    assert list(system.b) == [4, 6]
+    assert list(system.indices) == [0, 1, 1]
+
+
+def test_undeclared_variable_is_rejected():
+    # ===== arrange =====
+    spec = _spec(
+        [Constraint(id="C0001", lhs=_expr({"water[d]": 1}), op=">=", rhs=4)]
+    )
+
+    # ===== act / assert =====
+    with pytest.raises(ValueError, match=r"water\[d\]"):
+        LinearSystem.from_spec(spec)
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from controller_output import ControllerLLMOutput, Intent
+from llm_cache import SQLiteLLMCache, prompt_key
+
+
+# kept off the model, whose fields are part of the cache key
+_calls: list = []
+
+
+class _CountingModel(BaseChatModel):
+    @property
+    def _llm_type(self) -> str:
+        return "counting"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        _calls.append(messages)
+        message = AIMessage(content=f"answer {len(_calls)}")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def test_model_answers_repeated_prompt_from_cache():
+    # ===== arrange =====
+    cache = SQLiteLLMCache("explain_solver")
+    model = _CountingModel(cache=cache)
+    _calls.clear()
+
+    # ===== act =====
+    first = model.invoke("why  is food[a] 3?")
+    repeated = model.invoke("why is food[a] 3?")
+    other = model.invoke("why is food[b] 0?")
+
+    # ===== assert =====
+    assert (first.content, repeated.content, other.content) == ("answer 1", "answer 1", "answer 2")
+    assert len(_calls) == 2
+    assert len(cache) == 2
+
+
+def test_namespaces_and_file_are_shared_apart(tmp_path):
+    # ===== arrange =====
+    path = str(tmp_path / "llm_cache.sqlite")
+    parser = SQLiteLLMCache("parser", path)
+    interpreter = SQLiteLLMCache("interpreter", path)
+    generation = [ChatGeneration(message=AIMessage(content="ADD_LOCATION \"d\""))]
+
+    # ===== act =====
+    parser.update("prompt", "llm", generation)
+    reopened = SQLiteLLMCache("parser", path)
+    interpreter.clear()
+
+    # ===== assert =====
+    assert reopened.lookup("prompt", "llm")[0].message.content == 'ADD_LOCATION "d"'
+    assert interpreter.lookup("prompt", "llm") is None
+
+
+def test_structured_output_survives_cache():
+    # ===== arrange =====
+    cache = SQLiteLLMCache("controller")
+    parsed = ControllerLLMOutput(intent=Intent.GREET, reply="hello")
+    message = AIMessage(content="", additional_kwargs={"parsed": parsed})
+
+    # ===== act =====
+    cache.update("prompt", "llm", [ChatGeneration(message=message)])
+    (hit,) = cache.lookup("prompt", "llm")
+
+    # ===== assert =====
+    assert ControllerLLMOutput(**hit.message.additional_kwargs["parsed"]) == parsed
+
+
+def test_expired_and_least_recently_used_entries_are_evicted():
+    # ===== arrange =====
+    expiring = SQLiteLLMCache("summarizer", ttl_s=-1)
+    small = SQLiteLLMCache("summarizer", maxsize=2)
+    generation = [ChatGeneration(message=AIMessage(content="ok"))]
+
+    # ===== act =====
+    expiring.update("a", "llm", generation)
+    for prompt in ["a", "b"]:
+        small.update(prompt, "llm", generation)
+    small.lookup("a", "llm")
+    small.update("c", "llm", generation)
+
+    # ===== assert =====
+    assert expiring.lookup("a", "llm") is None
+    assert len(expiring) == 0
+    assert small.lookup("b", "llm") is None
+    assert small.lookup("a", "llm") is not None
+    assert small.lookup("c", "llm") is not None
+
+
+def test_prompt_key_ignores_whitespace_runs_only():
+    # ===== assert =====
+    assert prompt_key("solve  it\n", "llm") == prompt_key("solve it", "llm")
+    assert prompt_key("solve it", "llm") != prompt_key("Solve it", "llm")
+    assert prompt_key("solve it", "llm") != prompt_key("solve it", "other llm")
+
+
+def test_concurrent_sessions_write_one_file(tmp_path):
+    # ===== arrange =====
+    path = str(tmp_path / "llm_cache.sqlite")
+    caches = [SQLiteLLMCache(namespace, path) for namespace in ["parser", "interpreter"]]
+    generation = [ChatGeneration(message=AIMessage(content="ok"))]
+
+    def write(cache, i):
+        cache.update(f"prompt {i}", "llm", generation)
+        return cache.lookup(f"prompt {i}", "llm")
+
+    # ===== act =====
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        hits = list(pool.map(write, caches * 100, range(200)))
+
+    # ===== assert =====
+    assert all(hit is not None for hit in hits)
+    assert [len(cache) for cache in caches] == [100, 100]
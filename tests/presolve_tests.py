@@ -0,0 +1,72 @@
+from resource_allocation_spec import Constraint
+from linear_system import LinearSystem
+from presolve import presolve
+from conftest import make_constraint as _c, make_spec
+
+
+def _system(constraints: list[Constraint]) -> LinearSystem:
+    spec = make_spec(constraints, nodes=["a", "b", "c"], resource="water", unit="liters")
+    return LinearSystem.from_spec(spec)
+
+
+def test_bounds_and_substitution():
+    # ===== arrange =====
+    system = _system(
+        [
+            _c("C0001", {"water[a]": 1}, ">", 3),
+            _c("C0002", {"water[b]": 1}, "=", 5),
+            _c("C0003", {"water[c]": 1, "water[a]": -1, "water[b]": -1}, ">", 0),
+            _c("C0004", {"water[a]": 2}, "<=", 20),
+        ]
+    )
+
+    # ===== act =====
+    pre = presolve(system)
+
+    # ===== assert =====
+    assert pre.conflict is None
+    # water[a] in [4, 10], water[b] fixed to 5
+    assert (pre.lower[0], pre.upper[0]) == (4, 10)
+    assert pre.fixed == {1: 5}
+    # water[c] - water[a] >= 6, derived from C0003 and the fixing C0002
+    assert len(pre.system) == 1
+    cols, coefs, op, b = pre.system.row(0)
+    assert (list(cols), list(coefs), op, b) == ([0, 2], [-1, 1], ">=", 6)
+    assert pre.origins == [("C0002", "C0003")]
+
+
+def test_bound_conflict_is_minimal():
+    # ===== arrange =====
+    system = _system(
+        [
+            _c("C0001", {"water[a]": 1}, ">=", 4),
+            _c("C0002", {"water[b]": 1}, ">=", 0),
+            _c("C0003", {"water[a]": 1}, "<", 2),
+            _c("C0004", {"water[a]": 1, "water[b]": 1}, "<=", 100),
+        ]
+    )
+
+    # ===== act =====
+    pre = presolve(system)
+
+    # ===== assert =====
+    assert pre.conflict == ["C0001", "C0003"]
+
+
+def test_drops_redundant_rows_and_detects_row_conflict():
+    # ===== arrange =====
+    bounds = [
+        _c("C0001", {"water[a]": 1}, ">=", 0),
+        _c("C0002", {"water[b]": 1}, ">=", 0),
+        _c("C0003", {"water[a]": 1}, "<=", 3),
+        _c("C0004", {"water[b]": 1}, "<=", 3),
+    ]
+
+    # ===== act =====
+    redundant = presolve(_system(bounds + [_c("C0005", {"water[a]": 1, "water[b]": 1}, ">=", 0)]))
+    infeasible = presolve(_system(bounds + [_c("C0005", {"water[a]": 1, "water[b]": 1}, ">=", 7)]))
+
+    # ===== assert =====
+    assert redundant.conflict is None
+    assert len(redundant.system) == 0
+    assert infeasible.conflict == ["C0003", "C0004", "C0005"]
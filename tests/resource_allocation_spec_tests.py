@@ -0,0 +1,41 @@
+from resource_allocation_spec import (
+    Constraint,
+    LinearExpr,
+    Term,
+    canonical_key,
+)
+
+
+def _expr(terms: list[tuple[str, int]], const: int = 0) -> LinearExpr:
+    return LinearExpr(terms=[Term(var=v, coef=k) for v, k in terms], const=const)
+
+
+def test_canonical_key_normalizes_form():
+    # ===== arrange =====
+    # 2 + b - a + a + 0*a > 2*b + 5   <=>   -b > 3   <=>   b <= -4
+    c = Constraint(
+        id="C0001",
+        lhs=_expr([("food[b]", 1), ("food[a]", -1), ("food[a]", 1), ("food[a]", 0)], 2),
+        op=">",
+        rhs=_expr([("food[b]", 2)], 5),
+    )
+    same = Constraint(id="C0002", lhs=_expr([("food[b]", -1)]), op=">=", rhs=4)
+
+    # ===== act =====
+    key = canonical_key(c)
+
+    # ===== assert =====
+    assert key == ((("food[b]", 1),), "<=", -4)
+    assert canonical_key(same) == key
+
+
+def test_canonical_key_tells_different_constraints_apart():
+    # ===== arrange =====
+    # a < b  <=>  b - 1 >= a, but not b = 2
+    less = Constraint(id="C0001", lhs=_expr([("food[a]", 1)]), op="<", rhs=_expr([("food[b]", 1)]))
+    same = Constraint(id="C0002", lhs=_expr([("food[b]", 1)], -1), op=">=", rhs=_expr([("food[a]", 1)]))
+    other = Constraint(id="C0003", lhs=_expr([("food[b]", 1)]), op="=", rhs=2)
+
+    # ===== assert =====
+    assert canonical_key(less) == canonical_key(same) == ((("food[a]", 1), ("food[b]", -1)), "<=", -1)
+    assert canonical_key(other) != canonical_key(less)
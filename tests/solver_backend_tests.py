@@ -0,0 +1,223 @@
+import random
+from resource_allocation_spec import (
+    ResourceAllocationSpec,
+    AllocationContext,
+    Locations,
+    Resource,
+    VarSpec,
+    Constraint,
+    Objective,
+)
+from solver_backend import MilpBackend, SolverRouter, Z3Backend
+from conftest import make_constraint as _c, make_spec
+
+
+def _spec(constraints: list[Constraint], objectives=()) -> ResourceAllocationSpec:
+    return make_spec(constraints, objectives=objectives)
+
+
+def test_milp_matches_z3_optimum():
+    # ===== arrange =====
+    spec = _spec(
+        [
+            _c("C0001", {"food[a]": 1, "food[b]": 1}, "<=", 11),
+            _c("C0002", {"food[a]": 1}, ">", 1),
+            _c("C0003", {"food[b]": 1}, ">=", 0),
+        ],
+        [Objective(sense="maximize", aggregate="min", resource="food")],
+    )
+    z3 = Z3Backend()
+
+    # ===== act =====
+    milp_result = MilpBackend(fallback=z3).solve(spec)
+    z3_result = z3.solve(spec)
+
+    # ===== assert =====
+    assert milp_result["backend"] == "milp"
+    assert milp_result["result"] == z3_result["result"] == "SAT"
+    assert milp_result["optimal"] is True
+    assert milp_result["objective_values"] == z3_result["objective_values"]
+    assert milp_result["objective_values"] == ["maximize min of food = 5"]
+
+
+def test_milp_hands_presolve_conflict_to_z3():
+    # ===== arrange =====
+    spec = _spec(
+        [
+            _c("C0001", {"food[a]": 1}, ">=", 4),
+            _c("C0002", {"food[b]": 1}, "=", 2),
+            _c("C0003", {"food[a]": 1}, "<", 4),
+        ]
+    )
+
+    # ===== act =====
+    result = MilpBackend(fallback=Z3Backend()).solve(spec)
+
+    # ===== assert =====
+    assert result["result"] == "UNSAT"
+    assert result["backend"] == "z3"
+    assert result["unsat_constraints_ids"] == ["C0001", "C0003"]
+
+
+def test_numbers_past_int64_are_solved_exactly():
+    # ===== arrange =====
+    big = 10**19
+    spec = _spec(
+        [
+            _c("C0001", {"food[a]": 1}, ">=", big),
+            _c("C0002", {"food[a]": 1, "food[b]": -1}, "=", 1),
+        ],
+        [Objective(sense="minimize", resource="food")],
+    )
+
+    # ===== act =====
+    plain = SolverRouter().solve(spec.model_copy(update={"objectives": []}))
+    optimized = SolverRouter().solve(spec)
+
+    # ===== assert =====
+    assert plain["result"] == "SAT"
+    assert (optimized["result"], optimized["backend"]) == ("SAT", "z3")
+    assert optimized["assignments"] == [f"food[a] = {big}", f"food[b] = {big - 1}"]
+
+
+def test_milp_falls_back_to_z3_for_unsat_core():
+    # ===== arrange =====
+    spec = _spec(
+        [
+            _c("C0001", {"food[a]": 1, "food[b]": 1}, ">=", 10),
+            _c("C0002", {"food[a]": 1, "food[b]": 2}, "<=", 4),
+            _c("C0003", {"food[b]": 1}, ">=", 0),
+        ]
+    )
+
+    # ===== act =====
+    result = MilpBackend(fallback=Z3Backend()).solve(spec)
+
+    # ===== assert =====
+    assert result["result"] == "UNSAT"
+    assert result["backend"] == "z3"
+    assert sorted(result["unsat_constraints_ids"]) == ["C0001", "C0002", "C0003"]
+
+
+def test_milp_rechecks_highs_solution():
+    # ===== arrange =====
+    # HiGHS reports food[b] = -1 as optimal here despite its lower bound
+    spec = _spec(
+        [
+            _c("C0001", {"food[b]": 1}, ">=", 0),
+            _c("C0002", {"food[b]": 1}, "<=", 1),
+            _c("C0003", {"food[c]": 1}, "<=", 1),
+            _c("C0004", {"food[a]": 4, "food[b]": 1}, "=", 7),
+            _c("C0005", {"food[b]": 2, "food[c]": 1}, ">=", -1),
+            _c("C0006", {"food[a]": 3, "food[b]": -2, "food[c]": -2}, ">=", -3),
+        ]
+    )
+    spec = spec.model_copy(
+        update={"vars": [*spec.vars, VarSpec(id="food[c]", sort="int")]}
+    )
+
+    # ===== act =====
+    result = MilpBackend(fallback=Z3Backend()).solve(spec)
+
+    # ===== assert =====
+    assert result["result"] == "UNSAT"
+    assert result["backend"] == "z3"
+
+
+def test_router_selects_by_size_and_shape():
+    # ===== arrange =====
+    router = SolverRouter(milp_min_size=10)
+    small = _spec([_c("C0001", {"food[a]": 1}, ">=", 4)])
+    optimizing = _spec(
+        [_c("C0001", {"food[a]": 1}, ">=", 4)],
+        [Objective(sense="minimize", resource="food")],
+    )
+    min_of_min = _spec([], [Objective(sense="minimize", aggregate="min")])
+
+    # ===== act / assert =====
+    assert router.select(small) is router.z3
+    assert router.select(optimizing) is router.milp
+    assert router.select(min_of_min) is router.z3
+
+
+def _hard_spec() -> ResourceAllocationSpec:
+    # three subset-sum rows over 0/1 variables: far too hard for 50 ms
+    rng = random.Random(1)
+    weights = [[rng.randint(10**6, 10**7) for _ in range(40)] for _ in range(3)]
+    nodes = [f"n{i}" for i in range(40)]
+    var_ids = [f"food[{n}]" for n in nodes]
+    constraints = []
+    for v in var_ids:
+        constraints.append(_c(f"C{len(constraints) + 1:04d}", {v: 1}, ">=", 0))
+        constraints.append(_c(f"C{len(constraints) + 1:04d}", {v: 1}, "<=", 1))
+    for w in weights:
+        constraints.append(
+            _c(f"C{len(constraints) + 1:04d}", dict(zip(var_ids, w)), "=", sum(w) // 2 + 1)
+        )
+    return ResourceAllocationSpec(
+        version=1,
+        context=AllocationContext(
+            resources=[Resource(name="food", unit="units")],
+            locations=Locations(nodes=nodes, edges=[]),
+        ),
+        vars=[VarSpec(id=v, sort="int") for v in var_ids],
+        constraints=constraints,
+    )
+
+
+def test_z3_reports_unknown_on_timeout():
+    # ===== arrange =====
+    spec = _hard_spec()
+
+    # ===== act =====
+    result = Z3Backend(timeout_ms=50, retry_timeout_ms=50).solve(spec)
+
+    # ===== assert =====
+    assert result["result"] == "UNKNOWN"
+    assert result["reason_unknown"]
+    assert "decisions" in result["statistics"]
+
+
+def test_router_timeout_bounds_the_whole_solve():
+    # ===== arrange =====
+    spec = _hard_spec()
+    optimizing = spec.model_copy(update={"objectives": [Objective(sense="minimize", resource="food")]})
+    router = SolverRouter(timeout_ms=300)
+
+    # ===== act =====
+    plain = router.solve(spec)
+    # MILP first, then Z3 with what is left
+    optimized = router.solve(optimizing)
+
+    # ===== assert =====
+    assert plain["result"] == "UNKNOWN"
+    assert plain["elapsed_ms"] < 1000
+    assert optimized["elapsed_ms"] < 1000
+
+
+def test_alternatives_are_distinct_and_lazy():
+    # ===== arrange =====
+    spec = _spec(
+        [
+            _c("C0001", {"food[a]": 1, "food[b]": 1}, "=", 4),
+            _c("C0002", {"food[a]": 1}, ">=", 0),
+            _c("C0003", {"food[b]": 1}, ">=", 0),
+        ]
+    )
+    backend = Z3Backend()
+
+    def values(assignments: list[str]) -> tuple[int, ...]:
+        return tuple(int(a.split(" = ")[1]) for a in assignments)
+
+    # ===== act =====
+    first = next(backend.alternatives(spec, 10))
+    every = [values(a) for a in backend.alternatives(spec, 10)]
+    spread = [values(a) for a in backend.alternatives(spec, 10, 4, "l1")]
+
+    # ===== assert =====
+    assert len(first) == 2
+    assert sorted(every) == [(0, 4), (1, 3), (2, 2), (3, 1), (4, 0)]
+    assert 2 <= len(spread) <= 3
+    for i, x in enumerate(spread):
+        for y in spread[:i]:
+            assert abs(x[0] - y[0]) + abs(x[1] - y[1]) >= 4
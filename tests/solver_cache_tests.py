@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from resource_allocation_spec import (
+    ResourceAllocationSpec,
+    Constraint,
+    LinearExpr,
+    Term,
+)
+from solver_cache import SolverResultCache, spec_hash
+from conftest import make_spec
+
+
+def _spec(version: int, constraints: list[Constraint]) -> ResourceAllocationSpec:
+    return make_spec(constraints, version=version)
+
+
+def _bound(cid: str, var: str, value: int) -> Constraint:
+    return Constraint(
+        id=cid,
+        lhs=LinearExpr(terms=[Term(var=var, coef=1)], const=0),
+        op=">=",
+        rhs=value,
+    )
+
+
+def test_spec_hash_is_structural():
+    # ===== arrange =====
+    c1 = _bound("C0001", "food[a]", 3)
+    c2 = _bound("C0002", "food[b]", 4)
+
+    # ===== act =====
+    h1 = spec_hash(_spec(1, [c1, c2]))
+    h2 = spec_hash(_spec(7, [c2, c1]))
+    h3 = spec_hash(_spec(1, [c1, _bound("C0002", "food[b]", 5)]))
+    # food[b] > 3 is food[b] >= 4 over integers
+    strict = c2.model_copy(update={"op": ">", "rhs": 3})
+    h4 = spec_hash(_spec(1, [c1, strict]))
+
+    # ===== assert =====
+    assert h1 == h2 == h4
+    assert h1 != h3
+
+
+def test_cache_lru_eviction():
+    # ===== arrange =====
+    cache = SolverResultCache(maxsize=2)
+
+    # ===== act =====
+    cache.put("k1", {"spec_version": 1, "result": "SAT", "assignments": []})
+    cache.put("k2", {"spec_version": 2, "result": "UNSAT", "unsat_constraints_ids": ["C0001"]})
+    cache.get("k1")
+    cache.put("k3", {"spec_version": 3, "result": "SAT", "assignments": []})
+
+    # ===== assert =====
+    assert len(cache) == 2
+    assert cache.get("k2") is None
+    assert cache.get("k1") == {"result": "SAT", "assignments": []}
+
+
+def test_cache_disk_backing(tmp_path):
+    # ===== arrange =====
+    writer = SolverResultCache(path=str(tmp_path))
+    writer.put(
+        "k1",
+        {"spec_version": 4, "result": "UNSAT", "unsat_constraints_ids": ["C0001"], "explanation": "x"},
+    )
+
+    # ===== act =====
+    reader = SolverResultCache(path=str(tmp_path))
+    entry = reader.get("k1")
+
+    # ===== assert =====
+    assert entry == {"result": "UNSAT", "unsat_constraints_ids": ["C0001"]}
+    assert "k1" in reader
+
+
+def test_cache_shared_across_threads(tmp_path):
+    # ===== arrange =====
+    cache = SolverResultCache(maxsize=8, path=str(tmp_path))
+
+    def put_and_get(i):
+        key = f"k{i % 16}"
+        cache.put(key, {"result": "SAT", "assignments": [{"var": "food[a]", "value": i % 16}]})
+        return cache.get(key)
+
+    # ===== act =====
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        entries = list(pool.map(put_and_get, range(2000)))
+
+    # ===== assert =====
+    assert all(entry["result"] == "SAT" for entry in entries)
+    assert len(cache) == 8
+    assert sorted(os.listdir(tmp_path)) == sorted(f"k{i}.json" for i in range(16))
@@ -1,6 +1,6 @@
 import pytest
-from z3 import Solver, Int, sat
-from src.resource_allocation_spec import (
+from z3 import Solver, Int, sat, unsat
+from resource_allocation_spec import (
     ResourceAllocationSpec,
     AllocationContext,
     Locations,
@@ -9,8 +9,9 @@ from src.resource_allocation_spec import (
     Constraint,
     LinearExpr,
     Term,
+    Objective,
 )
-from spec_compiler import SpecCompiler
+from spec_compiler import SpecCompiler, IncrementalSpecCompiler
 
 """
 case 1:
@@ -128,3 +129,160 @@ def test_compiler_1():
         compiler.constraint_expressions, spec.constraints
     ):
         print(compiled_expr.__repr__())
+
+
+def _bounds_spec(version: int, food_a_min: int) -> ResourceAllocationSpec:
+    return ResourceAllocationSpec(
+        version=version,
+        context=AllocationContext(
+            resources=[Resource(name="food", unit="unit")],
+            locations=Locations(nodes=["a", "b"], edges=[]),
+        ),
+        vars=[
+            VarSpec(id="food[a]", sort="int"),
+            VarSpec(id="food[b]", sort="int"),
+        ],
+        constraints=[
+            Constraint(
+                id="C001",
+                lhs=LinearExpr(terms=[Term(var="food[a]", coef=1)], const=0),
+                op=">=",
+                rhs=food_a_min,
+            ),
+            Constraint(
+                id="C002",
+                lhs=LinearExpr(terms=[Term(var="food[a]", coef=1)], const=0),
+                op="<=",
+                rhs=5,
+            ),
+            Constraint(
+                id="C003",
+                lhs=LinearExpr(terms=[Term(var="food[b]", coef=1)], const=0),
+                op="=",
+                rhs=2,
+            ),
+        ],
+    )
+
+
+def _coupled_spec(version: int, total_min: int) -> ResourceAllocationSpec:
+    # food[a] + food[b] >= total_min, food[a] + 2*food[b] <= 4, food[b] >= 0
+    spec = _bounds_spec(version, 0)
+    return spec.model_copy(
+        update={
+            "constraints": [
+                Constraint(
+                    id="C001",
+                    lhs=LinearExpr(
+                        terms=[Term(var="food[a]", coef=1), Term(var="food[b]", coef=1)]
+                    ),
+                    op=">=",
+                    rhs=total_min,
+                ),
+                Constraint(
+                    id="C002",
+                    lhs=LinearExpr(
+                        terms=[Term(var="food[a]", coef=1), Term(var="food[b]", coef=2)]
+                    ),
+                    op="<=",
+                    rhs=4,
+                ),
+                Constraint(
+                    id="C003",
+                    lhs=LinearExpr(terms=[Term(var="food[b]", coef=1)]),
+                    op=">=",
+                    rhs=0,
+                ),
+            ]
+        }
+    )
+
+
+def test_incremental_compiler_reuses_solver():
+    # ===== arrange =====
+    compiler = IncrementalSpecCompiler()
+
+    # ===== act =====
+    s1 = compiler.compile(_coupled_spec(1, 3))
+    r1 = compiler.check()
+    asserted_v1 = len(compiler.asserted)
+
+    s2 = compiler.compile(_coupled_spec(2, 10))
+    r2 = compiler.check()
+    core = compiler.unsat_core_ids()
+    asserted_v2 = len(compiler.asserted)
+
+    s3 = compiler.compile(_coupled_spec(3, 3))
+    r3 = compiler.check()
+
+    # ===== assert =====
+    assert s1 is s2 is s3
+    assert r1 == sat and r3 == sat
+    assert r2 == unsat
+    assert sorted(core) == ["C001", "C002", "C003"]
+    # two rows and one bound, then only the modified row is re-translated
+    assert asserted_v1 == 3
+    assert asserted_v2 == 4
+    assert compiler.retired == 2
+    assert len(compiler.constraint_trackings) == 3
+
+
+def test_incremental_compiler_presolves_bounds():
+    # ===== arrange =====
+    compiler = IncrementalSpecCompiler()
+
+    # ===== act =====
+    s = compiler.compile(_bounds_spec(1, 3))
+    r = compiler.check()
+
+    # ===== assert =====
+    assert r == sat
+    assert len(compiler.asserted) == 0
+    assert compiler.assignments(s.model()) == ["food[a] = 3", "food[b] = 2"]
+
+
+def test_incremental_compiler_retracts_removed_constraints():
+    # ===== arrange =====
+    compiler = IncrementalSpecCompiler()
+    spec = _bounds_spec(1, 7)
+    compiler.compile(spec)
+    assert compiler.check() == unsat
+
+    # ===== act =====
+    relaxed = spec.model_copy(
+        update={"version": 2, "constraints": spec.constraints[:1]}
+    )
+    compiler.compile(relaxed)
+
+    # ===== assert =====
+    assert compiler.check() == sat
+    assert [str(t) for t in compiler.constraint_trackings] == ["C001"]
+
+
+def test_compile_optimize_max_min():
+    # ===== arrange =====
+    spec = _bounds_spec(1, 0).model_copy(
+        update={
+            "constraints": [
+                Constraint(
+                    id="C001",
+                    lhs=LinearExpr(
+                        terms=[Term(var="food[a]", coef=1), Term(var="food[b]", coef=1)]
+                    ),
+                    op="<=",
+                    rhs=10,
+                ),
+            ],
+            "objectives": [Objective(sense="maximize", aggregate="min", resource="food")],
+        }
+    )
+
+    # ===== act =====
+    compiler = SpecCompiler()
+    opt = compiler.compile_optimize(spec, timeout_ms=5000)
+    result = opt.check()
+
+    # ===== assert =====
+    assert result == sat
+    assert compiler.assignments(opt.model()) == ["food[a] = 5", "food[b] = 5"]
+    assert opt.model().eval(compiler.objectives[0].value()).as_long() == 5
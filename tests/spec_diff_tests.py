@@ -0,0 +1,72 @@
+from resource_allocation_spec import (
+    ResourceAllocationSpec,
+    Constraint,
+    LinearExpr,
+    Term,
+    ChangeType,
+    AddConstraintChange,
+    AddLocationChange,
+    RemoveConstraintChange,
+    UpdateConstraintChange,
+)
+from apply_spec_change import apply_changes
+from spec_diff import SpecDiff
+from conftest import make_base_spec, make_event as _event
+
+
+def _spec() -> ResourceAllocationSpec:
+    return make_base_spec(nodes=["a"])
+
+
+def test_event_diffs_merge_to_net_change():
+    # ===== arrange =====
+    spec = _spec()
+    added = Constraint(
+        id="C0002",
+        lhs=LinearExpr(terms=[Term(var="food[a]", coef=2)]),
+        op="<=",
+        rhs=9,
+    )
+    events = [
+        _event(1, ChangeType.ADD_CONSTRAINT, AddConstraintChange(constraint=added)),
+        _event(2, ChangeType.UPDATE_CONSTRAINT, UpdateConstraintChange(constraint_id="C0001", rhs=1)),
+        _event(3, ChangeType.UPDATE_CONSTRAINT, UpdateConstraintChange(constraint_id="C0001", rhs=4)),
+        _event(4, ChangeType.REMOVE_CONSTRAINT, RemoveConstraintChange(constraint_id="C0002")),
+        _event(5, ChangeType.ADD_LOCATION, AddLocationChange(node="b")),
+    ]
+    outcomes = []
+
+    # ===== act =====
+    new_spec = apply_changes(spec, events, outcomes=outcomes)
+    net = SpecDiff.merge(o["diff"] for o in outcomes)
+
+    # ===== assert =====
+    # setting rhs to its current value is not a change
+    assert [o["status"] for o in outcomes] == ["applied", "no-op", "applied", "applied", "applied"]
+    assert new_spec.version == 2
+    assert net.added("constraints") == []
+    assert net.removed("constraints") == []
+    assert [(b.rhs, a.rhs) for b, a in net.modified("constraints")] == [(1, 4)]
+    assert net.added("nodes") == ["b"]
+    assert [v.id for v in net.added("vars")] == ["food[b]"]
+    assert net.describe() == (
+        "added node: b\nchanged constraint: food[a] >= 1 -> food[a] >= 4"
+    )
+    assert not SpecDiff.merge(o["diff"] for o in outcomes[:1] + outcomes[3:4])
+
+
+def test_rewriting_a_constraint_in_equal_form_is_no_change():
+    # ===== arrange =====
+    spec = _spec()
+    events = [
+        _event(1, ChangeType.UPDATE_CONSTRAINT, UpdateConstraintChange(constraint_id="C0001", op=">", rhs=0)),
+        _event(2, ChangeType.UPDATE_CONSTRAINT, UpdateConstraintChange(constraint_id="C0001", op=">=", rhs=2)),
+    ]
+    outcomes = []
+
+    # ===== act =====
+    apply_changes(spec, events, outcomes=outcomes)
+
+    # ===== assert =====
+    assert not outcomes[0]["diff"]
+    assert outcomes[1]["diff"].describe() == "changed constraint: food[a] > 0 -> food[a] >= 2"
@@ -0,0 +1,111 @@
+from resource_allocation_spec import (
+    ResourceAllocationSpec,
+    SpecChangeEvent,
+    ChangeType,
+    AddConstraintChange,
+    RemoveConstraintChange,
+)
+from apply_spec_change import apply_changes
+from spec_event_store import SpecEventStore
+from conftest import make_constraint, make_event, make_spec
+
+
+def _spec() -> ResourceAllocationSpec:
+    return make_spec(nodes=["a"])
+
+
+def _add(i: int) -> SpecChangeEvent:
+    c = make_constraint("__AUTO__", {"food[a]": 1}, ">=", i)
+    return make_event(i, ChangeType.ADD_CONSTRAINT, AddConstraintChange(constraint=c))
+
+
+def _remove(i: int, cid: str) -> SpecChangeEvent:
+    return make_event(i, ChangeType.REMOVE_CONSTRAINT, RemoveConstraintChange(constraint_id=cid))
+
+
+def test_spec_at_replays_from_nearest_snapshot():
+    # ===== arrange =====
+    store = SpecEventStore(_spec(), snapshot_every=4)
+    batches = [[_add(3 * b + 1), _add(3 * b + 2), _remove(3 * b + 3, "C9999")] for b in range(5)]
+    expected = {1: _spec()}
+
+    # ===== act =====
+    spec = _spec()
+    for batch in batches:
+        spec = apply_changes(spec, batch)
+        expected[spec.version] = spec
+        store.apply(batch)
+
+    # ===== assert =====
+    # one version per batch; the rejected removals are not logged
+    assert store.head.version == 6
+    assert store.next_event_id == 16
+    for version, spec in expected.items():
+        assert store.spec_at(version) == spec
+    assert [v for _, v in store.events(since_version=4)] == [5, 5, 6, 6]
+
+
+def test_compaction_drops_old_history():
+    # ===== arrange =====
+    store = SpecEventStore(_spec(), snapshot_every=2, max_snapshots=3)
+
+    # ===== act =====
+    for i in range(1, 11):
+        store.apply([_add(i)])
+
+    # ===== assert =====
+    assert store.oldest_version == 7
+    assert len(store) == 4
+    assert [c.rhs for c in store.spec_at(8).constraints] == list(range(1, 8))
+    try:
+        store.spec_at(6)
+        assert False, "compacted version must not be rebuilt"
+    except KeyError:
+        pass
+
+
+def test_undo_redo_and_new_branch():
+    # ===== arrange =====
+    store = SpecEventStore(_spec(), snapshot_every=2, recent_versions=2)
+    for i in range(1, 6):
+        store.apply([_add(i)])
+
+    # ===== act =====
+    undone = [store.undo().version for _ in range(3)]
+    redone = store.redo()
+    old = store.goto(2)
+    first = store.undo()
+    nothing_left = store.undo()
+    store.goto(3)
+    branched, _ = store.apply([_add(9)])
+
+    # ===== assert =====
+    assert undone == [5, 4, 3]
+    assert redone.version == 4 and len(redone.constraints) == 3
+    assert [c.rhs for c in old.constraints] == [1]
+    assert first.version == 1 and nothing_left is None
+    # applying after going back drops the versions ahead of it
+    assert branched.version == 4
+    assert [c.rhs for c in branched.constraints] == [1, 2, 9]
+    assert store.latest_version == 4
+    assert store.redo() is None
+    assert [c.rhs for c in store.spec_at(3).constraints] == [1, 2]
+
+
+def test_replay_across_removal_keeps_assigned_ids():
+    # ===== arrange =====
+    # the snapshot after the removal loses the live index's id counter
+    store = SpecEventStore(_spec(), snapshot_every=3, recent_versions=1)
+    batches = [[_add(1)], [_add(2)], [_remove(3, "C0002")], [_add(4)], [_add(5)]]
+
+    # ===== act =====
+    live = {}
+    for batch in batches:
+        spec, _ = store.apply(batch)
+        live[spec.version] = spec
+
+    # ===== assert =====
+    assert [c.id for c in live[5].constraints] == ["C0001", "C0003"]
+    replayed = store.spec_at(5)
+    assert replayed == live[5]
+    assert replayed.content_hash() == live[5].content_hash()